@@ -0,0 +1,72 @@
+# python -m bench.api_bench [--kid-id N] [--requests 200]
+# เทียบ /kid/tasks, /kid/rewards เดิม (ORM object + jsonable_encoder) กับ /api/v1 (Core select + orjson)
+# ยิงในโปรเซสผ่าน ASGI ทีละ request รายงาน req/s, rows/s และขนาด response
+# ไม่ส่ง --kid-id จะเลือกเด็กจาก bench.seed ที่มีงานค้างมากที่สุด (seed ด้วย --open 500 ให้เห็นผลชัด)
+import os
+os.environ.setdefault("NOTIFY_BACKEND", "noop")
+
+import argparse, asyncio, time
+import httpx
+from sqlalchemy import select, func
+from config import SessionLocal
+import main as app_main
+from tables.users import Users
+from tables.tasks import Task, TaskStatus
+from utils.family import family_of
+from core.session import Identity, encode_session, SESSION_COOKIE
+
+
+def pick_kid(kid_id: int | None) -> tuple[int, str]:
+    with SessionLocal() as db:
+        if kid_id is None:
+            kid_id = db.execute(
+                select(Task.kid_id).join(Users, Users.id == Task.kid_id)
+                .where(Users.username.like("bench%"), Task.status.in_([TaskStatus.assigned, TaskStatus.rejected]))
+                .group_by(Task.kid_id).order_by(func.count().desc()).limit(1)
+            ).scalar()
+            if kid_id is None:
+                raise SystemExit("no bench data; run `python -m bench.seed --open 500` first")
+        kid = db.get(Users, kid_id)
+        fam = family_of(db, kid_id)
+        ident = Identity(kid.id, kid.role.value, fam.id if fam else None, kid.first_name)
+    return kid_id, f"{SESSION_COOKIE}={encode_session(ident)}"
+
+
+async def measure(client: httpx.AsyncClient, url: str, key: str, cookie: str, n: int) -> dict:
+    await client.get(url, headers={"cookie": cookie})  # warm up (cache รางวัล, template ฯลฯ)
+    rows = size = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        r = await client.get(url, headers={"cookie": cookie})
+        r.raise_for_status()
+        rows += len(r.json()[key])
+        size += len(r.content)
+    took = time.perf_counter() - t0
+    return {"req/s": n / took, "rows/s": rows / took, "rows": rows // n, "bytes": size // n}
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kid-id", type=int, default=None)
+    ap.add_argument("--requests", type=int, default=200)
+    args = ap.parse_args()
+
+    kid_id, cookie = pick_kid(args.kid_id)
+    cases = [
+        ("tasks  old", f"/kid/tasks/{kid_id}", "tasks"),
+        ("tasks  v1", f"/api/v1/kids/{kid_id}/tasks", "tasks"),
+        ("tasks  v1 fields=id,status", f"/api/v1/kids/{kid_id}/tasks?fields=id,status", "tasks"),
+        ("rewards old", f"/kid/rewards/{kid_id}", "rewards"),
+        ("rewards v1", f"/api/v1/kids/{kid_id}/rewards", "rewards"),
+    ]
+    print(f"kid {kid_id}, {args.requests} sequential requests per endpoint")
+    print(f"{'endpoint':<28}{'rows':>7}{'bytes':>9}{'req/s':>10}{'rows/s':>12}")
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url, key in cases:
+            r = await measure(client, url, key, cookie, args.requests)
+            print(f"{name:<28}{r['rows']:>7}{r['bytes']:>9}{r['req/s']:>10.1f}{r['rows/s']:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+# python -m bench.async_bench [--kid-id N] [--requests 400] [--concurrency 1,10,50] [--latency 0.005]
+# เทียบ throughput ของชุด query หน้า dashboard เด็ก: route sync (threadpool, ยิงทีละ query)
+# กับ route async (asyncpg, query ที่ไม่ขึ้นต่อกันยิงพร้อมกัน) บน DB จริงตาม DATABASE_URL
+# --latency จำลอง round trip ต่อ query (pg_sleep) ให้เห็นผลเหมือน DB อยู่คนละเครื่อง
+# หมายเหตุ: async แบบยิงพร้อมกันลด latency ต่อ request แต่ใช้หลาย connection ต่อ request
+# ที่ concurrency สูง throughput จะถูกจำกัดด้วยขนาด pool ทั้งสองแบบ
+import argparse, asyncio, statistics, time
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select, text
+from config import SessionLocal, run_concurrently
+from tables import users, families, tasks, submissions, rewards, reward_redeems, kid_counters, points_ledger, task_templates  # noqa: F401
+from tables.users import Users, RoleEnum
+from tables.tasks import Task, TaskStatus
+from tables.rewards import Reward
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from core import counters
+
+
+def dashboard_reads(kid_id: int, latency: float):
+    def rtt(fn):
+        def run(s):
+            if latency:
+                s.execute(text("SELECT pg_sleep(:d)"), {"d": latency})
+            return fn(s)
+        return run
+    return [rtt(fn) for fn in (
+        lambda s: s.get(Users, kid_id),
+        lambda s: s.query(Task).filter(
+            Task.kid_id == kid_id,
+            Task.status.in_([TaskStatus.assigned, TaskStatus.rejected, TaskStatus.submitted]),
+        ).order_by(Task.created_at.desc()).all(),
+        lambda s: counters.get_counters(s, kid_id),
+        lambda s: s.query(Reward).all(),
+        lambda s: s.query(RewardRedeem).filter(RewardRedeem.kid_id == kid_id).all(),
+        lambda s: s.query(RewardRedeem, Reward).join(Reward, Reward.id == RewardRedeem.reward_id)
+                   .filter(RewardRedeem.kid_id == kid_id, RewardRedeem.status == RedeemStatus.pending).all(),
+    )]
+
+
+def build_app(kid_id: int, latency: float) -> FastAPI:
+    app = FastAPI()
+    reads = dashboard_reads(kid_id, latency)
+
+    @app.get("/sync")
+    def sync_dashboard():
+        with SessionLocal() as db:
+            return {"n": len([fn(db) for fn in reads])}
+
+    @app.get("/async")
+    async def async_dashboard():
+        return {"n": len(await run_concurrently(*reads))}
+
+    return app
+
+
+async def hammer(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> dict:
+    left = iter(range(total))
+    took = []
+
+    async def worker():
+        for _ in left:
+            t = time.perf_counter()
+            r = await client.get(path)
+            r.raise_for_status()
+            took.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    q = statistics.quantiles(took, n=20)
+    return {"rps": total / (time.perf_counter() - t0), "p50": q[9] * 1000, "p95": q[18] * 1000}
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kid-id", type=int, default=None)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", default="1,10,50")
+    ap.add_argument("--latency", type=float, default=0.005)
+    args = ap.parse_args()
+
+    kid_id = args.kid_id
+    if kid_id is None:
+        with SessionLocal() as db:
+            kid_id = db.scalar(select(Users.id).where(Users.role == RoleEnum.kid).order_by(Users.id).limit(1))
+        if kid_id is None:
+            raise SystemExit("no kid in database; pass --kid-id or create one first")
+
+    app = build_app(kid_id, args.latency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        print(f"{args.requests} requests per run, simulated latency {args.latency * 1000:.0f}ms/query")
+        for conc in (int(c) for c in args.concurrency.split(",")):
+            for path in ("/sync", "/async"):
+                await client.get(path)  # warm up pool
+                r = await hammer(client, path, args.requests, conc)
+                print(f"concurrency {conc:>3} {path:>7}: {r['rps']:8.1f} req/s  "
+                      f"p50 {r['p50']:7.1f}ms  p95 {r['p95']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
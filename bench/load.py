@@ -0,0 +1,194 @@
+# python -m bench.load [--requests 300] [--concurrency 20] [--only kid_dashboard,submit_task] [--out PATH]
+# python -m bench.load --compare bench/results/A.json bench/results/B.json
+# ยิง route จริงของ app (ในโปรเซสเดียวกันผ่าน ASGI ไม่ต้องเปิด server) ด้วย client พร้อมกันหลายตัว
+# บนข้อมูลจาก bench.seed แล้วรายงาน p50/p95/p99, req/s และจำนวน query ต่อ request ของแต่ละ route
+# ผลเก็บเป็น JSON ใน bench/results/ (ชื่อไฟล์มีเวลา + git commit) ไว้เทียบระหว่าง commit
+import os
+os.environ.setdefault("SQL_STATS_HEADER", "1")
+os.environ.setdefault("NOTIFY_BACKEND", "noop")
+
+import argparse, asyncio, json, random, statistics, subprocess, time
+from datetime import datetime
+from pathlib import Path
+import httpx
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+READS = ("kid_dashboard", "kid_history", "parent_dashboard", "parent_submissions", "parent_history")
+WRITES = ("submit_task", "decide_submission")
+
+
+def load_fixtures() -> dict:
+    # import ตรงนี้ให้ --compare ใช้ได้โดยไม่ต้องมี DB
+    from sqlalchemy import select
+    from config import SessionLocal
+    from tables.users import Users, RoleEnum
+    from tables.families import FamilyMember
+    from tables.tasks import Task, TaskStatus
+    from tables.submissions import Submission
+    from core.session import Identity, encode_session, SESSION_COOKIE
+
+    with SessionLocal() as db:
+        people = db.execute(
+            select(Users.id, Users.role, Users.first_name, FamilyMember.family_id)
+            .join(FamilyMember, FamilyMember.user_id == Users.id)
+            .where(Users.username.like("bench%"))
+        ).all()
+        kids = [p for p in people if p.role == RoleEnum.kid]
+        parents = [p for p in people if p.role == RoleEnum.parent]
+        kid_ids = [k.id for k in kids]
+        open_tasks = db.execute(
+            select(Task.id, Task.kid_id).where(Task.kid_id.in_(kid_ids), Task.status == TaskStatus.assigned)
+        ).all() if kid_ids else []
+        pending = db.execute(
+            select(Submission.id, Task.parent_id).join(Task, Task.id == Submission.task_id)
+            .where(Task.kid_id.in_(kid_ids), Submission.status == "pending", Task.status == TaskStatus.submitted)
+        ).all() if kid_ids else []
+    if not kids:
+        raise SystemExit("no bench data; run `python -m bench.seed` first")
+    cookie = lambda p: f"{SESSION_COOKIE}=" + encode_session(Identity(p.id, p.role.value, p.family_id, p.first_name))
+    return {
+        "kids": [(k.id, cookie(k)) for k in kids],
+        "parents": [(p.id, cookie(p)) for p in parents],
+        "cookies": {p.id: cookie(p) for p in people},
+        "open_tasks": list(open_tasks),
+        "pending": list(pending),
+    }
+
+
+def make_request(name: str, fx: dict, rnd: random.Random):
+    """คืน (method, url, form, cookie) หรือ None ถ้างานสำหรับ route เขียนหมดแล้ว"""
+    if name == "kid_dashboard":
+        kid, c = rnd.choice(fx["kids"]); return "GET", f"/kid/dashboard/{kid}", None, c
+    if name == "kid_history":
+        kid, c = rnd.choice(fx["kids"]); return "GET", f"/kid/history/{kid}", None, c
+    if name == "parent_dashboard":
+        pid, c = rnd.choice(fx["parents"]); return "GET", f"/parent/dashboard/{pid}", None, c
+    if name == "parent_submissions":
+        pid, c = rnd.choice(fx["parents"]); return "GET", f"/parent/submissions/{pid}", None, c
+    if name == "parent_history":
+        pid, c = rnd.choice(fx["parents"]); return "GET", f"/parent/history/{pid}", None, c
+    if name == "submit_task":
+        if not fx["open_tasks"]:
+            return None
+        task_id, kid = fx["open_tasks"].pop()
+        return "POST", f"/kid/submit/{task_id}", {"kid_id": kid, "note": "bench"}, fx["cookies"][kid]
+    if name == "decide_submission":
+        if not fx["pending"]:
+            return None
+        sid, pid = fx["pending"].pop()
+        return "POST", f"/parent/submission/decision/{sid}", {"pid": pid, "approve": "yes"}, fx["cookies"][pid]
+    raise ValueError(name)
+
+
+async def run_route(client: httpx.AsyncClient, name: str, fx: dict, total: int, concurrency: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    lat, queries, db_ms, errors = [], [], [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            req = make_request(name, fx, rnd)
+            if req is None:
+                return
+            method, url, form, cookie = req
+            t = time.perf_counter()
+            r = await client.request(method, url, data=form, headers={"cookie": cookie})
+            lat.append(time.perf_counter() - t)
+            if r.status_code not in (200, 303) or "err=" in r.headers.get("location", ""):
+                errors += 1
+            queries.append(int(r.headers.get("x-db-statements", 0)))
+            db_ms.append(float(r.headers.get("x-db-time-ms", 0)))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    if len(lat) < 2:
+        return {"requests": len(lat), "skipped": True}
+    q = statistics.quantiles(lat, n=100)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / wall, 1),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+        "queries_avg": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+        "db_ms_avg": round(statistics.mean(db_ms), 2),
+    }
+
+
+def git_rev() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(results: dict):
+    print(f"{'route':<20}{'req':>6}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>7}{'q max':>7}{'db ms':>8}")
+    for name, r in results.items():
+        if r.get("skipped"):
+            print(f"{name:<20}{r['requests']:>6}  (skipped: not enough data)")
+            continue
+        print(f"{name:<20}{r['requests']:>6}{r['errors']:>5}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['queries_avg']:>7}{r['queries_max']:>7}{r['db_ms_avg']:>8}")
+
+
+def compare(a_path: str, b_path: str):
+    a, b = (json.loads(Path(p).read_text()) for p in (a_path, b_path))
+    print(f"A = {a['meta']['commit']} ({a['meta']['at']})\nB = {b['meta']['commit']} ({b['meta']['at']})")
+    print(f"{'route':<20}{'metric':<12}{'A':>10}{'B':>10}{'change':>9}")
+    for name in a["routes"]:
+        ra, rb = a["routes"][name], b["routes"].get(name)
+        if not rb or ra.get("skipped") or rb.get("skipped"):
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms", "queries_avg"):
+            va, vb = ra[metric], rb[metric]
+            change = f"{(vb - va) / va * 100:+.0f}%" if va else "-"
+            print(f"{name:<20}{metric:<12}{va:>10}{vb:>10}{change:>9}")
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=300, help="requests per route")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--only", default=None, help="comma separated routes: " + ",".join(READS + WRITES))
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="result file (default bench/results/<time>-<commit>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("A", "B"))
+    args = ap.parse_args()
+    if args.compare:
+        return compare(*args.compare)
+
+    import main as app_main
+    routes = args.only.split(",") if args.only else list(READS + WRITES)
+    fx = load_fixtures()
+    print(f"{len(fx['kids'])} kids, {len(fx['parents'])} parents, {len(fx['open_tasks'])} open tasks, "
+          f"{len(fx['pending'])} pending submissions; {args.requests} requests/route at concurrency {args.concurrency}")
+    results = {}
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False) as client:
+        for name in routes:
+            if name in READS and args.warmup:
+                await run_route(client, name, fx, args.warmup, min(args.concurrency, args.warmup), args.seed)
+            results[name] = await run_route(client, name, fx, args.requests, args.concurrency, args.seed)
+
+    print_table(results)
+    RESULTS_DIR.mkdir(exist_ok=True)
+    commit = git_rev()
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    meta = {"commit": commit, "at": datetime.now().isoformat(timespec="seconds"),
+            "requests": args.requests, "concurrency": args.concurrency,
+            "kids": len(fx["kids"]), "parents": len(fx["parents"])}
+    out.write_text(json.dumps({"meta": meta, "routes": results}, indent=2, ensure_ascii=False))
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
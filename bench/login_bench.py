@@ -0,0 +1,48 @@
+# python -m bench.login_bench [--pools 1,2,4] [--logins 200] [--clients 32]
+# วัด login/วินาที (verify รหัสผ่าน) ผ่าน process pool ขนาดต่าง ๆ ไม่ต้องต่อ DB
+import argparse, os, subprocess, sys, time, json
+
+def run_one(pool_size: int, logins: int, clients: int) -> dict:
+    os.environ["HASH_POOL_SIZE"] = str(pool_size)
+    os.environ["HASH_QUEUE_LIMIT"] = str(max(clients, pool_size))
+    from concurrent.futures import ThreadPoolExecutor
+    from core import auth
+    hashed = auth.pwd_context.hash("correct horse")
+    auth.verify_password("correct horse", hashed)  # warm up pool
+    busy = 0
+    def one(_):
+        nonlocal busy
+        try:
+            return auth.verify_password("correct horse", hashed)
+        except auth.HashPoolBusy:
+            busy += 1
+            return False
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as ex:
+        ok = sum(ex.map(one, range(logins)))
+    dt = time.perf_counter() - t0
+    auth.shutdown_pool()
+    return {"pool_size": pool_size, "logins": logins, "ok": ok, "busy": busy,
+            "seconds": round(dt, 3), "logins_per_sec": round(ok / dt, 1), "rounds": auth.PBKDF2_ROUNDS}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pools", default="1,2,4")
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.one:
+        print(json.dumps(run_one(args.one, args.logins, args.clients)))
+        return
+    # แต่ละขนาด pool รันใน process ใหม่ ค่าจาก env ถูกอ่านตอน import
+    for size in [int(x) for x in args.pools.split(",")]:
+        out = subprocess.run([sys.executable, "-m", "bench.login_bench", "--one", str(size),
+                              "--logins", str(args.logins), "--clients", str(args.clients)],
+                             capture_output=True, text=True, check=True).stdout
+        r = json.loads(out)
+        print(f"pool={r['pool_size']:>3}  {r['logins_per_sec']:>8} logins/s  "
+              f"({r['ok']}/{r['logins']} ok, {r['busy']} busy, {r['seconds']}s, rounds={r['rounds']})")
+
+if __name__ == "__main__":
+    main()
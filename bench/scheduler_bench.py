@@ -0,0 +1,46 @@
+# python -m bench.scheduler_bench [--templates 100000] [--batch 5000]
+# ใส่ template ปลอมจำนวนมากลง DB (DATABASE_URL) แล้ววัดเวลา scheduler ทีละ batch + รันซ้ำเพื่อเช็ก idempotent
+import argparse, time
+from sqlalchemy import insert, delete
+from config import SessionLocal
+from tables import users, families, tasks, submissions, rewards, reward_redeems, kid_counters, points_ledger, task_templates  # noqa: F401
+from tables.users import Users, RoleEnum
+from tables.task_templates import TaskTemplate
+from core import scheduler
+
+RULES = ["daily", "weekly:mon-fri", "weekly:sat,sun", "monthly:1,15", "cron:*/2 * *"]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--templates", type=int, default=100_000)
+    ap.add_argument("--batch", type=int, default=scheduler.SCHEDULE_BATCH)
+    ap.add_argument("--kids", type=int, default=1000)
+    args = ap.parse_args()
+
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        parent = Users(username=f"bench-parent-{time.time_ns()}", password="x", first_name="Bench", role=RoleEnum.parent)
+        db.add(parent); db.flush()
+        kid_ids = db.execute(insert(Users).returning(Users.id), [
+            {"username": f"bench-kid-{time.time_ns()}-{i}", "password": "x", "first_name": f"K{i}",
+             "role": RoleEnum.kid, "points": 0} for i in range(args.kids)
+        ]).scalars().all()
+        db.execute(insert(TaskTemplate), [
+            {"parent_id": parent.id, "kid_id": kid_ids[i % len(kid_ids)], "title": f"chore {i}",
+             "points": 5, "rule": RULES[i % len(RULES)], "active": True} for i in range(args.templates)
+        ])
+        db.commit()
+        print(f"seeded {args.templates} templates in {time.perf_counter() - t0:.2f}s")
+
+        for attempt in ("first run", "rerun"):
+            totals = scheduler.materialize(db, batch_size=args.batch,
+                                           report=lambda b: print(f"  batch {b['batch']:>3}: {b['templates']} templates, "
+                                                                  f"{b['inserted']} inserted, {b['seconds']}s"))
+            print(f"{attempt}: {totals}")
+
+        db.execute(delete(TaskTemplate).where(TaskTemplate.parent_id == parent.id))
+        db.execute(delete(Users).where(Users.id.in_(kid_ids + [parent.id])))
+        db.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# python -m bench.seed [--families 200] [--kids 3] [--history 60] [--open 5] [--pending 2]
+#                      [--rewards 8] [--redeems 4] [--history-days 180] [--reset]
+# ใส่ข้อมูลจำลองลง DB ตาม DATABASE_URL ด้วย COPY (เร็วกว่า INSERT ทีละแถวหลายสิบเท่า)
+# ผู้ใช้ทุกคนชื่อขึ้นต้นด้วย "bench" รหัสผ่าน "bench" ; bench.load เลือกผู้ใช้จากชื่อนี้
+# --reset ล้างทุกตารางก่อน (TRUNCATE) ใช้กับ DB สำหรับ bench เท่านั้น
+import argparse, csv, io, random, time
+from datetime import timedelta
+from sqlalchemy import text
+from config import SessionLocal, engine, now_th
+from tables import users, families, tasks, submissions, rewards, reward_redeems, kid_counters, points_ledger, task_templates, kid_daily_stats, archive  # noqa: F401
+from core import counters, rollups, partitions
+from core.auth import pwd_context
+
+APP_TABLES = ("archive_index", "archive_runs", "outbox", "kid_daily_stats", "points_snapshots", "points_ledger", "kid_counters", "submissions", "reward_redeems", "rewards",
+              "tasks", "task_templates", "family_members", "families", "users")
+CHORES = ("ล้างจาน", "เก็บของเล่น", "รดน้ำต้นไม้", "ทำการบ้าน", "พับผ้า", "ให้อาหารแมว", "จัดโต๊ะ", "อ่านหนังสือ")
+PRIZES = ("ไอศกรีม", "ดูการ์ตูนเพิ่ม 30 นาที", "ของเล่นชิ้นเล็ก", "ไปสวนสนุก", "สติกเกอร์", "ขนม")
+
+
+def copy_rows(cur, table: str, cols: tuple, rows: list):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def next_ids(cur, *tables) -> dict:
+    out = {}
+    for t in tables:
+        cur.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {t}")
+        out[t] = cur.fetchone()[0]
+    return out
+
+
+def build(args, ids: dict, rnd: random.Random) -> dict:
+    now = now_th()
+    pw = pwd_context.hash("bench")
+    rows = {k: [] for k in ("users", "families", "family_members", "rewards", "tasks", "submissions",
+                            "reward_redeems", "points_ledger")}
+    uid, fid, mid, rwid, tid, sid, rrid = (ids[t] for t in ("users", "families", "family_members", "rewards",
+                                                            "tasks", "submissions", "reward_redeems"))
+    tag = uid
+    ts = lambda dt: dt.isoformat()
+
+    for f in range(args.families):
+        parent = uid; uid += 1
+        rows["users"].append((parent, f"bench{tag}-p{f}", pw, f"พ่อแม่{f}", "parent", 0, ts(now), ts(now)))
+        rows["families"].append((fid, f"บ้าน {f}", f"B{tag}-{f}"[:16], parent))
+        rows["family_members"].append((mid, fid, parent, "parent")); mid += 1
+
+        prizes = []
+        for r in range(args.rewards):
+            cost = rnd.choice((5, 10, 20, 50))
+            rows["rewards"].append((rwid, parent, rnd.choice(PRIZES), "", cost, "", ts(now - timedelta(days=args.history_days))))
+            prizes.append((rwid, cost)); rwid += 1
+
+        for k in range(args.kids):
+            kid = uid; uid += 1
+            earned = 0
+            for h in range(args.history):
+                pts = rnd.choice((1, 2, 3, 5))
+                created = now - timedelta(days=rnd.uniform(1, args.history_days))
+                done = created + timedelta(hours=rnd.uniform(1, 48))
+                status = "approved" if rnd.random() < 0.85 else "rejected"
+                earned += pts if status == "approved" else 0
+                rows["tasks"].append((tid, rnd.choice(CHORES), "", pts, parent, kid, status, ts(created), ts(done)))
+                tid += 1
+            for o in range(args.open):
+                rows["tasks"].append((tid, rnd.choice(CHORES), "", rnd.choice((1, 2, 3)), parent, kid, "assigned",
+                                      ts(now - timedelta(hours=rnd.uniform(0, 72))), ""))
+                tid += 1
+            for p in range(args.pending):
+                created = now - timedelta(hours=rnd.uniform(1, 72))
+                rows["tasks"].append((tid, rnd.choice(CHORES), "", rnd.choice((1, 2, 3)), parent, kid, "submitted",
+                                      ts(created), ""))
+                rows["submissions"].append((sid, tid, kid, "เสร็จแล้วครับ", "", "pending",
+                                            ts(created + timedelta(minutes=30))))
+                tid += 1; sid += 1
+
+            spent = 0
+            for rid, cost in rnd.sample(prizes, min(args.redeems, len(prizes))):
+                created = now - timedelta(days=rnd.uniform(0, args.history_days))
+                if spent + cost <= earned and rnd.random() < 0.7:
+                    spent += cost
+                    rows["reward_redeems"].append((rrid, rid, kid, "approved", ts(created), ts(created + timedelta(hours=2))))
+                else:
+                    rows["reward_redeems"].append((rrid, rid, kid, "pending", ts(created), ""))
+                rrid += 1
+
+            balance = earned - spent
+            rows["users"].append((kid, f"bench{tag}-p{f}-k{k}", pw, f"ลูก{f}-{k}", "kid", balance, ts(now), ts(now)))
+            rows["family_members"].append((mid, fid, kid, "kid")); mid += 1
+            rows["points_ledger"].append((kid, balance, balance, "seed", ts(now)))
+        fid += 1
+    return rows
+
+
+COLUMNS = {
+    "users": ("id", "username", "password", "first_name", "role", "points", "create_date", "update_date"),
+    "families": ("id", "name", "code", "owner_parent_id"),
+    "family_members": ("id", "family_id", "user_id", "role"),
+    "rewards": ("id", "parent_id", "name", "description", "cost", "image_path", "created_at"),
+    "tasks": ("id", "title", "description", "points", "parent_id", "kid_id", "status", "created_at", "completed_at"),
+    "submissions": ("id", "task_id", "kid_id", "message", "evidence_path", "status", "created_at"),
+    "reward_redeems": ("id", "reward_id", "kid_id", "status", "created_at", "reviewed_at"),
+    "points_ledger": ("kid_id", "delta", "balance_after", "reason", "created_at"),
+}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--families", type=int, default=200)
+    ap.add_argument("--kids", type=int, default=3, help="kids per family")
+    ap.add_argument("--history", type=int, default=60, help="reviewed tasks per kid")
+    ap.add_argument("--open", type=int, default=5, help="assigned tasks per kid")
+    ap.add_argument("--pending", type=int, default=2, help="submitted tasks awaiting review per kid")
+    ap.add_argument("--rewards", type=int, default=8, help="rewards per family")
+    ap.add_argument("--redeems", type=int, default=4, help="redeems per kid")
+    ap.add_argument("--history-days", type=int, default=180)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--reset", action="store_true", help="TRUNCATE all app tables first")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    # ประวัติย้อนหลังต้องมี partition รายเดือนรองรับ ไม่งั้นไปกองใน partition default
+    with SessionLocal() as db:
+        partitions.ensure(db, first=(now_th() - timedelta(days=args.history_days + 3)).date())
+        db.commit()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if args.reset:
+            cur.execute(f"TRUNCATE {', '.join(APP_TABLES)} RESTART IDENTITY CASCADE")
+        ids = next_ids(cur, "users", "families", "family_members", "rewards", "tasks", "submissions", "reward_redeems")
+        rows = build(args, ids, random.Random(args.seed))
+        t1 = time.perf_counter()
+        for table in ("users", "families", "family_members", "rewards", "tasks", "submissions",
+                      "reward_redeems", "points_ledger"):
+            copy_rows(cur, table, COLUMNS[table], rows[table])
+        for table in ("users", "families", "family_members", "rewards", "tasks", "submissions", "reward_redeems"):
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+        raw.commit()
+    finally:
+        raw.close()
+    t2 = time.perf_counter()
+
+    with SessionLocal() as db:
+        counters.reconcile(db)
+        rollups.rebuild(db)
+        db.commit()
+        db.execute(text("ANALYZE"))
+    t3 = time.perf_counter()
+    print(", ".join(f"{len(v)} {k}" for k, v in rows.items()))
+    print(f"generated in {t1 - t0:.1f}s, copied in {t2 - t1:.1f}s, counters+rollups+analyze in {t3 - t2:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
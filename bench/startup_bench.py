@@ -0,0 +1,52 @@
+# python -m bench.startup_bench [--runs 5]
+# วัดเวลาตั้งแต่ import main จนตอบ request แรกได้ ใน process ใหม่ทุกรอบ (เหมือน worker เพิ่ง start)
+# เทียบ: template cache ว่าง / มี cache แล้ว / แบบเดิมที่เรียก create_all ตอน import
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+if sys.argv[1] == "1":
+    from config import Base, engine
+    Base.metadata.create_all(bind=engine)
+t2 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t3 = time.perf_counter()
+    client.get("/login").raise_for_status()
+    t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create_all": t2 - t1, "lifespan": t3 - t2, "first_request": t4 - t3, "total": t4 - t0}))
+"""
+
+
+def run(create_all: bool, cache_dir: str) -> dict:
+    env = {**os.environ, "TEMPLATE_CACHE_DIR": cache_dir}
+    out = subprocess.run([sys.executable, "-c", CHILD, "1" if create_all else "0"],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as warm_dir:
+        run(False, warm_dir)  # เติม bytecode cache
+        cases = {
+            "cold template cache": lambda: run(False, tempfile.mkdtemp()),
+            "warm template cache": lambda: run(False, warm_dir),
+            "old: create_all at import": lambda: run(True, warm_dir),
+        }
+        for name, fn in cases.items():
+            results = [fn() for _ in range(args.runs)]
+            med = {k: statistics.median(r[k] for r in results) * 1000 for k in results[0]}
+            print(f"{name:<27} total {med['total']:7.1f}ms  import {med['import']:6.1f}  "
+                  f"create_all {med['create_all']:6.1f}  lifespan {med['lifespan']:5.1f}  "
+                  f"first request {med['first_request']:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
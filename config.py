@@ -1,23 +1,105 @@
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from dotenv import load_dotenv
 from datetime import datetime 
-import os, pytz
+import asyncio, os, pytz
+from core import pool_stats, sqlstats, replica
+from fastapi import Request, Depends
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "static/uploads")
+# ไฟล์ที่ยังอัปโหลดไม่เสร็จ ต้องอยู่นอก static/ (ไม่ให้ดาวน์โหลดได้) แต่อยู่ filesystem เดียวกับ UPLOAD_DIR (os.replace)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", ".upload-tmp")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+DB_TIMEZONE = "Asia/Bangkok"
+# ขนาด pool ต่อ process: connection สูงสุดที่ใช้ได้ = worker x (pool_size + max_overflow) ของทุก engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# ตั้ง timezone ผ่าน startup options ของ connection เลย ไม่ต้องยิง SET TIME ZONE เพิ่มทุกครั้งที่ต่อใหม่
+engine = create_engine(
+    DATABASE_URL, pool_pre_ping=True, future=True,
+    poolclass=pool_stats.timed_pool(QueuePool, "primary"),
+    pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE,
+    connect_args={"options": f"-c timezone={DB_TIMEZONE}"},
+)
+pool_stats.register("primary", engine)
+sqlstats.instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+
+# engine แบบ async (asyncpg) สำหรับ route ที่เป็น async def; ไม่กิน thread ระหว่างรอ DB
+def _async_url(url: str | None) -> str | None:
+    if not url:
+        return url
+    scheme, sep, rest = url.partition("://")
+    return f"postgresql+asyncpg{sep}{rest}" if scheme in ("postgres", "postgresql", "postgresql+psycopg2") else url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+ASYNC_POOL_SIZE = int(os.getenv("ASYNC_POOL_SIZE", "10"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("ASYNC_MAX_OVERFLOW", "10"))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, pool_pre_ping=True,
+    poolclass=pool_stats.timed_pool(AsyncAdaptedQueuePool, "async"),
+    pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE,
+    connect_args={"server_settings": {"timezone": DB_TIMEZONE}},
+)
+pool_stats.register("async", async_engine)
+sqlstats.instrument(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# replica สำหรับหน้าอ่านอย่างเดียว (ไม่บังคับ) ไม่ตั้ง READ_DATABASE_URL = ทุกอย่างไป primary เหมือนเดิม
+# ขนาด pool ใช้ค่าเดียวกับ engine หลัก/async ; ตั้ง URL ทั้งสองชี้ DB เดียวกันเพื่อลองบนเครื่องได้
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or _async_url(READ_DATABASE_URL)
+if READ_DATABASE_URL:
+    read_engine = create_engine(
+        READ_DATABASE_URL, pool_pre_ping=True, future=True,
+        poolclass=pool_stats.timed_pool(QueuePool, "replica"),
+        pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE,
+        connect_args={"options": f"-c timezone={DB_TIMEZONE} -c default_transaction_read_only=on"},
+    )
+    async_read_engine = create_async_engine(
+        ASYNC_READ_DATABASE_URL, pool_pre_ping=True,
+        poolclass=pool_stats.timed_pool(AsyncAdaptedQueuePool, "async_replica"),
+        pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE,
+        connect_args={"server_settings": {"timezone": DB_TIMEZONE, "default_transaction_read_only": "on"}},
+    )
+    pool_stats.register("replica", read_engine)
+    pool_stats.register("async_replica", async_read_engine)
+    sqlstats.instrument(read_engine)
+    sqlstats.instrument(async_read_engine.sync_engine)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, future=True)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+else:
+    read_engine, async_read_engine = engine, async_engine
+    ReadSessionLocal, AsyncReadSessionLocal = SessionLocal, AsyncSessionLocal
 Base = declarative_base()
 
 TH_TZ = pytz.timezone("Asia/Bangkok")
 def now_th():
     return datetime.now(TH_TZ)
 
-templates = Jinja2Templates(directory="templates")
+# template ชุดเดียวทั้ง app; bytecode ที่ compile แล้วเก็บลงดิสก์ worker ใหม่ไม่ต้อง compile ซ้ำ
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", ".cache/jinja")
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+templates = Jinja2Templates(env=Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+))
 
 def th_datetime(dt):
     if not dt:
@@ -44,11 +126,53 @@ def get_db():
     finally:
         db.close()
 
-@event.listens_for(engine, "connect")
-def set_bangkok_timezone(dbapi_conn, conn_record):
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# หน้าอ่านอย่างเดียวใช้ตัวนี้แทน get_db: ไป replica ถ้ามี ยกเว้นเพิ่งเขียนเอง (cookie dq_primary)
+# ไม่มี replica หรือต้องอ่าน primary -> ใช้ session เดียวกับ get_db ของ request (ไม่เปิด connection เพิ่ม)
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    if read_engine is engine or replica.wants_primary(request):
+        yield db
+        return
+    rdb = ReadSessionLocal()
     try:
-        cur = dbapi_conn.cursor()
-        cur.execute("SET TIME ZONE 'Asia/Bangkok';")
-        cur.close()
-    except Exception:
-        pass
\ No newline at end of file
+        yield rdb
+    finally:
+        rdb.close()
+
+async def get_async_read_db(request: Request, db: AsyncSession = Depends(get_async_db)):
+    if async_read_engine is async_engine or replica.wants_primary(request):
+        yield db
+        return
+    async with AsyncReadSessionLocal() as rdb:
+        yield rdb
+
+# connection ที่ run_concurrently จองไว้แล้วแต่อาจยังไม่ได้ checkout ต่อ engine (event loop เดียว ไม่ต้อง lock)
+_fanout_reserved: dict = {}
+
+async def run_concurrently(*fns, db: AsyncSession | None = None):
+    """รันฟังก์ชันอ่านข้อมูลหลายตัวพร้อมกัน แต่ละตัวได้ Session (sync API) + connection ของตัวเอง
+    ใช้กับ query ที่ไม่ขึ้นต่อกันในหน้าเดียว; object ที่คืนมาหลุดจาก session แล้ว
+    ต้องโหลด relationship ที่จะใช้มาให้ครบ (joinedload ฯลฯ)
+    ถ้า pool เหลือ connection ไม่พอก็รันทีละตัว ถ้าส่ง db ของ request มาจะใช้ connection ที่ถืออยู่แล้ว
+    (ไม่ถือ connection หนึ่งแล้วรออีกอัน -> pool ไม่ตันตอนโหลดสูง)
+    ตัวที่แยกไปใช้ engine เดียวกับ db (replica หรือ primary)"""
+    target = db.bind if db is not None else async_engine
+    reserved = _fanout_reserved.get(target, 0)
+    free = ASYNC_POOL_SIZE + ASYNC_MAX_OVERFLOW - target.pool.checkedout() - reserved
+    if free < len(fns):
+        if db is not None:
+            return await db.run_sync(lambda s: [fn(s) for fn in fns])
+        async with AsyncSessionLocal() as own:
+            return await own.run_sync(lambda s: [fn(s) for fn in fns])
+
+    async def one(fn):
+        async with AsyncSession(target, autoflush=False, expire_on_commit=False) as s:
+            return await s.run_sync(fn)
+    _fanout_reserved[target] = reserved + len(fns)
+    try:
+        return await asyncio.gather(*(one(fn) for fn in fns))
+    finally:
+        _fanout_reserved[target] -= len(fns)
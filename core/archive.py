@@ -0,0 +1,240 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import select, delete, insert, func, DateTime
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import now_th, TH_TZ
+from tables.tasks import Task, TaskStatus
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.rewards import Reward
+from tables.submissions import Submission
+from tables.archive import ArchiveRun, ArchiveIndex
+from utils.pagination import PAGE_SIZE, decode_cursor, encode_cursor
+from core import partitions
+import asyncio, gzip, logging, os, threading, orjson
+
+log = logging.getLogger("dquests.archive")
+
+# งาน/การแลกที่อนุมัติแล้วเก่ากว่า ARCHIVE_AFTER_DAYS (นับจาก completed_at / reviewed_at) ย้ายออกจาก DB
+# ไปไฟล์ gzip JSON lines แยกตามเจ้าของ หนึ่งไฟล์ต่อ (เดือน, เจ้าของ, batch):
+#   ARCHIVE_DIR/<table>/YYYY-MM/<shard>/run<N>-<batch>.jsonl.gz   (shard: tasks = k<kid>/p<parent>, redeems = k<kid>)
+# หน้า history เปิดเฉพาะไฟล์ของคนที่ดูอยู่ (หาจาก archive_index) ไม่ต้องถอดแถวของบ้านอื่น
+# ทำทีละ ARCHIVE_BATCH แถวตามช่วง id: DELETE ... RETURNING -> เขียนไฟล์ + fsync -> archive_index -> commit
+# ถ้า commit ไม่ผ่าน แถวของ batch นั้นยังอยู่ใน DB ไฟล์ที่ค้างไม่มีใครอ้าง (history อ่านเฉพาะไฟล์ที่อยู่ใน archive_index)
+# batch ที่ commit ไปแล้วอยู่ครบ รันซ้ำก็ทำต่อจากที่ค้าง
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "archive"))
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "5000"))             # แถวต่อ transaction
+ARCHIVE_CACHE_FILES = int(os.getenv("ARCHIVE_CACHE_FILES", "256"))  # ไฟล์ (ของเจ้าของหนึ่งคน) ที่ถอดแล้วเก็บไว้ในหน่วยความจำ ต่อ worker
+
+
+@dataclass(frozen=True)
+class Spec:
+    model: type
+    ts: str                 # คอลัมน์ที่ history เรียงและใช้ตัดอายุ
+    owners: tuple           # คอลัมน์เจ้าของที่ลง archive_index
+    status: type
+    shard: str              # โฟลเดอร์ของเจ้าของ (format ด้วยแถว) ; แถวในไฟล์เดียวกันเป็นของเจ้าของเดียวกันเสมอ
+
+
+SPECS = {
+    "tasks": Spec(Task, "completed_at", ("kid_id", "parent_id"), TaskStatus, "k{kid_id}/p{parent_id}"),
+    "reward_redeems": Spec(RewardRedeem, "reviewed_at", ("kid_id", "reward_id"), RedeemStatus, "k{kid_id}"),
+}
+
+
+def cutoff_for(days: int) -> datetime:
+    """เที่ยงคืน (เวลาไทย) ของ `days` วันก่อน ; ตัดที่ขอบวันให้ยอดรายวันก่อนหน้านั้นไม่ต้องสร้างใหม่อีก"""
+    return TH_TZ.localize(datetime.combine(now_th().date() - timedelta(days=days), datetime.min.time()))
+
+
+def horizon(db: Session) -> datetime | None:
+    """แถวที่อนุมัติแล้วและเก่ากว่านี้อยู่ในไฟล์ ไม่อยู่ใน DB ; None = ยังไม่เคย archive"""
+    return db.scalar(select(func.max(ArchiveRun.cutoff)))
+
+
+def _write(rel: str, rows: list[dict]) -> Path:
+    path = ARCHIVE_DIR / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for r in rows:
+                gz.write(orjson.dumps(r) + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    return path
+
+
+def _archive_batch(db: Session, archive_run: ArchiveRun, name: str, spec: Spec, rows: list, written: list):
+    # id แรกของ batch ไม่ซ้ำกับ batch ไหนเลย (แถวหนึ่งถูกย้ายได้ครั้งเดียว) รอบที่ทำต่อจึงไม่เขียนทับไฟล์เดิม
+    first = min(r["id"] for r in rows)
+    files: dict[tuple[date, str], list[dict]] = {}
+    for r in rows:
+        month = partitions.month_start(r[spec.ts].astimezone(TH_TZ).date())
+        rel = f"{name}/{month:%Y-%m}/{spec.shard.format(**r)}/run{archive_run.id}-{first}.jsonl.gz"
+        files.setdefault((month, rel), []).append(dict(r))
+
+    index = []
+    for (month, rel), file_rows in files.items():
+        written.append(_write(rel, file_rows))
+        counts: dict[tuple, int] = {}
+        for r in file_rows:
+            k = (*(r[o] for o in spec.owners), r["status"].value)
+            counts[k] = counts.get(k, 0) + 1
+        for (*owner, status), c in counts.items():
+            index.append({"run_id": archive_run.id, "table_name": name, "month": month, "path": rel,
+                          **dict(zip(spec.owners, owner)), "status": status, "rows": c})
+    db.execute(insert(ArchiveIndex), index)
+
+
+def _archive_table(db: Session, archive_run: ArchiveRun, name: str, spec: Spec, cutoff: datetime,
+                   batch: int = ARCHIVE_BATCH) -> tuple[int, int]:
+    """ย้ายทีละช่วง id ไม่เกิน batch แถว commit ทีละช่วง ; คืน (จำนวนแถว, จำนวนไฟล์)"""
+    t = spec.model.__table__
+    where = (t.c.status == spec.status.approved, t.c[spec.ts] < cutoff)
+    counter = "tasks" if spec.model is Task else "redeems"
+    total, files, lo = 0, 0, 0
+    while True:
+        # id ตัวที่ batch หลัง lo เป็นขอบบนของช่วงนี้ ; None = ที่เหลือไม่ถึง batch ทำรอบสุดท้าย
+        hi = db.scalar(select(t.c.id).where(*where, t.c.id > lo).order_by(t.c.id).offset(batch - 1).limit(1))
+        rng = (*where, t.c.id > lo, *((t.c.id <= hi,) if hi is not None else ()))
+        written: list[Path] = []
+        try:
+            if spec.model is Task:
+                # แทน ON DELETE CASCADE ที่ถอดไปตอนแบ่ง partition
+                db.execute(delete(Submission).where(Submission.task_id.in_(select(t.c.id).where(*rng))))
+            rows = db.execute(delete(t).where(*rng).returning(*t.c)).mappings().all()
+            if rows:
+                _archive_batch(db, archive_run, name, spec, rows, written)
+                setattr(archive_run, counter, getattr(archive_run, counter) + len(rows))
+            db.commit()
+        except BaseException:
+            db.rollback()
+            for p in written:
+                p.unlink(missing_ok=True)
+            raise
+        total += len(rows)
+        files += len(written)
+        if hi is None:
+            return total, files
+        lo = hi
+
+
+def run(db: Session, older_than_days: int = ARCHIVE_AFTER_DAYS, batch: int = ARCHIVE_BATCH) -> dict:
+    """ย้ายแถวอนุมัติแล้วที่เก่ากว่า cutoff ไปไฟล์ แล้วทิ้ง partition เดือนเก่าที่ว่าง + สร้าง partition ล่วงหน้า ; commit เอง"""
+    cutoff = cutoff_for(older_than_days)
+    last = db.scalars(select(ArchiveRun).order_by(ArchiveRun.cutoff.desc(), ArchiveRun.id.desc()).limit(1)).first()
+    if last is not None and cutoff <= last.cutoff:
+        # horizon ไม่ถอยหลัง ; รันซ้ำ = ทำต่อในรอบเดิม (เก็บแถวที่รอบก่อนค้างไว้ถ้าหยุดกลางทาง)
+        archive_run, cutoff = last, last.cutoff
+    else:
+        # บันทึก horizon ก่อน batch แรก: ระหว่างที่ย้ายอยู่ history ต้องเปิดไฟล์ของแถวที่ commit ไปแล้ว
+        # (แถวหนึ่งอยู่ใน DB หรือในไฟล์ที่ index แล้วอย่างใดอย่างหนึ่งเสมอ ไม่ซ้ำ)
+        archive_run = ArchiveRun(cutoff=cutoff, tasks=0, redeems=0)
+        db.add(archive_run)
+        db.commit()
+    tasks, task_files = _archive_table(db, archive_run, "tasks", SPECS["tasks"], cutoff, batch)
+    redeems, redeem_files = _archive_table(db, archive_run, "reward_redeems", SPECS["reward_redeems"], cutoff, batch)
+    files = task_files + redeem_files
+    dropped = partitions.drop_empty(db, partitions.month_start(cutoff.date()))
+    partitions.ensure(db)
+    db.commit()
+    log.info("archived %d tasks and %d redeems older than %s into %d file(s)", tasks, redeems, cutoff, files)
+    return {"cutoff": cutoff.isoformat(), "tasks": tasks, "redeems": redeems, "files": files, "dropped": dropped}
+
+
+_cache: OrderedDict[str, list[dict]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _load(rel: str, spec: Spec) -> list[dict]:
+    with _cache_lock:
+        rows = _cache.get(rel)
+        if rows is not None:
+            _cache.move_to_end(rel)
+            return rows
+    dt_cols = [c.name for c in spec.model.__table__.c if isinstance(c.type, DateTime)]
+    rows = []
+    with gzip.open(ARCHIVE_DIR / rel, "rb") as f:
+        for line in f:
+            r = orjson.loads(line)
+            for c in dt_cols:
+                if r[c] is not None:
+                    # UTC เหมือนที่ asyncpg คืนให้หน้า history แถวจากไฟล์จะแสดงเหมือนแถวใน DB
+                    r[c] = datetime.fromisoformat(r[c]).astimezone(timezone.utc)
+            r["status"] = spec.status(r["status"])
+            rows.append(r)
+    with _cache_lock:
+        _cache[rel] = rows
+        while len(_cache) > ARCHIVE_CACHE_FILES:
+            _cache.popitem(last=False)
+    return rows
+
+
+def _files(db: Session, name: str, statuses, before: tuple | None, owner: dict) -> list[list[str]]:
+    """ไฟล์ของเจ้าของนี้จาก archive_index จัดกลุ่มตามเดือน ใหม่->เก่า"""
+    ix = ArchiveIndex
+    values = [getattr(s, "value", s) for s in statuses]
+    q = (select(ix.month, ix.path)
+         .where(ix.table_name == name, ix.status.in_(values), *(getattr(ix, k) == v for k, v in owner.items()))
+         .distinct().order_by(ix.month.desc()))
+    if before is not None:
+        q = q.where(ix.month <= partitions.month_start(before[0].astimezone(TH_TZ).date()))
+    by_month: dict[date, list[str]] = {}
+    for month, path in db.execute(q):
+        by_month.setdefault(month, []).append(path)
+    return list(by_month.values())
+
+
+def _read(name: str, months: list[list[str]], statuses, before: tuple | None, want: int, owner: dict) -> list[dict]:
+    """แถวจากไฟล์ เรียงใหม่->เก่าตาม (ts, id) ที่น้อยกว่า before ไม่เกิน want แถว ; อ่านดิสก์ อย่าเรียกบน event loop"""
+    spec = SPECS[name]
+    out = []
+    for paths in months:
+        # ไฟล์หนึ่งมีแต่แถวของเจ้าของเดียวอยู่แล้ว กรองเจ้าของซ้ำกันพลาดเท่านั้น
+        found = [r for p in paths for r in _load(p, spec)
+                 if r["status"] in statuses and all(r[k] == v for k, v in owner.items())
+                 and (before is None or (r[spec.ts], r["id"]) < before)]
+        found.sort(key=lambda r: (r[spec.ts], r["id"]), reverse=True)
+        out.extend(found)
+        # เดือนที่เก่ากว่านี้เรียงอยู่หลังทั้งหมด
+        if len(out) >= want:
+            break
+    return out[:want]
+
+
+async def extend(db: AsyncSession, name: str, rows: list, next_cursor: str | None, cursor: str | None, key,
+                 statuses, attach=None, limit: int = PAGE_SIZE, **owner):
+    """ต่อผลของ keyset_page (ใหม่->เก่า) ด้วยแถวจากไฟล์ archive ให้ลำดับ/cursor เหมือนอ่านตารางเดียว
+    แถวในไฟล์เก่ากว่า horizon ทั้งหมด: ถ้าหน้านี้เต็มและแถวสุดท้ายยังไม่ถึง horizon ก็ไม่ต้องเปิดไฟล์
+    ไฟล์อ่านใน thread (asyncio.to_thread) ไม่บล็อก event loop
+    attach(db, objs) -> แถวรูปเดียวกับ rows (เช่นจับคู่ Reward)"""
+    before = decode_cursor(cursor)
+
+    def plan(s: Session):
+        h = horizon(s)
+        if h is None or (next_cursor is not None and key(rows[-1])[0] >= h):
+            return []
+        return _files(s, name, statuses, before, owner)
+    months = await db.run_sync(plan)
+    if not months:
+        return rows, next_cursor
+    found = await asyncio.to_thread(_read, name, months, statuses, before, limit + 1, owner)
+    if not found:
+        return rows, next_cursor
+    extra = [SPECS[name].model(**r) for r in found]
+    if attach is not None:
+        extra = await db.run_sync(attach, extra)
+    merged = sorted([*rows, *extra], key=key, reverse=True)
+    more = next_cursor is not None or len(merged) > limit
+    merged = merged[:limit]
+    return merged, (encode_cursor(*key(merged[-1])) if more and merged else None)
+
+
+def with_rewards(db: Session, redeems: list[RewardRedeem]) -> list[tuple]:
+    """(RewardRedeem, Reward) เหมือน join ของหน้า history ; รางวัลที่ถูกลบไปแล้วไม่แสดง"""
+    ids = {rr.reward_id for rr in redeems}
+    rewards = {rw.id: rw for rw in db.query(Reward).filter(Reward.id.in_(ids))} if ids else {}
+    return [(rr, rewards[rr.reward_id]) for rr in redeems if rr.reward_id in rewards]
@@ -1,9 +1,90 @@
 from passlib.context import CryptContext
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+import asyncio, atexit, os, threading
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], default="pbkdf2_sha256")
+PBKDF2_ROUNDS = int(os.getenv("PBKDF2_ROUNDS", "29000"))
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+# งาน hash ที่รอ/กำลังทำได้พร้อมกันสูงสุด เกินนี้ตอบ 503 ทันที (route รอแบบ async ไม่กิน thread ของ threadpool)
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_POOL_SIZE * 8)))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
 
-def hash_password(raw: str) -> str:
+# min_rounds = rounds ปัจจุบัน -> hash เก่าที่ rounds น้อยกว่าจะ needs_update
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    default="pbkdf2_sha256",
+    pbkdf2_sha256__default_rounds=PBKDF2_ROUNDS,
+    pbkdf2_sha256__min_rounds=PBKDF2_ROUNDS,
+)
+
+class HashPoolBusy(RuntimeError):
+    pass
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE)
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_pool)
+
+def _submit(fn, *args) -> Future:
+    """จองที่ในคิวแล้วส่งงานเข้า pool ; คืนที่เมื่อ process ลูกทำเสร็จจริง ไม่ใช่ตอนคนรอเลิกรอ
+    งานที่ timeout แล้วแต่ยัง hash อยู่จึงยังนับ -> งานที่กิน CPU ไม่เกิน HASH_QUEUE_LIMIT"""
+    if not _slots.acquire(blocking=False):
+        raise HashPoolBusy("password hashing queue is full")
+    try:
+        fut = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    fut.add_done_callback(lambda _: _slots.release())
+    return fut
+
+def _run(fn, *args):
+    try:
+        return _submit(fn, *args).result(timeout=HASH_TIMEOUT)
+    except FutureTimeout:
+        raise HashPoolBusy("password hashing timed out")
+
+async def _run_async(fn, *args):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(_submit(fn, *args)), HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HashPoolBusy("password hashing timed out")
+
+# ฟังก์ชันที่รันใน process ลูก ต้องอยู่ระดับ module ให้ pickle ได้
+def _hash(raw: str) -> str:
     return pwd_context.hash(raw)
 
+def _verify_and_update(raw: str, hashed: str):
+    return pwd_context.verify_and_update(raw, hashed)
+
+def hash_password(raw: str) -> str:
+    return _run(_hash, raw)
+
 def verify_password(raw: str, hashed: str) -> bool:
-    return pwd_context.verify(raw, hashed)
\ No newline at end of file
+    ok, _ = verify_and_update(raw, hashed)
+    return ok
+
+def verify_and_update(raw: str, hashed: str) -> tuple[bool, str | None]:
+    """คืน (ถูกต้องไหม, hash ใหม่ถ้า hash เดิมใช้พารามิเตอร์เก่า)"""
+    return _run(_verify_and_update, raw, hashed)
+
+# สำหรับ route แบบ async: รอผลบน event loop ไม่จอง thread ของ threadpool ระหว่าง hash
+async def hash_password_async(raw: str) -> str:
+    return await _run_async(_hash, raw)
+
+async def verify_and_update_async(raw: str, hashed: str) -> tuple[bool, str | None]:
+    return await _run_async(_verify_and_update, raw, hashed)
@@ -0,0 +1,103 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from config import engine
+from core import metrics
+import logging, os, select, threading
+
+log = logging.getLogger("dquests.cache_bus")
+
+# แคชในหน่วยความจำที่ใช้ตัดสินสิทธิ์ (ตัวตนจาก cookie, สมาชิกครอบครัว) ต้องเห็นการเปลี่ยนของ worker อื่นด้วย
+# คนเปลี่ยนข้อมูลยิง pg_notify ใน transaction เดียวกัน (ส่งจริงตอน commit) ทุก process มี thread LISTEN หนึ่งเส้น
+# ได้ event เมื่อไหร่ก็เลื่อน generation ; entry ในแคชติด generation ตอนโหลด รุ่นไม่ตรง = โหลดใหม่
+# ระหว่างที่ LISTEN ไม่ได้ (ยังไม่ start, หลุด) generation() เป็น None -> แคชไม่ใช้ อ่าน DB ตรง
+# ต่อติดใหม่เมื่อไหร่เลื่อน generation ทิ้งของเดิมทั้งหมด (event ระหว่างหลุดหายไปแล้ว)
+CHANNEL = "dq_cache"
+CACHE_BUS_PING = float(os.getenv("CACHE_BUS_PING", "30"))     # วินาที; เงียบนานเท่านี้ให้ลองยิง query เช็กว่าเส้นยังอยู่
+CACHE_BUS_RETRY = float(os.getenv("CACHE_BUS_RETRY", "5"))    # วินาที; รอก่อนต่อใหม่เมื่อหลุด
+
+CACHE_BUS_EVENTS = metrics.Counter("cache_bus_events_total", "Cache invalidations received from other workers")
+CACHE_BUS_CONNECTED = metrics.Gauge("cache_bus_connected", "1 while this worker is listening for cache invalidations")
+
+
+def publish(db: Session, reason: str):
+    """บอกทุก worker ให้ทิ้งแคช (ยังไม่ commit ที่นี่ ; rollback = ไม่มี event) หลัง commit ให้เรียก bump() ด้วย
+    ให้ worker ตัวเองเห็นทันทีโดยไม่ต้องรอ event วนกลับมา"""
+    db.execute(text("SELECT pg_notify(:ch, :reason)"), {"ch": CHANNEL, "reason": reason})
+
+
+class CacheBus:
+    def __init__(self):
+        self._generation = 0
+        self._listening = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def generation(self) -> int | None:
+        return self._generation if self._listening else None
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="cache-bus", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _connect(self):
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # เส้นนี้ LISTEN ค้างไว้ตลอด ไม่คืน pool
+        conn.autocommit = True
+        return conn
+
+    def run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.cursor().execute(f"LISTEN {CHANNEL}")
+                # ทิ้งของที่แคชไว้ก่อนเริ่มฟัง แล้วค่อยเปิดให้แคชใช้
+                self.bump()
+                self._listening = True
+                CACHE_BUS_CONNECTED.set(1)
+                self._listen(conn)
+            except Exception as e:
+                log.warning("cache bus: listener lost (%s), caches bypassed until it reconnects", e)
+            finally:
+                self._listening = False
+                CACHE_BUS_CONNECTED.set(0)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(CACHE_BUS_RETRY)
+
+    def _listen(self, conn):
+        idle = 0.0
+        while not self._stop.is_set():
+            # ตื่นทุกวินาทีเพื่อเช็ก stop()
+            ready, _, _ = select.select([conn], [], [], 1.0)
+            if not ready:
+                idle += 1.0
+                if idle >= CACHE_BUS_PING:
+                    idle = 0.0
+                    conn.cursor().execute("SELECT 1")  # เส้นที่ตายไปแล้วจะ raise ตรงนี้
+                continue
+            idle = 0.0
+            conn.poll()
+            if conn.notifies:
+                CACHE_BUS_EVENTS.inc(amount=len(conn.notifies))
+                conn.notifies.clear()
+                self.bump()
+
+
+cache_bus = CacheBus()
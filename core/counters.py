@@ -0,0 +1,130 @@
+from sqlalchemy import select, update, func, values, column, Integer
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from config import now_th
+from tables.kid_counters import KidCounters
+from tables.tasks import Task, TaskStatus
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.archive import ArchiveIndex
+
+RECONCILE_BATCH = 1000
+COUNTER_FIELDS = ("assigned", "submitted", "approved", "rejected", "pending_redeems")
+
+TASK_FIELD = {
+    TaskStatus.assigned: "assigned",
+    TaskStatus.submitted: "submitted",
+    TaskStatus.approved: "approved",
+    TaskStatus.rejected: "rejected",
+}
+
+# ตัวนับต่อเด็ก อัปเดตใน transaction เดียวกับการเปลี่ยนสถานะ (ยังไม่ commit ที่นี่)
+def bump(db: Session, kid_id: int, already_applied: bool = False, **deltas):
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    assignments = {k: getattr(KidCounters, k) + v for k, v in deltas.items()}
+    stmt = update(KidCounters).where(KidCounters.kid_id == kid_id).values(
+        **assignments, version=KidCounters.version + 1, updated_at=now_th())
+    if db.execute(stmt).rowcount == 0:
+        # ยังไม่มีแถวของเด็กคนนี้ -> นับจากตารางจริง แล้วค่อยบวก delta
+        # (already_applied=True เมื่อการเปลี่ยนสถานะถูกเขียนลง DB ไปแล้ว เช่น UPDATE แบบ set-based)
+        # ถ้า transaction อื่นใส่แถวไปก่อน ยอดของเขาไม่รวมการเปลี่ยนของเรา (ยังไม่ commit) ต้องบวก delta เสมอ
+        if not _insert_missing(db, kid_id) or not already_applied:
+            db.execute(stmt)
+
+def bump_many(db: Session, deltas_by_kid: dict[int, dict[str, int]], already_applied: bool = False):
+    """เหมือน bump แต่หลายคนใน UPDATE ... FROM (VALUES ...) เดียว"""
+    if not deltas_by_kid:
+        return
+    v = values(column("kid_id", Integer), *(column(f, Integer) for f in COUNTER_FIELDS), name="v").data(
+        [(kid, *(d.get(f, 0) for f in COUNTER_FIELDS)) for kid, d in deltas_by_kid.items()]
+    )
+    updated = set(db.execute(
+        update(KidCounters).where(KidCounters.kid_id == v.c.kid_id)
+        .values(updated_at=now_th(), version=KidCounters.version + 1,
+                **{f: getattr(KidCounters, f) + v.c[f] for f in COUNTER_FIELDS})
+        .returning(KidCounters.kid_id),
+        execution_options={"synchronize_session": False},
+    ).scalars())
+    for kid_id, d in deltas_by_kid.items():
+        if kid_id not in updated:
+            bump(db, kid_id, already_applied=already_applied, **d)
+
+def task_moved(db: Session, kid_id: int, old: TaskStatus | None, new: TaskStatus | None):
+    if old == new:
+        return
+    deltas = {}
+    if old is not None:
+        deltas[TASK_FIELD[old]] = -1
+    if new is not None:
+        deltas[TASK_FIELD[new]] = deltas.get(TASK_FIELD[new], 0) + 1
+    bump(db, kid_id, **deltas)
+
+def redeem_moved(db: Session, kid_id: int, old: RedeemStatus | None, new: RedeemStatus | None):
+    delta = (new == RedeemStatus.pending) - (old == RedeemStatus.pending)
+    bump(db, kid_id, pending_redeems=delta)
+
+def get_counters(db: Session, kid_id: int) -> KidCounters:
+    row = db.get(KidCounters, kid_id)
+    if row is None:
+        _insert_missing(db, kid_id)
+        db.commit()
+        row = db.get(KidCounters, kid_id)
+    return row
+
+def _computed(db: Session, kid_id: int | None):
+    counts: dict[int, dict[str, int]] = {}
+    q = select(Task.kid_id, Task.status, func.count()).group_by(Task.kid_id, Task.status)
+    if kid_id is not None:
+        q = q.where(Task.kid_id == kid_id)
+    for kid, status, n in db.execute(q):
+        counts.setdefault(kid, dict.fromkeys(COUNTER_FIELDS, 0))[TASK_FIELD[status]] = n
+
+    # งานอนุมัติแล้วที่ย้ายไปไฟล์ archive ยังนับอยู่
+    q = (select(ArchiveIndex.kid_id, ArchiveIndex.status, func.sum(ArchiveIndex.rows))
+         .where(ArchiveIndex.table_name == "tasks")
+         .group_by(ArchiveIndex.kid_id, ArchiveIndex.status))
+    if kid_id is not None:
+        q = q.where(ArchiveIndex.kid_id == kid_id)
+    for kid, status, n in db.execute(q):
+        counts.setdefault(kid, dict.fromkeys(COUNTER_FIELDS, 0))[TASK_FIELD[TaskStatus(status)]] += n
+
+    q = (select(RewardRedeem.kid_id, func.count())
+         .where(RewardRedeem.status == RedeemStatus.pending)
+         .group_by(RewardRedeem.kid_id))
+    if kid_id is not None:
+        q = q.where(RewardRedeem.kid_id == kid_id)
+    for kid, n in db.execute(q):
+        counts.setdefault(kid, dict.fromkeys(COUNTER_FIELDS, 0))["pending_redeems"] = n
+
+    if kid_id is not None and kid_id not in counts:
+        counts[kid_id] = dict.fromkeys(COUNTER_FIELDS, 0)
+    return counts
+
+def _insert_missing(db: Session, kid_id: int) -> bool:
+    """ใส่แถวแรกของเด็กจากยอดที่นับได้ ; ไม่ทับแถวที่ transaction อื่นใส่ไปแล้ว
+    (ON CONFLICT DO NOTHING รอ transaction ที่ใส่ค้างอยู่ก่อน ไม่ใช่เขียนยอดจาก snapshot เก่าทับ) คืน True ถ้าใส่เอง"""
+    vals = _computed(db, kid_id)[kid_id]
+    stmt = (insert(KidCounters).values(kid_id=kid_id, **vals, updated_at=now_th())
+            .on_conflict_do_nothing(index_elements=[KidCounters.kid_id]).returning(KidCounters.kid_id))
+    return db.execute(stmt).first() is not None
+
+def reconcile(db: Session, kid_id: int | None = None) -> int:
+    """Rebuild counters from tasks/reward_redeems. kid_id=None rebuilds every kid."""
+    counts = _computed(db, kid_id)
+    if kid_id is None:
+        # ไม่ลบแถวทิ้ง: ล้างเป็น 0 แล้ว upsert ทับ ให้ version เดินหน้าต่อ (ETag เก่าจะไม่กลับมาตรง)
+        db.execute(update(KidCounters).values(version=KidCounters.version + 1, updated_at=now_th(),
+                                              **dict.fromkeys(COUNTER_FIELDS, 0)))
+    if not counts:
+        return 0
+    rows = [{"kid_id": kid, **vals, "updated_at": now_th()} for kid, vals in counts.items()]
+    for i in range(0, len(rows), RECONCILE_BATCH):
+        stmt = insert(KidCounters).values(rows[i:i + RECONCILE_BATCH])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[KidCounters.kid_id],
+            set_={**{k: stmt.excluded[k] for k in (*COUNTER_FIELDS, "updated_at")},
+                  "version": KidCounters.version + 1},
+        )
+        db.execute(stmt)
+    return len(rows)
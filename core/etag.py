@@ -0,0 +1,74 @@
+from fastapi import Request, Response
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+from pathlib import Path
+from config import now_th
+from tables.users import Users, RoleEnum
+from tables.kid_counters import KidCounters
+from tables.rewards import Reward
+from utils.family import family_index
+import hashlib
+
+# ETag ของหน้า = hash ของ "เลข version" ที่อ่านได้ใน query เดียว ถ้า browser ส่ง If-None-Match ตรง
+# ตอบ 304 เลยโดยไม่ query งาน/รางวัลและไม่ render template
+#   เด็ก: kid_counters.version (+1 ทุกครั้งที่งาน/คำขอแลกของเด็กเปลี่ยน), users.update_date (แต้ม)
+#   ผู้ปกครอง: update_date ของตัวเอง (touch() ตอนเพิ่มรางวัล/งานประจำ) + ของเด็กในครอบครัวทั้งหมด
+#   ทั้งคู่: สมาชิกครอบครัวจาก family_index และรางวัลของผู้ปกครองในครอบครัว (เพิ่มได้อย่างเดียว ใช้ max id)
+
+# template เปลี่ยนตอน deploy -> ETag เก่าต้องใช้ไม่ได้
+_TEMPLATES = Path(__file__).resolve().parent.parent / "templates"
+TEMPLATE_STAMP = str(max((p.stat().st_mtime_ns for p in _TEMPLATES.glob("*.html")), default=0))
+
+
+def touch(db: Session, user_id: int):
+    """บอกว่าหน้าของ user นี้เปลี่ยน ทั้งที่ไม่มีตัวนับไหนขยับ (ยังไม่ commit ที่นี่)"""
+    db.execute(update(Users).where(Users.id == user_id).values(update_date=now_th()))
+
+
+def _family_part(db: Session, user_id: int) -> tuple:
+    fams = sorted(family_index.family_ids(db, user_id))
+    return tuple((fid, info.members) for fid in fams if (info := family_index.family(db, fid)))
+
+
+def kid_stamp(db: Session, kid_id: int) -> tuple:
+    fam = _family_part(db, kid_id)
+    parent_ids = sorted({uid for _, members in fam for uid, role in members if role == RoleEnum.parent.value})
+    row = db.execute(
+        select(Users.update_date, KidCounters.version,
+               select(func.max(Reward.id)).where(Reward.parent_id.in_(parent_ids)).scalar_subquery())
+        .outerjoin(KidCounters, KidCounters.kid_id == Users.id)
+        .where(Users.id == kid_id)
+    ).first()
+    return (kid_id, tuple(row or ()), fam)
+
+
+def parent_stamp(db: Session, pid: int) -> tuple:
+    fam = _family_part(db, pid)
+    kid_ids = sorted({uid for _, members in fam for uid, role in members if role == RoleEnum.kid.value})
+    users_q = select(func.max(Users.update_date)).where(Users.id.in_([pid, *kid_ids]))
+    versions_q = select(func.coalesce(func.sum(KidCounters.version), 0)).where(KidCounters.kid_id.in_(kid_ids))
+    row = db.execute(select(users_q.scalar_subquery(), versions_q.scalar_subquery(),
+                            select(func.max(Reward.id)).where(Reward.parent_id == pid).scalar_subquery())).first()
+    return (pid, tuple(row), fam)
+
+
+def make(request: Request, stamp: tuple) -> str:
+    raw = repr((TEMPLATE_STAMP, request.url.path, request.url.query, stamp)).encode()
+    return 'W/"' + hashlib.sha1(raw).hexdigest() + '"'
+
+
+def not_modified(request: Request, tag: str) -> Response | None:
+    sent = request.headers.get("if-none-match", "")
+    if tag in (t.strip() for t in sent.split(",")):
+        return Response(status_code=304, headers=_headers(tag))
+    return None
+
+
+def _headers(tag: str) -> dict:
+    # หน้าส่วนตัว: ห้าม proxy เก็บ และ browser ต้องถามใหม่ทุกครั้ง (ถามแล้วได้ 304 ถูก)
+    return {"ETag": tag, "Cache-Control": "private, no-cache"}
+
+
+def tag_response(response: Response, tag: str) -> Response:
+    response.headers.update(_headers(tag))
+    return response
@@ -0,0 +1,193 @@
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from config import ASYNC_DATABASE_URL
+from core import metrics
+from utils.family import family_of
+import asyncio, asyncpg, logging, orjson, os
+
+log = logging.getLogger("dquests.live")
+
+# คิวงานรอตรวจ/คำขอแลกแบบสด: route เขียนยิง NOTIFY ลง channel ของครอบครัวใน transaction เดียวกัน
+# (Postgres ส่งตอน commit เท่านั้น ถ้า rollback ก็ไม่มี event) แต่ละ worker มี connection LISTEN
+# เพียงเส้นเดียว (LiveHub) กระจาย event ให้ stream SSE ของผู้ปกครองที่เปิดหน้าอยู่
+CHANNEL_PREFIX = "dq_family_"
+LIVE_MAX_STREAMS = int(os.getenv("LIVE_MAX_STREAMS", "200"))    # ต่อ worker
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))       # วินาที; ส่ง comment กัน proxy ตัด + เจอ client ที่หลุด
+# stream ปิดตัวเองเมื่ออายุครบ (client ต่อใหม่ทันที) ไม่งั้น worker ที่กำลังปิดต้องรอ stream ที่ไม่มีวันจบ
+LIVE_MAX_AGE = float(os.getenv("LIVE_MAX_AGE", "300"))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))      # event ค้างต่อ stream เกินนี้ = client ช้า ให้โหลดหน้าใหม่
+MESSAGE_PREVIEW = 500                                           # payload ของ NOTIFY จำกัด 8000 byte
+
+
+def channel(family_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{family_id}"
+
+
+def publish(db: Session, for_kid: int, event: str, **data):
+    """ส่ง event ไปครอบครัวของเด็ก for_kid (ยังไม่ commit ที่นี่ ; ส่งจริงตอน route commit)"""
+    fam = family_of(db, for_kid)
+    if fam is None:
+        return
+    payload = orjson.dumps({"event": event, **data}).decode()
+    db.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": channel(fam.id), "payload": payload})
+
+
+def submission_added(db: Session, sub, task, kid_name: str):
+    db.flush()  # ต้องได้ sub.id ก่อน
+    publish(db, task.kid_id, "submission", parent_id=task.parent_id, id=sub.id, task_id=task.id,
+            task_title=task.title, task_points=task.points, kid_id=task.kid_id, kid_name=kid_name,
+            message=(sub.message or "")[:MESSAGE_PREVIEW], evidence_path=sub.evidence_path)
+
+
+def redeem_added(db: Session, rr, reward, kid_name: str):
+    db.flush()
+    publish(db, rr.kid_id, "redeem", parent_id=reward.parent_id, id=rr.id, kid_id=rr.kid_id, kid_name=kid_name,
+            reward_name=reward.name, cost=reward.cost)
+
+
+def done(db: Session, kid_id: int, parent_id: int, kind: str, ids: list[int]):
+    """kind = "submission" | "redeem" ; ส่งถึงเฉพาะ stream ของผู้ปกครอง parent_id (เจ้าของรายการ)
+    แถวที่ตัดสินแล้วหายจากหน้าคิวที่ผู้ปกครองคนนั้นเปิดค้างไว้ในแท็บ/เครื่องอื่น"""
+    if ids:
+        publish(db, kid_id, f"{kind}_done", parent_id=parent_id, ids=ids)
+
+
+class Stream:
+    __slots__ = ("parent_id", "families", "queue", "resync", "closed")
+
+    def __init__(self, parent_id: int, families: tuple[int, ...]):
+        self.parent_id = parent_id
+        self.families = families
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self.resync = False
+        self.closed = False
+
+    def push(self, event: str, raw: str):
+        if self.resync:
+            return
+        try:
+            self.queue.put_nowait((event, raw))
+        except asyncio.QueueFull:
+            # ไม่ทันแล้ว ทิ้งที่ค้างทั้งหมด ให้ client โหลดคิวใหม่ทีเดียว
+            self.resync = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("resync", "{}"))
+
+
+LIVE_STREAMS = metrics.Gauge("live_streams", "Open SSE streams in this worker")
+LIVE_EVENTS = metrics.Counter("live_events_total", "NOTIFY events received by the worker listener", ("event",))
+LIVE_REJECTED = metrics.Counter("live_streams_rejected_total", "SSE streams refused because the worker was full")
+
+
+class LiveHub:
+    """connection LISTEN เส้นเดียวต่อ worker ; LISTEN channel ของครอบครัวเมื่อมีคนแรกเปิด
+    และ UNLISTEN เมื่อคนสุดท้ายปิด ถ้า connection หลุดจะต่อใหม่ตอน heartbeat แล้วให้ทุก stream resync"""
+
+    def __init__(self, dsn: str | None, max_streams: int = LIVE_MAX_STREAMS):
+        self.dsn = dsn
+        self.max_streams = max_streams
+        self._conn: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._subs: dict[int, set[Stream]] = {}
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    async def subscribe(self, parent_id: int, families) -> Stream | None:
+        if self._count >= self.max_streams:
+            LIVE_REJECTED.inc()
+            return None
+        stream = Stream(parent_id, tuple(families))
+        # จองที่ก่อน await (subscribe พร้อมกันจะได้ไม่เกิน max_streams) ลงทะเบียนไม่สำเร็จต้องคืนที่
+        self._count += 1
+        LIVE_STREAMS.set(self._count)
+        try:
+            async with self._lock:
+                for fid in stream.families:
+                    subs = self._subs.setdefault(fid, set())
+                    subs.add(stream)
+                    if len(subs) == 1 and self._conn is not None and not self._conn.is_closed():
+                        await self._conn.add_listener(channel(fid), self._on_notify)
+                await self._connect()
+        except BaseException:
+            await self.unsubscribe(stream)
+            raise
+        return stream
+
+    async def unsubscribe(self, stream: Stream):
+        """เรียกซ้ำได้ คืนที่ครั้งเดียว"""
+        if stream.closed:
+            return
+        stream.closed = True
+        self._count -= 1
+        LIVE_STREAMS.set(self._count)
+        async with self._lock:
+            for fid in stream.families:
+                subs = self._subs.get(fid)
+                if subs is None:
+                    continue
+                subs.discard(stream)
+                if not subs:
+                    del self._subs[fid]
+                    if self._conn is not None and not self._conn.is_closed():
+                        await self._conn.remove_listener(channel(fid), self._on_notify)
+            if not self._subs and self._conn is not None:
+                # ไม่มีใครดูแล้ว ปล่อย connection คืน Postgres
+                conn, self._conn = self._conn, None
+                await conn.close()
+
+    async def ensure(self):
+        """เรียกทุก heartbeat: ถ้า connection หลุดไปให้ต่อใหม่"""
+        if self._conn is None or self._conn.is_closed():
+            async with self._lock:
+                await self._connect()
+
+    async def _connect(self):
+        if (self._conn is not None and not self._conn.is_closed()) or not self._subs:
+            return
+        reconnect = self._conn is not None
+        self._conn = None
+        try:
+            conn = await asyncpg.connect(self.dsn)
+        except (OSError, asyncpg.PostgresError) as e:
+            log.warning("live listener: cannot connect (%s), retrying on next heartbeat", e)
+            return
+        conn.add_termination_listener(self._on_terminate)
+        for fid in self._subs:
+            await conn.add_listener(channel(fid), self._on_notify)
+        self._conn = conn
+        if reconnect:
+            # event ระหว่างที่หลุดหายไปแล้ว ให้ทุกหน้าโหลดคิวใหม่
+            for subs in self._subs.values():
+                for s in subs:
+                    s.push("resync", "{}")
+
+    def _on_terminate(self, conn):
+        # ต่อใหม่ใน ensure() ตอน heartbeat ถัดไป แล้วค่อยสั่ง resync
+        log.warning("live listener connection closed")
+
+    def _on_notify(self, conn, pid, chan: str, payload: str):
+        try:
+            fid = int(chan[len(CHANNEL_PREFIX):])
+            data = orjson.loads(payload)
+        except ValueError:
+            log.warning("live: bad payload on %s", chan)
+            return
+        event = data.get("event", "message")
+        LIVE_EVENTS.inc(event)
+        for s in self._subs.get(fid, ()):
+            if data.get("parent_id") in (None, s.parent_id):
+                s.push(event, payload)
+
+
+def _listen_dsn() -> str | None:
+    if not ASYNC_DATABASE_URL:
+        return None
+    return make_url(ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+live_hub = LiveHub(_listen_dsn())
@@ -0,0 +1,107 @@
+import bisect, threading
+
+# registry เล็ก ๆ สำหรับ /metrics ในรูปแบบ text ของ Prometheus (ไม่ต้องพึ่ง prometheus_client)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            out.extend(self._lines(key, value))
+        return out
+
+    def _lines(self, key, value):
+        return [f"{self.name}{_labels(self.labels, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, value: float, *labels):
+        """สำหรับ collector ที่ยอดสะสมนับอยู่ที่อื่นแล้ว (เช่น notify.stats())"""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            h = self._values.get(labels)
+            if h is None:
+                h = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                h[0][i] += 1
+            h[1] += 1
+            h[2] += value
+
+    def _lines(self, key, value):
+        counts, total, sum_ = value
+        out, running = [], 0
+        for le, n in zip(self.buckets, counts):
+            running += n
+            le_label = 'le="%s"' % le
+            out.append(f"{self.name}_bucket{_labels(self.labels, key, le_label)} {running}")
+        inf_label = 'le="+Inf"'
+        out.append(f"{self.name}_bucket{_labels(self.labels, key, inf_label)} {total}")
+        out.append(f"{self.name}_sum{_labels(self.labels, key)} {sum_}")
+        out.append(f"{self.name}_count{_labels(self.labels, key)} {total}")
+        return out
+
+
+REGISTRY: list[_Metric] = []
+# ฟังก์ชันที่ถูกเรียกก่อน render ทุกครั้ง ใช้อัปเดต gauge จากแหล่งอื่น (pool, notify)
+COLLECTORS: list = []
+
+
+def render() -> str:
+    for collect in COLLECTORS:
+        collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
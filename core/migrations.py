@@ -0,0 +1,82 @@
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import logging, os, re
+
+log = logging.getLogger("dquests.migrations")
+
+# ไฟล์ migration: migrations/NNNN_ชื่อ.sql รันเรียงตามเลข แต่ละไฟล์อยู่ใน transaction ของตัวเอง
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+# 1 = ถ้า schema ใน DB เก่ากว่าโค้ด ให้ app ไม่ยอม start (ค่าเริ่มต้นแค่ log เตือน)
+SCHEMA_CHECK_STRICT = os.getenv("SCHEMA_CHECK_STRICT", "0") == "1"
+_LOCK_KEY = 7201501  # pg advisory lock กันสอง process migrate พร้อมกัน
+_FILE = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def available() -> list[tuple[int, Path]]:
+    found = []
+    for p in MIGRATIONS_DIR.iterdir():
+        m = _FILE.match(p.name)
+        if m:
+            found.append((int(m.group(1)), p))
+    return sorted(found)
+
+
+def latest() -> int:
+    files = available()
+    return files[-1][0] if files else 0
+
+
+def current_version(conn) -> int:
+    if conn.scalar(text("SELECT to_regclass('schema_version')")) is None:
+        return 0
+    return conn.scalar(text("SELECT version FROM schema_version")) or 0
+
+
+def migrate(engine: Engine, target: int | None = None, report=None) -> list[int]:
+    """รัน migration ที่ยังไม่ได้รันจนถึง target (ไม่ใส่ = ล่าสุด) คืนเลขที่รันไป"""
+    applied = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _LOCK_KEY})
+        try:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+            if conn.scalar(text("SELECT count(*) FROM schema_version")) == 0:
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+            conn.commit()
+            cur = current_version(conn)
+            for version, path in available():
+                if version <= cur or (target is not None and version > target):
+                    continue
+                conn.exec_driver_sql(path.read_text(encoding="utf-8"))
+                conn.execute(text("UPDATE schema_version SET version = :v"), {"v": version})
+                conn.commit()
+                applied.append(version)
+                if report:
+                    report(version, path.name)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+            conn.commit()
+    return applied
+
+
+def check(engine: Engine):
+    """เช็กตอน start: query แถวเดียว ไม่ reflect ตาราง และไม่ทำให้ app boot ไม่ขึ้นถ้า DB ยังไม่พร้อม"""
+    want = latest()
+    try:
+        with engine.connect() as conn:
+            have = current_version(conn)
+    except Exception as e:
+        log.warning("schema check skipped, database unreachable: %s", e)
+        return
+    if have < want:
+        msg = f"database schema is at version {have}, code expects {want}; run `python manage.py migrate`"
+        if SCHEMA_CHECK_STRICT:
+            raise SchemaOutdated(msg)
+        log.error(msg)
+    elif have > want:
+        log.warning("database schema version %s is newer than this code (%s)", have, want)
@@ -1,12 +1,123 @@
-from winotify import Notification
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from core import metrics
+import logging, os, sys, threading
 
-def toast(title: str, msg: str):
-    try:
-        toast = Notification(app_id="D-Quests",
-                             title=title,
-                             msg=msg,
-                             duration="short")
+log = logging.getLogger("dquests.notify")
+
+NOTIFY_BACKEND = os.getenv("NOTIFY_BACKEND", "winotify" if sys.platform == "win32" else "log")
+DIGEST_PREVIEW = 3
+
+
+@dataclass
+class Notice:
+    recipient_id: int | None
+    kind: str
+    title: str
+    msg: str
+
+
+class NotifyBackend(ABC):
+    @abstractmethod
+    def send(self, recipient_id: int | None, title: str, msg: str):
+        ...
+
+
+class NoopBackend(NotifyBackend):
+    def send(self, recipient_id, title, msg):
+        pass
+
+
+class LogBackend(NotifyBackend):
+    def send(self, recipient_id, title, msg):
+        log.info("[notify user=%s] %s: %s", recipient_id, title, msg)
+
+
+class WinotifyBackend(NotifyBackend):
+    def __init__(self):
+        from winotify import Notification  # มีเฉพาะบน Windows
+        self._Notification = Notification
+
+    def send(self, recipient_id, title, msg):
+        toast = self._Notification(app_id="D-Quests", title=title, msg=msg, duration="short")
         toast.set_audio(sound=None, loop=False)
         toast.show()
+
+
+BACKENDS = {"noop": NoopBackend, "log": LogBackend, "winotify": WinotifyBackend}
+
+
+def make_backend(name: str) -> NotifyBackend:
+    try:
+        return BACKENDS[name]()
     except Exception as e:
-        print(f"[WinNotify Error] {e}")
\ No newline at end of file
+        log.warning("notify backend %r unavailable (%s), falling back to log", name, e)
+        return LogBackend()
+
+
+def digest(items: list[Notice]) -> tuple[str, str]:
+    if len(items) == 1:
+        return items[0].title, items[0].msg
+    n = len(items)
+    lines = [it.msg for it in items[:DIGEST_PREVIEW]]
+    if n > DIGEST_PREVIEW:
+        lines.append(f"และอีก {n - DIGEST_PREVIEW} รายการ")
+    return f"{items[0].title} ({n} รายการ)", "\n".join(lines)
+
+
+class Dispatcher:
+    # แจ้งเตือนทุกอันมาทาง outbox (core/outbox.py): เก็บใน DB พร้อม commit ของ route ลองใหม่เองเมื่อส่งไม่ได้
+    # และหยิบมาเป็นชุด -> deliver รวมข้อความในชุดเดียวกันต่อผู้รับ ; ที่นี่จึงไม่มีคิวในหน่วยความจำของตัวเอง
+    def __init__(self, backend: NotifyBackend):
+        self.backend = backend
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        # ตัวนับ: outbox worker หลาย thread เรียก deliver พร้อมกันได้
+        self._lock = threading.Lock()
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, n in deltas.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sent": self.sent, "coalesced": self.coalesced, "failed": self.failed}
+
+    def deliver(self, batch: list[Notice]):
+        """ส่งทันที (รวมเป็นข้อความเดียวต่อผู้รับ/ชนิด) ; ถ้ามีกลุ่มไหนส่งไม่ได้ raise หลังลองครบทุกกลุ่ม
+        outbox worker ใช้ตัวนี้แล้วลองใหม่ทั้งชุด (ผู้รับที่ส่งไปแล้วอาจได้ซ้ำ)"""
+        groups: dict[tuple, list[Notice]] = {}
+        for n in batch:
+            groups.setdefault((n.recipient_id, n.kind), []).append(n)
+        error = None
+        for (recipient_id, _), items in groups.items():
+            title, msg = digest(items)
+            try:
+                self.backend.send(recipient_id, title, msg)
+                self._count(sent=1, coalesced=len(items) - 1)
+            except Exception as e:
+                self._count(failed=1)
+                error = e
+        if error is not None:
+            raise error
+
+
+dispatcher = Dispatcher(make_backend(NOTIFY_BACKEND))
+
+
+def stats() -> dict:
+    return dispatcher.stats()
+
+
+NOTIFY_EVENTS = metrics.Counter("notify_events_total", "Notification outcomes", ("outcome",))
+
+
+def _collect():
+    s = dispatcher.stats()
+    for outcome in ("sent", "coalesced", "failed"):
+        NOTIFY_EVENTS.set_total(s[outcome], outcome)
+
+
+metrics.COLLECTORS.append(_collect)
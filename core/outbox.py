@@ -0,0 +1,169 @@
+from datetime import timedelta
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from config import SessionLocal, now_th
+from tables.outbox import OutboxEvent
+from core import metrics, notify as notify_mod
+import logging, os, threading
+
+log = logging.getLogger("dquests.outbox")
+
+# route เขียน event ลงตาราง outbox ใน transaction เดียวกับการเปลี่ยนข้อมูล แล้ว worker หยิบไปทำหลัง commit
+# หลาย worker (thread ใน app หรือ `manage.py outbox-worker`) รันพร้อมกันได้: หยิบด้วย FOR UPDATE SKIP LOCKED
+# ส่งแบบ at-least-once: handler ต้องทนการเรียกซ้ำได้
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))      # วินาที ; เท่าตัวทุกครั้งที่พลาด
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "600"))
+# 1 = รัน worker เป็น thread ใน process ของ app (ค่าเริ่มต้น ไม่ต้องเปิดอะไรเพิ่ม) ; 0 = รัน manage.py outbox-worker แยก
+OUTBOX_EMBEDDED = os.getenv("OUTBOX_EMBEDDED", "1") == "1"
+ERROR_PREVIEW = 500
+
+HANDLERS: dict = {}
+
+
+def handler(topic: str):
+    """ลงทะเบียน fn(db, payloads: list[dict]) ; ได้ทุก event ของ topic นี้ในชุดที่หยิบมา
+    raise = ทั้งชุดถูกลองใหม่ตาม backoff (งาน DB ที่ handler ทำใน db จะ rollback เฉพาะของชุดนั้น)"""
+    def register(fn):
+        HANDLERS[topic] = fn
+        return fn
+    return register
+
+
+def add(db: Session, topic: str, **payload):
+    """ยังไม่ commit ที่นี่ ; เกิดจริงพร้อม commit ของ route"""
+    db.add(OutboxEvent(topic=topic, payload=payload))
+
+
+def notify(db: Session, recipient_id: int | None, kind: str, title: str, msg: str):
+    add(db, "notify", recipient_id=recipient_id, kind=kind, title=title, msg=msg)
+
+
+@handler("notify")
+def _deliver_notices(db: Session, payloads: list[dict]):
+    notify_mod.dispatcher.deliver([notify_mod.Notice(**p) for p in payloads])
+
+
+def backoff(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+
+
+OUTBOX_EVENTS = metrics.Counter("outbox_events_total", "Outbox events handled by this process", ("topic", "outcome"))
+OUTBOX_LAG = metrics.Histogram("outbox_lag_seconds", "Time from enqueue to successful handling", ("topic",))
+OUTBOX_PENDING = metrics.Gauge("outbox_pending", "Outbox events waiting to be handled (all workers)")
+OUTBOX_OLDEST = metrics.Gauge("outbox_oldest_age_seconds", "Age of the oldest unhandled outbox event")
+OUTBOX_FAILED = metrics.Gauge("outbox_failed", "Outbox events that used up their retries")
+
+
+def run_once(db: Session, batch: int = OUTBOX_BATCH) -> int:
+    """หยิบ event ที่ถึงเวลาแล้วชุดหนึ่ง ทำ แล้ว commit ; คืนจำนวนที่หยิบได้"""
+    events = db.scalars(
+        select(OutboxEvent)
+        .where(OutboxEvent.failed_at.is_(None), OutboxEvent.available_at <= now_th())
+        .order_by(OutboxEvent.id)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not events:
+        db.rollback()
+        return 0
+
+    by_topic: dict[str, list[OutboxEvent]] = {}
+    for ev in events:
+        by_topic.setdefault(ev.topic, []).append(ev)
+    done = []
+    for topic, evs in by_topic.items():
+        fn = HANDLERS.get(topic)
+        try:
+            if fn is None:
+                raise LookupError(f"no outbox handler for topic {topic!r}")
+            with db.begin_nested():
+                fn(db, [ev.payload for ev in evs])
+        except Exception as e:
+            now = now_th()
+            for ev in evs:
+                ev.attempts += 1
+                ev.last_error = repr(e)[:ERROR_PREVIEW]
+                if ev.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    ev.failed_at = now
+                else:
+                    ev.available_at = now + timedelta(seconds=backoff(ev.attempts))
+            gave_up = sum(ev.failed_at is not None for ev in evs)
+            OUTBOX_EVENTS.inc(topic, "retry", amount=len(evs) - gave_up)
+            OUTBOX_EVENTS.inc(topic, "failed", amount=gave_up)
+            log.warning("outbox %s: %d event(s) failed (%d gave up): %s", topic, len(evs), gave_up, e)
+            continue
+        now = now_th()
+        for ev in evs:
+            OUTBOX_LAG.observe((now - ev.created_at).total_seconds(), topic)
+        OUTBOX_EVENTS.inc(topic, "ok", amount=len(evs))
+        done.extend(ev.id for ev in evs)
+    if done:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(done)), execution_options={"synchronize_session": False})
+    db.commit()
+    return len(events)
+
+
+class Worker:
+    def __init__(self, session_factory=SessionLocal, batch: int = OUTBOX_BATCH, poll: float = OUTBOX_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.batch = batch
+        self.poll = poll
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    n = run_once(db, self.batch)
+            except Exception:
+                log.exception("outbox worker: batch failed")
+                n = 0
+            # ชุดเต็ม = ยังมีค้าง หยิบต่อทันที
+            if n < self.batch:
+                self._stop.wait(self.poll)
+
+
+worker = Worker()
+
+
+def stats(db: Session) -> dict:
+    now = now_th()
+    pending, oldest = db.execute(
+        select(func.count(), func.min(OutboxEvent.created_at)).where(OutboxEvent.failed_at.is_(None))
+    ).one()
+    failed = db.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.failed_at.is_not(None)))
+    return {
+        "pending": pending,
+        "oldest_age_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0,
+        "failed": failed,
+    }
+
+
+def _collect():
+    try:
+        with SessionLocal() as db:
+            s = stats(db)
+    except Exception as e:
+        log.debug("outbox stats unavailable: %s", e)
+        return
+    OUTBOX_PENDING.set(s["pending"])
+    OUTBOX_OLDEST.set(s["oldest_age_seconds"])
+    OUTBOX_FAILED.set(s["failed"])
+
+
+metrics.COLLECTORS.append(_collect)
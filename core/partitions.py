@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from config import now_th, TH_TZ
+import logging, os, re
+
+log = logging.getLogger("dquests.partitions")
+
+# tasks / reward_redeems แบ่ง partition รายเดือนตาม created_at (migrations/0006)
+PARTITIONED = ("tasks", "reward_redeems")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+_NAME = re.compile(r"^(\w+)_y(\d{4})m(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    """ช่วงเวลาของเดือน (เวลาไทย) เหมือนขอบของ partition"""
+    lo = TH_TZ.localize(datetime(month.year, month.month, 1))
+    return lo, TH_TZ.localize(datetime.combine(add_months(month, 1), datetime.min.time()))
+
+
+def ensure(db: Session, first: date | None = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """สร้าง partition ตั้งแต่เดือนของ first (ไม่ใส่ = เดือนนี้) ถึงอีก months_ahead เดือนข้างหน้า ; ไม่ commit"""
+    today = now_th().date()
+    first = month_start(first or today)
+    last = add_months(today, months_ahead)
+    created = 0
+    for table in PARTITIONED:
+        created += db.execute(text("SELECT dq_ensure_month_partitions(:t, :a, :b)"),
+                              {"t": table, "a": first, "b": last}).scalar()
+        left = db.execute(text(f"SELECT count(*) FROM {table}_default")).scalar()
+        if left:
+            log.warning("%s_default still holds %d rows outside the monthly partitions", table, left)
+    return created
+
+
+def partitions(db: Session, table: str) -> list[tuple[str, date]]:
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:t AS regclass)"
+    ), {"t": table}).scalars()
+    out = []
+    for name in names:
+        m = _NAME.match(name)
+        if m and m.group(1) == table:
+            out.append((name, date(int(m.group(2)), int(m.group(3)), 1)))
+    return sorted(out, key=lambda p: p[1])
+
+
+def drop_empty(db: Session, before: date) -> list[str]:
+    """ทิ้ง partition ที่ว่างแล้วของเดือนก่อน `before` (หลัง archive เดือนเก่า ๆ มักเหลือแต่ partition เปล่า) ; ไม่ commit"""
+    dropped = []
+    for table in PARTITIONED:
+        for name, month in partitions(db, table):
+            if add_months(month, 1) > before:
+                break
+            if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+                continue
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
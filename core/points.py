@@ -0,0 +1,96 @@
+from datetime import datetime
+from sqlalchemy import update, select, insert, func, literal, values, column, Integer
+from sqlalchemy.orm import Session
+from config import now_th
+from tables.users import Users, RoleEnum
+from tables.points_ledger import PointsLedger, PointsSnapshot
+from core import rollups
+
+# ทุกการเปลี่ยนแต้มผ่านที่นี่: UPDATE ... RETURNING แบบ atomic + บันทึก ledger และยอดรายวัน (rollups)
+# ใน transaction เดียวกัน
+# (ยังไม่ commit ให้ route commit พร้อมการเปลี่ยนสถานะ)
+
+def _apply(db: Session, kid_id: int, delta: int, reason: str, *, task_id=None, redeem_id=None,
+           require_balance: bool = False) -> int | None:
+    stmt = update(Users).where(Users.id == kid_id)
+    if require_balance:
+        stmt = stmt.where(Users.points >= -delta)
+    stmt = stmt.values(points=Users.points + delta).returning(Users.points)
+    balance = db.execute(stmt, execution_options={"synchronize_session": False}).scalar()
+    if balance is None:
+        return None
+    db.add(PointsLedger(kid_id=kid_id, delta=delta, balance_after=balance, reason=reason,
+                        task_id=task_id, redeem_id=redeem_id))
+    return balance
+
+def award(db: Session, kid_id: int, points: int, reason: str = "task_approved", **refs) -> int | None:
+    balance = _apply(db, kid_id, points or 0, reason, **refs)
+    if balance is not None:
+        rollups.add(db, {kid_id: {"points_earned": points or 0, "tasks_completed": int(refs.get("task_id") is not None)}})
+    return balance
+
+def spend(db: Session, kid_id: int, cost: int, reason: str = "redeem_approved", **refs) -> int | None:
+    """หักแต้มถ้าพอ คืนยอดคงเหลือ หรือ None ถ้าแต้มไม่พอ"""
+    balance = _apply(db, kid_id, -(cost or 0), reason, require_balance=True, **refs)
+    if balance is not None:
+        rollups.add(db, {kid_id: {"points_spent": cost or 0}})
+    return balance
+
+def award_many(db: Session, awards: list[tuple[int, int, int | None]], reason: str = "task_approved") -> dict[int, int]:
+    """awards = [(kid_id, points, task_id), ...] -> UPDATE เดียวต่อทั้งชุด คืน {kid_id: ยอดใหม่}"""
+    per_kid: dict[int, int] = {}
+    for kid_id, pts, _ in awards:
+        per_kid[kid_id] = per_kid.get(kid_id, 0) + (pts or 0)
+    if not per_kid:
+        return {}
+    v = values(column("kid_id", Integer), column("delta", Integer), name="v").data(list(per_kid.items()))
+    balances = dict(db.execute(
+        update(Users).where(Users.id == v.c.kid_id)
+        .values(points=Users.points + v.c.delta)
+        .returning(Users.id, Users.points),
+        execution_options={"synchronize_session": False},
+    ).all())
+    # ย้อนคำนวณ balance_after ของแต่ละแถวจากยอดสุดท้าย
+    running = dict(balances)
+    rows = []
+    for kid_id, pts, task_id in reversed(awards):
+        if kid_id not in running:
+            continue
+        rows.append({"kid_id": kid_id, "delta": pts or 0, "balance_after": running[kid_id],
+                     "reason": reason, "task_id": task_id, "redeem_id": None, "created_at": now_th()})
+        running[kid_id] -= pts or 0
+    if rows:
+        db.execute(insert(PointsLedger), rows[::-1])
+    stats: dict[int, dict[str, int]] = {}
+    for kid_id, pts, task_id in awards:
+        if kid_id in balances:
+            d = stats.setdefault(kid_id, {"points_earned": 0, "tasks_completed": 0})
+            d["points_earned"] += pts or 0
+            d["tasks_completed"] += task_id is not None
+    rollups.add(db, stats)
+    return balances
+
+def snapshot(db: Session, as_of: datetime | None = None) -> int:
+    as_of = as_of or now_th()
+    # ledger ของเด็กคนเดียวกันเรียง id ตามลำดับจริง (ทุกการเปลี่ยนล็อกแถว users ไว้)
+    # และ INSERT ... SELECT เดียวเห็นข้อมูลชุดเดียวกัน -> points ตรงกับ ledger ถึง last_id ของคนนั้น
+    last_id = (select(func.coalesce(func.max(PointsLedger.id), 0))
+               .where(PointsLedger.kid_id == Users.id).scalar_subquery())
+    res = db.execute(insert(PointsSnapshot).from_select(
+        ["kid_id", "as_of", "balance", "last_ledger_id"],
+        select(Users.id, literal(as_of), Users.points, last_id).where(Users.role == RoleEnum.kid),
+    ))
+    return res.rowcount
+
+def balance_at(db: Session, kid_id: int, at: datetime) -> int:
+    snap = db.execute(
+        select(PointsSnapshot.balance, PointsSnapshot.last_ledger_id)
+        .where(PointsSnapshot.kid_id == kid_id, PointsSnapshot.as_of <= at)
+        .order_by(PointsSnapshot.as_of.desc()).limit(1)
+    ).first()
+    base, after_id = snap if snap else (0, 0)
+    delta = db.execute(
+        select(func.coalesce(func.sum(PointsLedger.delta), 0))
+        .where(PointsLedger.kid_id == kid_id, PointsLedger.id > after_id, PointsLedger.created_at <= at)
+    ).scalar()
+    return base + delta
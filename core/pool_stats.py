@@ -0,0 +1,99 @@
+from sqlalchemy import exc
+from core import metrics
+import logging, os, threading, time
+
+log = logging.getLogger("dquests.pool")
+
+# รอ connection นานกว่านี้ (ms) จะ log เตือน -> สัญญาณว่า pool เล็กไปสำหรับจำนวน worker/request
+POOL_WAIT_WARN_MS = float(os.getenv("POOL_WAIT_WARN_MS", "100"))
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow = 0
+        self.timeouts = 0
+
+    def record(self, name: str, waited: float, timeout: bool = False):
+        with self.lock:
+            self.checkouts += not timeout
+            self.timeouts += timeout
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            slow = waited * 1000 >= POOL_WAIT_WARN_MS
+            self.slow += slow
+        if timeout:
+            log.error("pool %s: checkout timed out after %.0fms", name, waited * 1000)
+        elif slow:
+            log.warning("pool %s: waited %.0fms for a connection", name, waited * 1000)
+
+
+_stats: dict[str, _Stats] = {}
+_engines: dict[str, object] = {}
+
+
+class _TimedPool:
+    """จับเวลาที่รอ connection จาก pool (ใส่หน้า QueuePool/AsyncAdaptedQueuePool)"""
+    stats_name = ""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            _stats[self.stats_name].record(self.stats_name, time.perf_counter() - t0, timeout=True)
+            raise
+        _stats[self.stats_name].record(self.stats_name, time.perf_counter() - t0)
+        return conn
+
+
+def timed_pool(base, name: str):
+    """คืนคลาส pool ที่นับสถิติใต้ชื่อ `name`; ผูกไว้ที่คลาสจึงอยู่รอดตอน pool.recreate()"""
+    _stats.setdefault(name, _Stats())
+    return type(f"Timed{base.__name__}", (_TimedPool, base), {"stats_name": name})
+
+
+def register(name: str, engine):
+    _engines[name] = engine
+
+
+def snapshot() -> dict:
+    out = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        s = _stats.get(name) or _Stats()
+        with s.lock:
+            out[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": s.checkouts,
+                "timeouts": s.timeouts,
+                "slow_checkouts": s.slow,
+                "wait_avg_ms": round(s.wait_total * 1000 / max(s.checkouts + s.timeouts, 1), 3),
+                "wait_max_ms": round(s.wait_max * 1000, 3),
+            }
+    return out
+
+
+POOL_CHECKED_OUT = metrics.Gauge("db_pool_checked_out", "Connections currently checked out", ("pool",))
+POOL_OVERFLOW = metrics.Gauge("db_pool_overflow", "Connections open beyond pool_size", ("pool",))
+POOL_CHECKOUTS = metrics.Counter("db_pool_checkouts_total", "Connection checkouts", ("pool",))
+POOL_TIMEOUTS = metrics.Counter("db_pool_timeouts_total", "Checkouts that timed out", ("pool",))
+POOL_WAIT = metrics.Counter("db_pool_wait_seconds_total", "Time spent waiting for a connection", ("pool",))
+
+
+def _collect():
+    for name, s in snapshot().items():
+        POOL_CHECKED_OUT.set(s["checked_out"], name)
+        POOL_OVERFLOW.set(s["overflow"], name)
+        POOL_CHECKOUTS.set_total(s["checkouts"], name)
+        POOL_TIMEOUTS.set_total(s["timeouts"], name)
+        POOL_WAIT.set_total(_stats[name].wait_total if name in _stats else 0, name)
+
+
+metrics.COLLECTORS.append(_collect)
@@ -0,0 +1,32 @@
+from fastapi import Request
+import os
+
+# หลัง POST ของ user คนไหน ให้ request ของคนนั้นอ่านจาก primary ไปอีกช่วงสั้น ๆ (replica อาจตามไม่ทัน)
+# จำไว้ใน cookie ไม่ต้องมี state ฝั่ง server ; หมดอายุเองตาม max-age
+STICKY_COOKIE = "dq_primary"
+READ_STICKY_SECONDS = int(os.getenv("READ_STICKY_SECONDS", "10"))
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def wants_primary(request: Request) -> bool:
+    return STICKY_COOKIE in request.cookies
+
+
+class StickyPrimaryMiddleware:
+    """ตั้ง cookie dq_primary หลัง request เขียน (POST ฯลฯ) ที่สำเร็จ ใส่เมื่อมี replica เท่านั้น"""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (f"{STICKY_COOKIE}=1; Max-Age={READ_STICKY_SECONDS}; Path=/; HttpOnly; SameSite=lax").encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+from sqlalchemy import select, delete, func, cast, literal, union_all, Date, Integer
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from config import now_th, TH_TZ
+from tables.kid_daily_stats import KidDailyStats
+from tables.tasks import Task, TaskStatus
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.rewards import Reward
+from core import archive
+
+# ยอดรายวันต่อเด็ก: points.award/spend เรียก add() ใน transaction เดียวกับการอนุมัติ (ยังไม่ commit ที่นี่)
+# วันนับตามเวลาไทย (session ของ DB ตั้ง timezone Asia/Bangkok ไว้แล้ว cast เป็น date จึงได้วันไทย)
+
+STAT_FIELDS = ("points_earned", "points_spent", "tasks_completed")
+
+
+def add(db: Session, deltas_by_kid: dict[int, dict[str, int]], day: date | None = None):
+    """deltas_by_kid = {kid_id: {"points_earned": 5, "tasks_completed": 1}} -> upsert เดียวทั้งชุด"""
+    day = day or now_th().date()
+    rows = [{"kid_id": kid, "day": day, **{f: d.get(f, 0) for f in STAT_FIELDS}}
+            for kid, d in deltas_by_kid.items() if any(d.values())]
+    if not rows:
+        return
+    stmt = insert(KidDailyStats).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[KidDailyStats.kid_id, KidDailyStats.day],
+        set_={f: getattr(KidDailyStats, f) + stmt.excluded[f] for f in STAT_FIELDS},
+    ))
+
+
+def rebuild(db: Session, since: date | None = None) -> int:
+    """สร้างยอดรายวันใหม่จากงานที่อนุมัติ (completed_at) และการแลกที่อนุมัติ (reviewed_at x ราคารางวัล)
+    since=None ทำทั้งหมด; วันก่อน horizon ของ archive ไม่แตะ (แถวย้ายไปไฟล์แล้ว ยอดเดิมคือยอดจริง) ; ไม่ commit"""
+    h = archive.horizon(db)
+    if h is not None:
+        since = max(since, h.astimezone(TH_TZ).date()) if since else h.astimezone(TH_TZ).date()
+    earned = (select(Task.kid_id.label("kid_id"), cast(Task.completed_at, Date).label("day"),
+                     func.coalesce(Task.points, 0).label("earned"), literal(0).label("spent"), literal(1).label("tasks"))
+              .where(Task.status == TaskStatus.approved, Task.completed_at.is_not(None)))
+    spent = (select(RewardRedeem.kid_id, cast(RewardRedeem.reviewed_at, Date),
+                    literal(0), Reward.cost, literal(0))
+             .join(Reward, Reward.id == RewardRedeem.reward_id)
+             .where(RewardRedeem.status == RedeemStatus.approved, RewardRedeem.reviewed_at.is_not(None)))
+    old = delete(KidDailyStats)
+    if since is not None:
+        earned = earned.where(cast(Task.completed_at, Date) >= since)
+        spent = spent.where(cast(RewardRedeem.reviewed_at, Date) >= since)
+        old = old.where(KidDailyStats.day >= since)
+    u = union_all(earned, spent).subquery()
+    db.execute(old)
+    res = db.execute(insert(KidDailyStats).from_select(
+        ["kid_id", "day", *STAT_FIELDS],
+        select(u.c.kid_id, u.c.day, cast(func.sum(u.c.earned), Integer), cast(func.sum(u.c.spent), Integer),
+               cast(func.sum(u.c.tasks), Integer))
+        .group_by(u.c.kid_id, u.c.day),
+    ))
+    return res.rowcount
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def totals(db: Session, kid_ids: list[int], since: date, until: date | None = None) -> dict[int, dict[str, int]]:
+    """ยอดรวมต่อเด็กตั้งแต่ since ถึง until (รวมทั้งสองวัน) เด็กที่ไม่มีแถวได้ 0"""
+    out = {kid: dict.fromkeys(STAT_FIELDS, 0) for kid in kid_ids}
+    if not kid_ids:
+        return out
+    q = (select(KidDailyStats.kid_id, *(func.sum(getattr(KidDailyStats, f)) for f in STAT_FIELDS))
+         .where(KidDailyStats.kid_id.in_(kid_ids), KidDailyStats.day >= since)
+         .group_by(KidDailyStats.kid_id))
+    if until is not None:
+        q = q.where(KidDailyStats.day <= until)
+    for kid, *vals in db.execute(q):
+        out[kid] = dict(zip(STAT_FIELDS, (int(v) for v in vals)))
+    return out
+
+
+def monthly(db: Session, kid_ids: list[int], months: int = 6) -> list[dict]:
+    """ยอดรวมทั้งครอบครัวรายเดือน ย้อนหลัง months เดือน (รวมเดือนนี้) เรียงจากเก่าไปใหม่"""
+    today = now_th().date()
+    y, m = divmod(today.year * 12 + today.month - 1 - (months - 1), 12)
+    start = date(y, m + 1, 1)
+    if not kid_ids:
+        return []
+    month = cast(func.date_trunc("month", KidDailyStats.day), Date)
+    rows = db.execute(
+        select(month, *(func.sum(getattr(KidDailyStats, f)) for f in STAT_FIELDS))
+        .where(KidDailyStats.kid_id.in_(kid_ids), KidDailyStats.day >= start)
+        .group_by(month).order_by(month)
+    ).all()
+    return [{"month": mon.strftime("%Y-%m"), **dict(zip(STAT_FIELDS, (int(v) for v in vals)))} for mon, *vals in rows]
@@ -0,0 +1,129 @@
+from datetime import date, datetime
+from functools import lru_cache
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from config import now_th, TH_TZ
+from tables.tasks import Task, TaskStatus
+from tables.task_templates import TaskTemplate
+from core import counters
+import time
+
+SCHEDULE_BATCH = 5000
+DAYS = {"mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6, "sun": 0}
+
+
+def _field(spec: str, lo: int, hi: int, names: dict | None = None) -> frozenset[int] | None:
+    """แปลงช่องแบบ cron (*, 1,3, 1-5, */2, mon-fri) เป็นเซ็ตตัวเลข; * คืน None (ไม่จำกัด)"""
+    if spec == "*":
+        return None
+    out = set()
+    for part in spec.split(","):
+        rng, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if rng == "*":
+            a, b = lo, hi
+        else:
+            a, _, b = rng.partition("-")
+            a = names.get(a, None) if names and a in names else int(a)
+            b = (names.get(b) if names and b in names else int(b)) if b else (hi if step > 1 else a)
+        if not (lo <= a <= hi and lo <= b <= hi) or step < 1:
+            raise ValueError(f"out of range: {part}")
+        out.update(range(a, b + 1, step))
+    return frozenset(out)
+
+
+@lru_cache(maxsize=4096)
+def parse_rule(rule: str):
+    """คืนฟังก์ชัน date -> bool; กฎไม่ถูกต้อง raise ValueError"""
+    rule = (rule or "").strip().lower()
+    if rule == "daily":
+        return lambda d: True
+    kind, _, arg = rule.partition(":")
+    if kind == "weekly":
+        dows = frozenset(x % 7 for x in (_field(arg, 0, 7, DAYS) or range(7)))
+        return lambda d: (d.weekday() + 1) % 7 in dows
+    if kind == "monthly":
+        doms = _field(arg, 1, 31) or frozenset(range(1, 32))
+        return lambda d: d.day in doms
+    if kind == "cron":
+        parts = arg.split()
+        if len(parts) != 3:
+            raise ValueError("cron rule needs 3 fields: day-of-month month day-of-week")
+        dom, mon, dow = _field(parts[0], 1, 31), _field(parts[1], 1, 12), _field(parts[2], 0, 7, DAYS)
+        if dow is not None:
+            dow = frozenset(x % 7 for x in dow)  # 7 = อาทิตย์ เหมือน 0
+
+        def match(d: date) -> bool:
+            if mon is not None and d.month not in mon:
+                return False
+            dom_ok = dom is None or d.day in dom
+            dow_ok = dow is None or (d.weekday() + 1) % 7 in dow
+            # เหมือน cron: ถ้ากำหนดทั้งวันที่และวันในสัปดาห์ ตรงอย่างใดอย่างหนึ่งก็พอ
+            if dom is not None and dow is not None:
+                return dom_ok or dow_ok
+            return dom_ok and dow_ok
+        return match
+    raise ValueError(f"unknown rule: {rule}")
+
+
+def period_key(day: date) -> str:
+    return day.isoformat()
+
+
+def materialize(db: Session, day: date | None = None, batch_size: int = SCHEDULE_BATCH, report=None) -> dict:
+    """สร้างงานของวัน `day` จาก template ที่ active ทุกครอบครัว
+    อ่าน template เป็นชุดตาม id แล้ว insert หลายแถวต่อครั้ง ON CONFLICT DO NOTHING
+    บน (template_id, period_key, created_at) -> รันซ้ำกี่รอบก็ไม่ซ้ำ; commit ทีละชุด
+    created_at = เที่ยงคืนของวันนั้น (ไม่ใช่เวลาที่รัน) เพราะ unique ต้องมีคีย์ partition ด้วย"""
+    day = day or now_th().date()
+    key = period_key(day)
+    created = TH_TZ.localize(datetime.combine(day, datetime.min.time()))
+    t = Task.__table__
+    totals = {"templates": 0, "due": 0, "inserted": 0, "batches": 0, "seconds": 0.0}
+    last_id = 0
+    while True:
+        t0 = time.perf_counter()
+        rows = db.execute(
+            select(TaskTemplate.id, TaskTemplate.parent_id, TaskTemplate.kid_id, TaskTemplate.title,
+                   TaskTemplate.description, TaskTemplate.points, TaskTemplate.rule)
+            .where(TaskTemplate.active.is_(True), TaskTemplate.id > last_id)
+            .order_by(TaskTemplate.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        due = []
+        for r in rows:
+            try:
+                if not parse_rule(r.rule)(day):
+                    continue
+            except ValueError:
+                continue
+            due.append({"title": r.title, "description": r.description, "points": r.points,
+                        "parent_id": r.parent_id, "kid_id": r.kid_id, "status": TaskStatus.assigned,
+                        "created_at": created, "template_id": r.id, "period_key": key})
+        inserted = []
+        if due:
+            stmt = (insert(t).on_conflict_do_nothing(index_elements=[t.c.template_id, t.c.period_key, t.c.created_at])
+                    .returning(t.c.kid_id))
+            inserted = db.execute(stmt, due).scalars().all()
+            per_kid: dict[int, int] = {}
+            for kid_id in inserted:
+                per_kid[kid_id] = per_kid.get(kid_id, 0) + 1
+            counters.bump_many(db, {kid: {"assigned": n} for kid, n in per_kid.items()}, already_applied=True)
+        db.commit()
+        dt = time.perf_counter() - t0
+        totals["templates"] += len(rows)
+        totals["due"] += len(due)
+        totals["inserted"] += len(inserted)
+        totals["batches"] += 1
+        totals["seconds"] += dt
+        if report:
+            report({"batch": totals["batches"], "templates": len(rows), "due": len(due),
+                    "inserted": len(inserted), "seconds": round(dt, 4)})
+        if len(rows) < batch_size:
+            break
+    totals["seconds"] = round(totals["seconds"], 4)
+    totals["period"] = key
+    return totals
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from fastapi import Request, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_db, get_async_db
+from tables.users import Users
+from utils.cache import TTLCache
+from core.cache_bus import cache_bus
+import base64, hashlib, hmac, json, logging, os, secrets, time
+
+log = logging.getLogger("dquests.session")
+
+SESSION_COOKIE = "dq_session"
+SESSION_SECRET = os.getenv("SESSION_SECRET") or ""
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(7 * 24 * 3600)))
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "0") == "1"
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+if not SESSION_SECRET:
+    # dev เท่านั้น: restart แล้วทุกคนต้อง login ใหม่ และใช้หลาย worker ไม่ได้
+    log.warning("SESSION_SECRET is not set; using a random per-process key")
+    SESSION_SECRET = secrets.token_hex(32)
+_KEY = SESSION_SECRET.encode()
+
+
+@dataclass(frozen=True)
+class Identity:
+    user_id: int
+    role: str
+    family_id: int | None
+    first_name: str = ""
+
+    @property
+    def id(self):
+        return self.user_id
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(_KEY, payload.encode(), hashlib.sha256).digest())
+
+def encode_session(ident: Identity) -> str:
+    # cookie ยืนยันแค่ว่าเป็น user คนไหน ; role/ครอบครัวอ่านจาก DB (ผ่านแคช) ทุกครั้ง
+    # ไม่งั้น worker อื่นจะเชื่อ claim เก่าไปจน cookie หมดอายุหลังเปลี่ยนครอบครัว
+    payload = _b64(json.dumps({"user_id": ident.user_id, "iat": time.time()}, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def decode_session(token: str | None) -> dict | None:
+    if not token or "." not in token:
+        return None
+    payload, sig = token.rsplit(".", 1)
+    if not hmac.compare_digest(sig, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_unb64(payload))
+    except ValueError:
+        return None
+    if claims.get("iat", 0) + SESSION_MAX_AGE < time.time():
+        return None
+    return claims
+
+
+# user_id -> (generation ของ cache_bus ตอนโหลด, Identity) ; generation เลื่อนทุกครั้งที่มีใคร (worker ไหนก็ได้)
+# เปลี่ยน role/ครอบครัว entry รุ่นเก่าจึงถูกโหลดใหม่ ; ตอน bus ไม่ได้ฟังอยู่ไม่ใช้แคชเลย
+_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+
+def invalidate(user_id: int):
+    """worker นี้เห็นทันที ; worker อื่นเห็นผ่าน cache_bus.publish() ที่คนเปลี่ยนข้อมูลยิงใน transaction"""
+    _cache.pop(user_id)
+
+
+def load_identity(db: Session, user_id: int) -> Identity | None:
+    user = db.get(Users, user_id)
+    if not user:
+        return None
+    from utils.family import family_of  # utils.family import session อยู่แล้ว
+    fam = family_of(db, user_id)
+    return Identity(user.id, user.role.value, fam.id if fam else None, user.first_name)
+
+
+def resolve(db: Session, user_id: int) -> Identity | None:
+    """จากแคชถ้ายังเป็นรุ่นปัจจุบัน ไม่งั้นโหลดจาก DB แล้วเก็บ (อ่าน generation ก่อนโหลด กันเก็บของเก่าเป็นรุ่นใหม่)"""
+    gen = cache_bus.generation()
+    if gen is not None:
+        item = _cache.get(user_id)
+        if item is not None and item[0] == gen:
+            return item[1]
+    ident = load_identity(db, user_id)
+    if ident is not None and gen is not None:
+        _cache.set(user_id, (gen, ident))
+    return ident
+
+
+def current_identity(request: Request, db: Session = Depends(get_db)) -> Identity | None:
+    claims = decode_session(request.cookies.get(SESSION_COOKIE))
+    return resolve(db, claims["user_id"]) if claims else None
+
+
+async def current_identity_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> Identity | None:
+    claims = decode_session(request.cookies.get(SESSION_COOKIE))
+    return await db.run_sync(resolve, claims["user_id"]) if claims else None
+
+
+def owns(ident: Identity | None, user_id: int, role: str) -> bool:
+    return ident is not None and ident.user_id == user_id and ident.role == role
+
+
+def set_session_cookie(response, ident: Identity):
+    response.set_cookie(
+        SESSION_COOKIE, encode_session(ident), max_age=SESSION_MAX_AGE,
+        httponly=True, samesite="lax", secure=SESSION_COOKIE_SECURE,
+    )
+    return response
+
+
+def clear_session_cookie(response):
+    response.delete_cookie(SESSION_COOKIE)
+    return response
@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from core import metrics
+import logging, os, time
+
+log = logging.getLogger("dquests.sql")
+
+# statement เดียวกันเป๊ะ (ต่างกันแค่ค่าพารามิเตอร์) ซ้ำเกินนี้ใน request เดียว = น่าจะเป็น N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# จำนวน query สูงสุดต่อ request; ใช้จริงเมื่อเปิด QUERY_BUDGET_STRICT=1 (ตอนรันเทส) เกินแล้ว raise ทันที
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "25"))
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+SLOW_REQUEST_DB_MS = float(os.getenv("SLOW_REQUEST_DB_MS", "200"))
+# 1 = ใส่ header X-DB-Statements / X-DB-Time-Ms ในทุก response (bench.load ใช้)
+SQL_STATS_HEADER = os.getenv("SQL_STATS_HEADER", "0") == "1"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestStats:
+    __slots__ = ("label", "budget", "count", "db_time", "slowest", "slowest_time", "seen")
+
+    def __init__(self, label: str = "", budget: int | None = None):
+        self.label = label
+        self.budget = budget
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest = ""
+        self.slowest_time = 0.0
+        self.seen: dict[str, int] = {}
+
+    def n_plus_one(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict[str, int]:
+        return {stmt: n for stmt, n in self.seen.items() if n >= threshold}
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+
+DB_STATEMENTS = metrics.Counter("db_statements_total", "SQL statements executed", ("route",))
+DB_SECONDS = metrics.Counter("db_seconds_total", "Time spent in SQL statements", ("route",))
+DB_PER_REQUEST = metrics.Histogram("db_statements_per_request", "SQL statements per request", ("route",),
+                                   buckets=metrics.COUNT_BUCKETS)
+N_PLUS_ONE = metrics.Counter("db_n_plus_one_total", "Requests with a repeated statement (N+1 candidate)", ("route",))
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    context._dq_started = time.perf_counter()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    took = time.perf_counter() - context._dq_started
+    stats.count += 1
+    stats.db_time += took
+    stats.seen[statement] = stats.seen.get(statement, 0) + 1
+    if took > stats.slowest_time:
+        stats.slowest, stats.slowest_time = statement, took
+    if stats.budget is not None and stats.count > stats.budget:
+        raise QueryBudgetExceeded(f"{stats.label or 'block'} ran more than {stats.budget} SQL statements; "
+                                  f"most repeated: {max(stats.seen.values())}x")
+
+
+def instrument(engine):
+    """ติด hook นับ query ให้ engine (AsyncEngine ให้ส่ง .sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+
+
+def finish(stats: RequestStats):
+    route = stats.label
+    DB_STATEMENTS.inc(route, amount=stats.count)
+    DB_SECONDS.inc(route, amount=stats.db_time)
+    DB_PER_REQUEST.observe(stats.count, route)
+    repeated = stats.n_plus_one()
+    if repeated:
+        N_PLUS_ONE.inc(route)
+        stmt, n = max(repeated.items(), key=lambda kv: kv[1])
+        log.warning("N+1 candidate on %s: %d x %s", route, n, " ".join(stmt.split())[:300])
+    if stats.db_time * 1000 >= SLOW_REQUEST_DB_MS:
+        log.warning("slow DB on %s: %d statements, %.0fms total, slowest %.0fms: %s", route, stats.count,
+                    stats.db_time * 1000, stats.slowest_time * 1000, " ".join(stats.slowest.split())[:300])
+
+
+@contextmanager
+def track(label: str = "", budget: int | None = None):
+    """นับ query ในบล็อกนี้ (ใช้ในเทส/สคริปต์): with track(budget=5) as s: ... ; s.count, s.n_plus_one()"""
+    stats = RequestStats(label, budget)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+HTTP_REQUESTS = metrics.Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_LATENCY = metrics.Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+
+
+class SQLStatsMiddleware:
+    """วัดเวลา/จำนวน query ต่อ request แล้วลง metrics ตาม route template (/kid/dashboard/{kid_id})"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope["path"], budget=QUERY_BUDGET if QUERY_BUDGET_STRICT else None)
+        token = _current.set(stats)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SQL_STATS_HEADER:
+                    message["headers"] = [*message.get("headers", ()),
+                                          (b"x-db-statements", str(stats.count).encode()),
+                                          (b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            stats.label = getattr(route, "path", None) or ("/static" if scope["path"].startswith("/static/") else "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - t0, scope["method"], stats.label)
+            HTTP_REQUESTS.inc(scope["method"], stats.label, str(status))
+            finish(stats)
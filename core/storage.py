@@ -0,0 +1,82 @@
+from fastapi import UploadFile, HTTPException
+from config import UPLOAD_DIR, UPLOAD_TMP_DIR, MAX_UPLOAD_BYTES
+import hashlib, os, re, tempfile
+
+CHUNK_SIZE = 64 * 1024
+# เผื่อ field อื่น ๆ ใน multipart (note, kid_id, boundary)
+FORM_OVERHEAD = 64 * 1024
+
+class UploadTooLarge(ValueError):
+    pass
+
+def _ext(filename: str | None) -> str:
+    _, ext = os.path.splitext(filename or "")
+    ext = ext.lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ""
+
+def shard_path(digest: str, ext: str = "") -> str:
+    # static/uploads/ab/cd/abcd....png -> ไม่มีโฟลเดอร์ไหนมีไฟล์เยอะเกิน
+    return os.path.join(UPLOAD_DIR, digest[:2], digest[2:4], digest + ext)
+
+def save_upload(upload: UploadFile | None) -> str | None:
+    """เขียนไฟล์ทีละ chunk พร้อม hash, ไฟล์ซ้ำ (sha256 เดียวกัน) ใช้ไฟล์เดิม
+    ถูกเรียกจาก route แบบ sync จึงรันใน threadpool ไม่บล็อก event loop"""
+    if not upload or not upload.filename:
+        return None
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := upload.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                h.update(chunk)
+                out.write(chunk)
+        path = shard_path(h.hexdigest(), _ext(upload.filename))
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path.replace(os.sep, "/")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class UploadLimitMiddleware:
+    """ตัด request multipart ที่ใหญ่เกิน ก่อนที่ parser จะเขียน body ทั้งก้อนลง disk"""
+
+    def __init__(self, app, max_body: int = MAX_UPLOAD_BYTES + FORM_OVERHEAD):
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+            await send({"type": "http.response.body", "body": b"Upload too large"})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,8 +1,14 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from config import Base, engine
-from fastapi.responses import RedirectResponse
+from config import engine, read_engine, SessionLocal
+from core.storage import UploadLimitMiddleware
+from core import notify, outbox, pool_stats, migrations, metrics
+from core.cache_bus import cache_bus
+from core.sqlstats import SQLStatsMiddleware
+from core.replica import StickyPrimaryMiddleware
+from fastapi.responses import RedirectResponse, PlainTextResponse
 from routes.auth_page import router as auth_router
 from routes.parent_page import router as parent_router
 from routes.kid_page import router as kid_router
@@ -10,8 +16,27 @@ from routes.parent_tasks import router as parent_tasks_router
 from routes.kid_tasks import router as kid_tasks_router
 from routes.parent_history import router as parent_history_router
 from routes.kid_history import router as kid_history_router
+from routes.parent_stats import router as parent_stats_router
+from routes.api_v1 import router as api_v1_router
+from routes.parent_live import router as parent_live_router
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schema สร้าง/อัปเดตด้วย `python manage.py migrate` แยกจากการ start app; ตรงนี้แค่เช็กเลข version
+    migrations.check(engine)
+    # แคชตัวตน/ครอบครัวใช้ได้เมื่อ bus ฟังอยู่เท่านั้น (ไม่งั้นอ่าน DB ตรงทุกครั้ง)
+    cache_bus.start()
+    if outbox.OUTBOX_EMBEDDED:
+        outbox.worker.start()
+    yield
+    outbox.worker.stop()
+    cache_bus.stop()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(SQLStatsMiddleware)
+if read_engine is not engine:
+    app.add_middleware(StickyPrimaryMiddleware)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -22,10 +47,28 @@ app.include_router(parent_tasks_router)
 app.include_router(kid_tasks_router)
 app.include_router(parent_history_router)
 app.include_router(kid_history_router)
-
-Base.metadata.create_all(bind=engine)
+app.include_router(parent_stats_router)
+app.include_router(api_v1_router)
+app.include_router(parent_live_router)
 
 @app.get("/", include_in_schema=False)
 def root():
 
     return RedirectResponse("/login", status_code=307)
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/notify", include_in_schema=False)
+def notify_metrics():
+    return notify.stats()
+
+@app.get("/metrics/outbox", include_in_schema=False)
+def outbox_metrics():
+    with SessionLocal() as db:
+        return outbox.stats(db)
+
+@app.get("/metrics/pool", include_in_schema=False)
+def pool_metrics():
+    return pool_stats.snapshot()
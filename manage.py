@@ -0,0 +1,133 @@
+# python manage.py <command>
+import argparse
+from config import SessionLocal
+# relationship() อ้างชื่อคลาสข้ามไฟล์ ต้อง import ทุกตารางก่อนใช้ ORM
+from tables import users, families, tasks, submissions, rewards, reward_redeems, kid_counters, points_ledger, task_templates, kid_daily_stats, outbox, archive  # noqa: F401
+
+def reconcile_counters(args):
+    from core import counters
+    with SessionLocal() as db:
+        n = counters.reconcile(db, args.kid)
+        db.commit()
+    print(f"reconciled {n} kid counter rows")
+
+def backfill_completed_at(args):
+    from sqlalchemy import update
+    from tables.tasks import Task, TaskStatus
+    with SessionLocal() as db:
+        res = db.execute(
+            update(Task)
+            .where(Task.status.in_([TaskStatus.approved, TaskStatus.rejected]), Task.completed_at.is_(None))
+            .values(completed_at=Task.created_at)
+        )
+        db.commit()
+    print(f"backfilled completed_at on {res.rowcount} tasks")
+
+def snapshot_points(args):
+    from core import points
+    with SessionLocal() as db:
+        n = points.snapshot(db)
+        db.commit()
+    print(f"snapshotted {n} kid balances")
+
+def schedule_tasks(args):
+    from datetime import date
+    from core import scheduler
+    day = date.fromisoformat(args.date) if args.date else None
+    with SessionLocal() as db:
+        totals = scheduler.materialize(db, day, batch_size=args.batch,
+                                       report=lambda b: print(f"batch {b['batch']}: {b}"))
+    print(f"done: {totals}")
+
+def rebuild_rollups(args):
+    from datetime import date
+    from core import rollups
+    since = date.fromisoformat(args.since) if args.since else None
+    with SessionLocal() as db:
+        n = rollups.rebuild(db, since)
+        db.commit()
+    print(f"rebuilt {n} kid_daily_stats rows")
+
+def outbox_worker(args):
+    from core import outbox
+    args.batch = args.batch or outbox.OUTBOX_BATCH
+    if args.once:
+        with SessionLocal() as db:
+            print(f"handled {outbox.run_once(db, args.batch)} outbox event(s)")
+        return
+    print("outbox worker running, Ctrl+C to stop")
+    try:
+        outbox.Worker(batch=args.batch).run()
+    except KeyboardInterrupt:
+        pass
+
+def ensure_partitions(args):
+    from core import partitions
+    with SessionLocal() as db:
+        n = partitions.ensure(db, months_ahead=args.months_ahead)
+        db.commit()
+    print(f"created {n} partition(s)")
+
+def archive_old(args):
+    from core import archive
+    days = args.older_than_days if args.older_than_days is not None else archive.ARCHIVE_AFTER_DAYS
+    with SessionLocal() as db:
+        res = archive.run(db, days)
+    print(f"archived {res['tasks']} tasks and {res['redeems']} redeems older than {res['cutoff']} "
+          f"into {res['files']} file(s); dropped {len(res['dropped'])} empty partition(s)")
+
+def migrate(args):
+    from config import engine
+    from core import migrations
+    if args.status:
+        with engine.connect() as conn:
+            print(f"database at version {migrations.current_version(conn)}, latest is {migrations.latest()}")
+        return
+    done = migrations.migrate(engine, args.to, report=lambda v, name: print(f"applied {name}"))
+    print(f"applied {len(done)} migration(s)" if done else "already up to date")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="manage.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reconcile-counters", help="rebuild kid_counters from tasks and reward_redeems")
+    p.add_argument("--kid", type=int, default=None, help="only this kid id")
+    p.set_defaults(func=reconcile_counters)
+
+    p = sub.add_parser("backfill-completed-at", help="set completed_at on reviewed tasks that predate history paging")
+    p.set_defaults(func=backfill_completed_at)
+
+    p = sub.add_parser("snapshot-points", help="record every kid's balance so balance-at-date reads skip the full ledger")
+    p.set_defaults(func=snapshot_points)
+
+    p = sub.add_parser("rebuild-rollups", help="rebuild kid_daily_stats from approved tasks and redeems")
+    p.add_argument("--since", default=None, help="YYYY-MM-DD, only rebuild from this day on (default everything)")
+    p.set_defaults(func=rebuild_rollups)
+
+    p = sub.add_parser("migrate", help="apply pending schema migrations from migrations/")
+    p.add_argument("--to", type=int, default=None, help="stop at this version")
+    p.add_argument("--status", action="store_true", help="show the current version only")
+    p.set_defaults(func=migrate)
+
+    p = sub.add_parser("outbox-worker", help="handle post-commit side effects (notifications) from the outbox table")
+    p.add_argument("--batch", type=int, default=None, help="events per claim (default OUTBOX_BATCH)")
+    p.add_argument("--once", action="store_true", help="handle one batch and exit")
+    p.set_defaults(func=outbox_worker)
+
+    p = sub.add_parser("ensure-partitions", help="create monthly partitions of tasks/reward_redeems ahead of time")
+    p.add_argument("--months-ahead", type=int, default=3)
+    p.set_defaults(func=ensure_partitions)
+
+    p = sub.add_parser("archive", help="move approved tasks/redeems older than the cutoff into compressed files")
+    p.add_argument("--older-than-days", type=int, default=None, help="default ARCHIVE_AFTER_DAYS (365)")
+    p.set_defaults(func=archive_old)
+
+    p = sub.add_parser("schedule-tasks", help="create today's tasks from recurring templates (safe to rerun)")
+    p.add_argument("--date", default=None, help="YYYY-MM-DD, default today (Asia/Bangkok)")
+    p.add_argument("--batch", type=int, default=5000)
+    p.set_defaults(func=schedule_tasks)
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.func(args)
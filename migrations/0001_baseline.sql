@@ -0,0 +1,129 @@
+-- schema ตั้งต้นของระบบ migration
+-- เขียนแบบ IF NOT EXISTS ทั้งหมด: ใช้ได้ทั้ง DB ใหม่ และ DB เดิมที่เคยสร้างด้วย create_all
+-- (create_all ไม่เคยเพิ่มคอลัมน์/index ให้ตารางที่มีอยู่แล้ว ตรงนี้เติมให้ครบ)
+
+DO $$ BEGIN CREATE TYPE role_enum AS ENUM ('kid', 'parent'); EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN CREATE TYPE taskstatus AS ENUM ('assigned', 'submitted', 'approved', 'rejected'); EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN CREATE TYPE submissionstatus AS ENUM ('pending', 'approved', 'rejected'); EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN CREATE TYPE redeemstatus AS ENUM ('pending', 'approved', 'rejected'); EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    password VARCHAR NOT NULL,
+    first_name VARCHAR NOT NULL,
+    role role_enum NOT NULL,
+    points INTEGER NOT NULL,
+    create_date TIMESTAMP WITH TIME ZONE,
+    update_date TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS families (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(80) NOT NULL,
+    code VARCHAR(16) NOT NULL UNIQUE,
+    owner_parent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS family_members (
+    id SERIAL PRIMARY KEY,
+    family_id INTEGER REFERENCES families (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    role role_enum NOT NULL,
+    CONSTRAINT uq_family_user UNIQUE (family_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS rewards (
+    id SERIAL PRIMARY KEY,
+    parent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    name VARCHAR(120) NOT NULL,
+    description TEXT,
+    cost INTEGER NOT NULL,
+    image_path VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS reward_redeems (
+    id SERIAL PRIMARY KEY,
+    reward_id INTEGER NOT NULL REFERENCES rewards (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    status redeemstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    reviewed_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_redeem_reward_status_created ON reward_redeems (reward_id, status, created_at);
+CREATE INDEX IF NOT EXISTS ix_redeem_kid_status_reviewed ON reward_redeems (kid_id, status, reviewed_at);
+
+CREATE TABLE IF NOT EXISTS task_templates (
+    id SERIAL PRIMARY KEY,
+    parent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    title VARCHAR(120) NOT NULL,
+    description TEXT,
+    points INTEGER NOT NULL,
+    rule VARCHAR(64) NOT NULL,
+    active BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_template_parent_active ON task_templates (parent_id, active);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id SERIAL PRIMARY KEY,
+    title VARCHAR(120) NOT NULL,
+    description TEXT,
+    points INTEGER NOT NULL,
+    parent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    status taskstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS template_id INTEGER REFERENCES task_templates (id) ON DELETE SET NULL;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS period_key VARCHAR(16);
+CREATE INDEX IF NOT EXISTS ix_tasks_completed_at ON tasks (completed_at);
+CREATE INDEX IF NOT EXISTS ix_task_kid_status ON tasks (kid_id, status);
+CREATE INDEX IF NOT EXISTS ix_task_kid_status_completed ON tasks (kid_id, status, completed_at);
+CREATE INDEX IF NOT EXISTS ix_task_parent_status_completed ON tasks (parent_id, status, completed_at);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_task_template_period ON tasks (template_id, period_key);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id SERIAL PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    message TEXT,
+    evidence_path VARCHAR,
+    status submissionstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    reviewed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS kid_counters (
+    kid_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+    assigned INTEGER NOT NULL,
+    submitted INTEGER NOT NULL,
+    approved INTEGER NOT NULL,
+    rejected INTEGER NOT NULL,
+    pending_redeems INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS points_ledger (
+    id BIGSERIAL PRIMARY KEY,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    delta INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    reason VARCHAR(32) NOT NULL,
+    task_id INTEGER REFERENCES tasks (id) ON DELETE SET NULL,
+    redeem_id INTEGER REFERENCES reward_redeems (id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_ledger_kid_created ON points_ledger (kid_id, created_at);
+
+CREATE TABLE IF NOT EXISTS points_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    as_of TIMESTAMP WITH TIME ZONE NOT NULL,
+    balance INTEGER NOT NULL,
+    last_ledger_id BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshot_kid_asof ON points_snapshots (kid_id, as_of);
@@ -0,0 +1,2 @@
+-- เลข version ต่อเด็ก ใช้ทำ ETag หน้า dashboard/ประวัติ
+ALTER TABLE kid_counters ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,2 @@
+-- รายการรางวัลของเด็กกรองตามผู้ปกครองในครอบครัว (utils/catalog.py)
+CREATE INDEX IF NOT EXISTS ix_reward_parent ON rewards (parent_id);
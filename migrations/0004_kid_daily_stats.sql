@@ -0,0 +1,10 @@
+-- ยอดรายวันต่อเด็กสำหรับหน้าสถิติ/อันดับ (core/rollups.py) เติมข้อมูลเก่าด้วย `python manage.py rebuild-rollups`
+CREATE TABLE IF NOT EXISTS kid_daily_stats (
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    points_spent INTEGER NOT NULL DEFAULT 0,
+    tasks_completed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kid_id, day)
+);
+CREATE INDEX IF NOT EXISTS ix_daily_stats_day ON kid_daily_stats (day);
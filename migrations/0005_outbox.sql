@@ -0,0 +1,12 @@
+-- งานหลัง commit (แจ้งเตือน) ที่ worker ใน core/outbox.py หยิบไปทำ
+CREATE TABLE IF NOT EXISTS outbox (
+    id BIGSERIAL PRIMARY KEY,
+    topic VARCHAR(32) NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    failed_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_ready ON outbox (available_at, id) WHERE failed_at IS NULL;
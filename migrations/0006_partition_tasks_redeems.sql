@@ -0,0 +1,123 @@
+-- tasks / reward_redeems แบ่ง partition รายเดือนตาม created_at (เดือนตามเวลาไทย) + partition default กันแถวหลุดช่วง
+-- partition ล่วงหน้าสร้างด้วย `python manage.py ensure-partitions` (cron รายเดือน) แถวเก่าที่อนุมัติแล้วย้ายออกด้วย `manage.py archive`
+-- PK ต้องมีคีย์ partition จึงเป็น (id, created_at) ; id ยังมาจาก sequence เดิม ไม่ซ้ำกันเหมือนเดิม
+-- FK ที่ชี้มาที่สองตารางนี้ต้องถอด (Postgres ให้อ้างตารางแบ่ง partition ด้วย id อย่างเดียวไม่ได้)
+-- submissions ของงานที่ถูก archive ลบใน core/archive.py แทน ON DELETE CASCADE ; points_ledger เก็บ id ไว้อ้างอิงต่อ
+ALTER TABLE submissions DROP CONSTRAINT IF EXISTS submissions_task_id_fkey;
+ALTER TABLE points_ledger DROP CONSTRAINT IF EXISTS points_ledger_task_id_fkey;
+ALTER TABLE points_ledger DROP CONSTRAINT IF EXISTS points_ledger_redeem_id_fkey;
+
+-- สร้าง partition รายเดือน first_month..last_month ที่ยังไม่มี ; ถ้า default มีแถวของเดือนนั้นค้างอยู่จะย้ายเข้า partition ใหม่ให้
+CREATE OR REPLACE FUNCTION dq_ensure_month_partitions(parent text, first_month date, last_month date) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    m date := date_trunc('month', first_month)::date;
+    lo timestamptz;
+    hi timestamptz;
+    part text;
+    created integer := 0;
+BEGIN
+    WHILE m <= last_month LOOP
+        part := parent || '_y' || to_char(m, 'YYYY') || 'm' || to_char(m, 'MM');
+        IF to_regclass(part) IS NULL THEN
+            lo := m::timestamp AT TIME ZONE 'Asia/Bangkok';
+            hi := (m + interval '1 month')::timestamp AT TIME ZONE 'Asia/Bangkok';
+            EXECUTE 'CREATE TABLE ' || quote_ident(part) || ' (LIKE ' || quote_ident(parent) || ' INCLUDING DEFAULTS)';
+            EXECUTE 'WITH moved AS (DELETE FROM ' || quote_ident(parent || '_default')
+                 || ' WHERE created_at >= $1 AND created_at < $2 RETURNING *) INSERT INTO ' || quote_ident(part)
+                 || ' SELECT * FROM moved' USING lo, hi;
+            EXECUTE 'ALTER TABLE ' || quote_ident(parent) || ' ATTACH PARTITION ' || quote_ident(part)
+                 || ' FOR VALUES FROM (' || quote_literal(lo) || ') TO (' || quote_literal(hi) || ')';
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- tasks
+ALTER TABLE tasks RENAME TO tasks_unpartitioned;
+ALTER SEQUENCE tasks_id_seq OWNED BY NONE;
+CREATE TABLE tasks (
+    id INTEGER NOT NULL DEFAULT nextval('tasks_id_seq'),
+    title VARCHAR(120) NOT NULL,
+    description TEXT,
+    points INTEGER NOT NULL,
+    parent_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    status taskstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    template_id INTEGER REFERENCES task_templates (id) ON DELETE SET NULL,
+    period_key VARCHAR(16)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE tasks_default PARTITION OF tasks DEFAULT;
+SELECT dq_ensure_month_partitions('tasks',
+    coalesce((SELECT min(created_at AT TIME ZONE 'Asia/Bangkok')::date FROM tasks_unpartitioned),
+             (now() AT TIME ZONE 'Asia/Bangkok')::date),
+    ((now() AT TIME ZONE 'Asia/Bangkok') + interval '3 months')::date);
+-- งานจาก template ใช้ created_at = เที่ยงคืนของวันนั้น (core/scheduler.py) ให้ unique ที่มีคีย์ partition ยังกันงานซ้ำได้
+INSERT INTO tasks (id, title, description, points, parent_id, kid_id, status, created_at, completed_at, template_id, period_key)
+SELECT id, title, description, points, parent_id, kid_id, status,
+       CASE WHEN template_id IS NOT NULL AND period_key IS NOT NULL
+            THEN period_key::date::timestamp AT TIME ZONE 'Asia/Bangkok'
+            ELSE coalesce(created_at, completed_at, now()) END,
+       completed_at, template_id, period_key
+FROM tasks_unpartitioned;
+DROP TABLE tasks_unpartitioned;
+ALTER SEQUENCE tasks_id_seq OWNED BY tasks.id;
+ALTER TABLE tasks ADD PRIMARY KEY (id, created_at);
+CREATE INDEX ix_tasks_completed_at ON tasks (completed_at);
+CREATE INDEX ix_task_kid_status ON tasks (kid_id, status);
+CREATE INDEX ix_task_kid_status_completed ON tasks (kid_id, status, completed_at);
+CREATE INDEX ix_task_parent_status_completed ON tasks (parent_id, status, completed_at);
+CREATE UNIQUE INDEX uq_task_template_period ON tasks (template_id, period_key, created_at);
+
+-- reward_redeems
+ALTER TABLE reward_redeems RENAME TO reward_redeems_unpartitioned;
+ALTER SEQUENCE reward_redeems_id_seq OWNED BY NONE;
+CREATE TABLE reward_redeems (
+    id INTEGER NOT NULL DEFAULT nextval('reward_redeems_id_seq'),
+    reward_id INTEGER NOT NULL REFERENCES rewards (id) ON DELETE CASCADE,
+    kid_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    status redeemstatus NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    reviewed_at TIMESTAMP WITH TIME ZONE
+) PARTITION BY RANGE (created_at);
+CREATE TABLE reward_redeems_default PARTITION OF reward_redeems DEFAULT;
+SELECT dq_ensure_month_partitions('reward_redeems',
+    coalesce((SELECT min(created_at AT TIME ZONE 'Asia/Bangkok')::date FROM reward_redeems_unpartitioned),
+             (now() AT TIME ZONE 'Asia/Bangkok')::date),
+    ((now() AT TIME ZONE 'Asia/Bangkok') + interval '3 months')::date);
+INSERT INTO reward_redeems (id, reward_id, kid_id, status, created_at, reviewed_at)
+SELECT id, reward_id, kid_id, status, coalesce(created_at, reviewed_at, now()), reviewed_at
+FROM reward_redeems_unpartitioned;
+DROP TABLE reward_redeems_unpartitioned;
+ALTER SEQUENCE reward_redeems_id_seq OWNED BY reward_redeems.id;
+ALTER TABLE reward_redeems ADD PRIMARY KEY (id, created_at);
+CREATE INDEX ix_redeem_reward_status_created ON reward_redeems (reward_id, status, created_at);
+CREATE INDEX ix_redeem_kid_status_reviewed ON reward_redeems (kid_id, status, reviewed_at);
+
+-- ไฟล์ archive (gzip JSON lines) ที่ย้ายแถวอนุมัติแล้วออกไป (core/archive.py)
+CREATE TABLE IF NOT EXISTS archive_runs (
+    id SERIAL PRIMARY KEY,
+    cutoff TIMESTAMP WITH TIME ZONE NOT NULL,
+    tasks INTEGER NOT NULL DEFAULT 0,
+    redeems INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+-- แถวละ (ไฟล์, เจ้าของ, สถานะ): history หาเฉพาะไฟล์ที่มีของคนนั้น, reconcile-counters รวมยอดที่ archive ไปแล้ว
+CREATE TABLE IF NOT EXISTS archive_index (
+    id BIGSERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES archive_runs (id) ON DELETE CASCADE,
+    table_name VARCHAR(32) NOT NULL,
+    month DATE NOT NULL,
+    path VARCHAR NOT NULL,
+    kid_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    reward_id INTEGER,
+    status VARCHAR(16) NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archive_kid ON archive_index (table_name, kid_id, status, month);
+CREATE INDEX IF NOT EXISTS ix_archive_parent ON archive_index (table_name, parent_id, status, month);
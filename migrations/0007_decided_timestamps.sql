@@ -0,0 +1,11 @@
+-- history แบ่งหน้าด้วย keyset บน (completed_at, id) / (reviewed_at, id): แถวที่ตัดสินแล้วแต่เวลาว่าง
+-- ทำให้สร้าง cursor ไม่ได้และหลุดจากทุกหน้าถัดไป ; เติมเวลาให้แถวเก่า แล้วบังคับไม่ให้ว่างอีก
+UPDATE tasks SET completed_at = created_at
+WHERE status IN ('approved', 'rejected') AND completed_at IS NULL;
+UPDATE reward_redeems SET reviewed_at = created_at
+WHERE status IN ('approved', 'rejected') AND reviewed_at IS NULL;
+
+ALTER TABLE tasks ADD CONSTRAINT ck_task_decided_completed_at
+    CHECK (status NOT IN ('approved', 'rejected') OR completed_at IS NOT NULL);
+ALTER TABLE reward_redeems ADD CONSTRAINT ck_redeem_decided_reviewed_at
+    CHECK (status NOT IN ('approved', 'rejected') OR reviewed_at IS NOT NULL);
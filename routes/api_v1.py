@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import get_read_db
+from tables.tasks import Task, TaskStatus
+from tables.users import RoleEnum
+from utils.family import family_of
+from utils.catalog import reward_catalog
+from core.session import Identity, current_identity, owns
+
+# JSON สำหรับแอปมือถือ (poll บ่อย): select เฉพาะคอลัมน์ที่ขอผ่าน Core ไม่สร้าง ORM object
+# และคืน ORJSONResponse ตรง ๆ (ไม่ผ่าน jsonable_encoder ของ FastAPI)
+# ?fields=id,title เลือกฟิลด์ได้ ; ไม่ส่ง = ชุดเดียวกับ /kid/tasks, /kid/rewards เดิม
+router = APIRouter(prefix="/api/v1", tags=["API v1"], default_response_class=ORJSONResponse)
+
+TASK_FIELDS = {
+    "id": Task.id,
+    "title": Task.title,
+    "description": Task.description,
+    "points": Task.points,
+    "status": Task.status,
+    "created_at": Task.created_at,
+}
+TASK_DEFAULT = ("id", "title", "points", "status")
+REWARD_FIELDS = ("id", "name", "description", "cost", "image_path")
+REWARD_DEFAULT = ("id", "name", "cost")
+
+
+def parse_fields(fields: str | None, allowed, default: tuple) -> tuple | ORJSONResponse:
+    if not fields:
+        return default
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in allowed]
+    if unknown or not names:
+        return ORJSONResponse({"error": "unknown_field", "fields": unknown, "allowed": list(allowed)}, status_code=400)
+    return names
+
+
+def _unauthorized():
+    return ORJSONResponse({"error": "unauthorized"}, status_code=401)
+
+
+@router.get("/kids/{kid_id}/tasks")
+def api_tasks(kid_id: int, fields: str | None = None,
+              ident: Identity | None = Depends(current_identity), db: Session = Depends(get_read_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return _unauthorized()
+    names = parse_fields(fields, TASK_FIELDS, TASK_DEFAULT)
+    if isinstance(names, ORJSONResponse):
+        return names
+    rows = db.execute(
+        select(*(TASK_FIELDS[f] for f in names))
+        .where(Task.kid_id == kid_id, Task.status.in_([TaskStatus.assigned, TaskStatus.rejected]))
+        .order_by(Task.id)
+    )
+    # Enum/datetime orjson แปลงเองได้ (status -> value, created_at -> ISO 8601)
+    return ORJSONResponse({"tasks": [dict(zip(names, row)) for row in rows]})
+
+
+@router.get("/kids/{kid_id}/rewards")
+def api_rewards(kid_id: int, fields: str | None = None,
+                ident: Identity | None = Depends(current_identity), db: Session = Depends(get_read_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return _unauthorized()
+    names = parse_fields(fields, REWARD_FIELDS, REWARD_DEFAULT)
+    if isinstance(names, ORJSONResponse):
+        return names
+    fam = family_of(db, kid_id)
+    items = reward_catalog.for_kid(db, fam, kid_id) if fam else ()
+    return ORJSONResponse({"rewards": [{f: getattr(r, f) for f in names} for r in items]})
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from config import get_db
-from fastapi.templating import Jinja2Templates
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_async_db, templates
 from tables.users import Users, RoleEnum
-from core.auth import hash_password, verify_password
+from core.auth import hash_password_async, verify_and_update_async, HashPoolBusy
+from core.session import resolve, set_session_cookie, clear_session_cookie
 
-templates = Jinja2Templates(directory="templates")
 router = APIRouter(tags=["Auth"])
 
 @router.get("/login")
@@ -14,31 +14,49 @@ def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 
+# login/register เป็น async: ระหว่างรอ hash ใน process pool ไม่จอง thread ของ threadpool
+# (ช่วง login พร้อมกันเยอะ ๆ route sync อื่นยังมี thread ใช้)
 @router.post("/login")
-def login_post(
+async def login_post(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(Users).filter(Users.username == username).first()
+    user = await db.scalar(select(Users).where(Users.username == username))
 
     if not user:
         return templates.TemplateResponse(
             "login.html", {"request": request, "error": "ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง"}
         )
 
-    if not verify_password(password, user.password):
+    try:
+        ok, new_hash = await verify_and_update_async(password, user.password)
+    except HashPoolBusy:
+        return templates.TemplateResponse(
+            "login.html", {"request": request, "error": "ระบบไม่ว่าง ลองใหม่อีกครั้ง"}, status_code=503
+        )
+    if not ok:
         return templates.TemplateResponse(
             "login.html", {"request": request, "error": "ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง"}
         )
+    if new_hash:
+        # hash เดิมใช้ rounds เก่า -> อัปเกรดตอน login สำเร็จ
+        user.password = new_hash
+        await db.commit()
 
     if user.role == RoleEnum.kid:
-        return RedirectResponse(f"/kid/dashboard/{user.id}", status_code=303)
+        resp = RedirectResponse(f"/kid/dashboard/{user.id}", status_code=303)
     elif user.role == RoleEnum.parent:
-        return RedirectResponse(f"/parent/dashboard/{user.id}", status_code=303)
+        resp = RedirectResponse(f"/parent/dashboard/{user.id}", status_code=303)
     else:
         return RedirectResponse("/login", status_code=303)
+    ident = await db.run_sync(resolve, user.id)
+    return set_session_cookie(resp, ident)
+
+@router.get("/logout")
+def logout():
+    return clear_session_cookie(RedirectResponse("/login", status_code=303))
 
 @router.get("/register")
 def register_page(request: Request):
@@ -46,22 +64,27 @@ def register_page(request: Request):
 
 
 @router.post("/register")
-def register_user(
+async def register_user(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
     first_name: str = Form(...),
     role: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    existing = db.query(Users).filter(Users.username == username).first()
+    existing = await db.scalar(select(Users).where(Users.username == username))
     if existing:
         return templates.TemplateResponse(
             "register.html",
             {"request": request, "error": "ชื่อผู้ใช้นี้ถูกใช้แล้ว"},
         )
 
-    hashed_pw = hash_password(password)
+    try:
+        hashed_pw = await hash_password_async(password)
+    except HashPoolBusy:
+        return templates.TemplateResponse(
+            "register.html", {"request": request, "error": "ระบบไม่ว่าง ลองใหม่อีกครั้ง"}, status_code=503
+        )
 
     new_user = Users(
         username=username,
@@ -70,7 +93,6 @@ def register_user(
         role=RoleEnum(role),
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
 
     return RedirectResponse("/login", status_code=303)
\ No newline at end of file
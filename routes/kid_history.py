@@ -1,35 +1,53 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from config import get_db, templates
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_async_read_db, run_concurrently, templates
 from tables.users import Users, RoleEnum
 from tables.tasks import Task, TaskStatus
 from tables.reward_redeems import RewardRedeem, RedeemStatus
 from tables.rewards import Reward
+from utils.pagination import keyset_page
+from core.session import Identity, current_identity_async, owns
+from core import etag, archive
 
 router = APIRouter(prefix="/kid", tags=["Kid History"])
 
 @router.get("/history/{kid_id}", response_class=HTMLResponse, name="kid_history_page")
-def kid_history_page(kid_id: int, request: Request, db: Session = Depends(get_db)):
-    kid = db.get(Users, kid_id)
-    if not kid or kid.role != RoleEnum.kid:
+async def kid_history_page(kid_id: int, request: Request,
+                           tasks_cursor: str | None = None, redeems_cursor: str | None = None,
+                           ident: Identity | None = Depends(current_identity_async),
+                           db: AsyncSession = Depends(get_async_read_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
+    tag = etag.make(request, await db.run_sync(etag.kid_stamp, kid_id))
+    cached = etag.not_modified(request, tag)
+    if cached:
+        return cached
+    kid = await db.get(Users, kid_id)
+    if not kid:
         return RedirectResponse("/login", status_code=303)
 
-    tasks_done = (
-        db.query(Task)
-          .filter(Task.kid_id == kid_id, Task.status == TaskStatus.approved)
-          .order_by(Task.completed_at.desc().nullslast(), Task.created_at.desc())
-          .all()
-    )
-
-    redeems_ok = (
-        db.query(RewardRedeem, Reward)
-          .join(Reward, Reward.id == RewardRedeem.reward_id)
-          .filter(RewardRedeem.kid_id == kid_id, RewardRedeem.status == RedeemStatus.approved)
-          .order_by(RewardRedeem.reviewed_at.desc().nullslast(), RewardRedeem.created_at.desc())
-          .all()
+    # แถวเก่ากว่า horizon อยู่ในไฟล์ archive: archive.extend ต่อท้ายหน้าให้เหมือนอ่านตารางเดียว
+    task_key = lambda t: (t.completed_at, t.id)
+    redeem_key = lambda row: (row[0].reviewed_at, row[0].id)
+    tasks_page, redeems_page = await run_concurrently(
+        lambda s: keyset_page(
+            s.query(Task).filter(Task.kid_id == kid_id, Task.status == TaskStatus.approved),
+            Task.completed_at, Task.id, tasks_cursor, key=task_key,
+        ),
+        lambda s: keyset_page(
+            s.query(RewardRedeem, Reward)
+              .join(Reward, Reward.id == RewardRedeem.reward_id)
+              .filter(RewardRedeem.kid_id == kid_id, RewardRedeem.status == RedeemStatus.approved),
+            RewardRedeem.reviewed_at, RewardRedeem.id, redeems_cursor, key=redeem_key,
+        ),
+        db=db,
     )
+    tasks_done, next_tasks = await archive.extend(
+        db, "tasks", *tasks_page, tasks_cursor, task_key, (TaskStatus.approved,), kid_id=kid_id)
+    redeems_ok, next_redeems = await archive.extend(
+        db, "reward_redeems", *redeems_page, redeems_cursor, redeem_key, (RedeemStatus.approved,),
+        attach=archive.with_rewards, kid_id=kid_id)
 
     tasks_view = [{
         "task_id": t.id,
@@ -46,10 +64,14 @@ def kid_history_page(kid_id: int, request: Request, db: Session = Depends(get_db
 
     total_points = (kid.points or 0)
 
-    return templates.TemplateResponse("kid_history.html", {
+    return etag.tag_response(templates.TemplateResponse("kid_history.html", {
         "request": request,
         "kid": kid,
         "total_points": total_points,
         "tasks": tasks_view,
-        "redeems": rewards_view
-    })
+        "redeems": rewards_view,
+        "tasks_cursor": tasks_cursor,
+        "redeems_cursor": redeems_cursor,
+        "next_tasks": next_tasks,
+        "next_redeems": next_redeems,
+    }), tag)
@@ -1,54 +1,63 @@
 from fastapi import APIRouter, Request, Form, Depends, UploadFile, File
 from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select, exists
-import datetime, os, shutil, uuid
-from config import get_db, templates
+from sqlalchemy.ext.asyncio import AsyncSession
+import datetime
+from config import get_db, get_async_db, run_concurrently, templates
 from tables.users import Users, RoleEnum
 from tables.tasks import Task, TaskStatus
 from tables.submissions import Submission
 from tables.rewards import Reward
 from tables.reward_redeems import RewardRedeem, RedeemStatus
-from tables.families import FamilyMember, Family
-from utils.family import join_family as join_family_util
-from core.notify import toast
+from utils.family import join_family as join_family_util, family_of
+from utils.catalog import reward_catalog
+from core import counters, etag, live, outbox
+from core.storage import save_upload, UploadTooLarge
+from core.session import Identity, current_identity, current_identity_async, owns
 
 router = APIRouter(prefix="/kid", tags=["Kid Pages"])
 
 
 @router.get("/dashboard/{kid_id}", response_class=HTMLResponse)
-def dashboard_kid(kid_id: int, request: Request, db: Session = Depends(get_db)):
-    kid = db.get(Users, kid_id)
-    if not kid or kid.role != RoleEnum.kid:
+async def dashboard_kid(kid_id: int, request: Request,
+                        ident: Identity | None = Depends(current_identity_async),
+                        db: AsyncSession = Depends(get_async_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
+    tag = etag.make(request, await db.run_sync(etag.kid_stamp, kid_id))
+    cached = etag.not_modified(request, tag)
+    if cached:
+        return cached
+    kid = await db.get(Users, kid_id)
+    if not kid:
         return RedirectResponse("/login", status_code=303)
 
-    in_family = db.execute(
-        select(exists().where(
-            FamilyMember.user_id == kid_id,
-            FamilyMember.family_id.isnot(None),
-            FamilyMember.role == RoleEnum.kid
-        ))
-    ).scalar()
-
-    family_name = None
-    if in_family:
-        fam = db.query(Family).join(FamilyMember, FamilyMember.family_id == Family.id)\
-                              .filter(FamilyMember.user_id == kid_id).first()
-        family_name = fam.name if fam else None
+    fam = await db.run_sync(family_of, kid_id)
+    in_family = fam is not None
+    family_name = fam.name if fam else None
 
-        task_list = db.query(Task).filter(
+    # query ที่เหลือไม่ขึ้นต่อกัน -> ยิงพร้อมกันคนละ connection
+    task_list, cnt, rewards_view, pending_rows = await run_concurrently(
+        lambda s: s.query(Task).filter(
             Task.kid_id == kid_id,
             Task.status.in_([
                 TaskStatus.assigned,
                 TaskStatus.rejected,
                 TaskStatus.submitted
             ])
-        ).order_by(Task.created_at.desc()).all()
-    else:
-        task_list = []
-    count_new = db.query(Task).filter(Task.kid_id == kid_id, Task.status == TaskStatus.assigned).count()
-    count_pending = db.query(Task).filter(Task.kid_id == kid_id, Task.status == TaskStatus.submitted).count()
-    count_done = db.query(Task).filter(Task.kid_id == kid_id, Task.status == TaskStatus.approved).count()
+        ).order_by(Task.created_at.desc()).all() if in_family else [],
+        lambda s: counters.get_counters(s, kid_id),
+        lambda s: reward_catalog.for_kid(s, fam, kid_id) if in_family else (),
+        lambda s: (
+            s.query(RewardRedeem, Reward)
+            .join(Reward, Reward.id == RewardRedeem.reward_id)
+            .filter(RewardRedeem.kid_id == kid_id,
+                    RewardRedeem.status == RedeemStatus.pending)
+            .order_by(RewardRedeem.created_at.desc())
+            .all()
+        ),
+        db=db,
+    )
 
     status_map = {
         TaskStatus.assigned: "งานใหม่",
@@ -66,34 +75,6 @@ def dashboard_kid(kid_id: int, request: Request, db: Session = Depends(get_db)):
         "created_at": t.created_at.strftime("%d %b %Y %H:%M"),
     } for t in task_list]
 
-    all_rewards = db.query(Reward).all() if in_family else []
-    redeems = db.query(RewardRedeem).filter(RewardRedeem.kid_id == kid_id).all()
-    taken_status = {r.reward_id: r.status for r in redeems}
-
-    rewards_list = []
-    for r in all_rewards:
-        st = taken_status.get(r.id)
-        if st in {RedeemStatus.pending, RedeemStatus.approved}:
-            continue
-        rewards_list.append(r)
-
-    rewards_view = [{
-        "id": r.id,
-        "name": r.name,
-        "description": r.description or "",
-        "cost": r.cost,
-        "image_path": getattr(r, "image_path", None),
-    } for r in rewards_list]
-
-    pending_rows = (
-        db.query(RewardRedeem, Reward)
-        .join(Reward, Reward.id == RewardRedeem.reward_id)
-        .filter(RewardRedeem.kid_id == kid_id,
-                RewardRedeem.status == RedeemStatus.pending)
-        .order_by(RewardRedeem.created_at.desc())
-        .all()
-    )
-
     pending_rewards = [{
         "redeem_id": rr.id,
         "name": rw.name,
@@ -102,7 +83,7 @@ def dashboard_kid(kid_id: int, request: Request, db: Session = Depends(get_db)):
         "requested_at": rr.created_at.strftime("%d %b %Y %H:%M")
     } for (rr, rw) in pending_rows]
 
-    return templates.TemplateResponse("dashboard_kid.html", {
+    return etag.tag_response(templates.TemplateResponse("dashboard_kid.html", {
         "request": request,
         "kid": kid,
         "in_family": in_family,
@@ -110,57 +91,62 @@ def dashboard_kid(kid_id: int, request: Request, db: Session = Depends(get_db)):
         "tasks": tasks_view,
         "rewards": rewards_view,
         "pending_rewards": pending_rewards,
-        "count_new": count_new,
-        "count_pending": count_pending,
-        "count_done": count_done,
-    })
+        "count_new": cnt.assigned,
+        "count_pending": cnt.submitted,
+        "count_done": cnt.approved,
+        "count_pending_redeems": cnt.pending_redeems,
+    }), tag)
 
 
 @router.post("/join-family")
 def kid_join_family(kid_id: int = Form(...),
                     family_code: str = Form(...),
+                    ident: Identity | None = Depends(current_identity),
                     db: Session = Depends(get_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
     try:
         join_family_util(db, kid_id=kid_id, code=family_code)
         return RedirectResponse(f"/kid/dashboard/{kid_id}?ok=joined", status_code=303)
     except ValueError:
         return RedirectResponse(f"/kid/dashboard/{kid_id}?err=invalid_code", status_code=303)
 
-def _save_file(file: UploadFile):
-    upload_dir = "static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    filename = f"{uuid.uuid4().hex}_{file.filename}"
-    path = os.path.join(upload_dir, filename)
-    with open(path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return path
-
-
 @router.post("/submit/{task_id}", name="kid_submit_task")
 def submit_task(task_id: int,
                 kid_id: int = Form(...),
                 note: str = Form(""),
                 evidence: UploadFile = File(None),
+                ident: Identity | None = Depends(current_identity),
                 db: Session = Depends(get_db)):
-    task = db.get(Task, task_id)
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
+    task = db.get(Task, task_id, with_for_update=True)
     if not task or task.kid_id != kid_id:
         return RedirectResponse(f"/kid/dashboard/{kid_id}?err=no_task", status_code=303)
     if task.status not in [TaskStatus.assigned, TaskStatus.rejected]:
         return RedirectResponse(f"/kid/dashboard/{kid_id}?err=bad_status", status_code=303)
 
-    path = _save_file(evidence) if evidence else None
+    try:
+        path = save_upload(evidence)
+    except UploadTooLarge:
+        return RedirectResponse(f"/kid/dashboard/{kid_id}?err=file_too_large", status_code=303)
     sub = Submission(task_id=task_id, kid_id=kid_id,
                      message=note.strip(), evidence_path=path)
     db.add(sub)
+    counters.task_moved(db, kid_id, task.status, TaskStatus.submitted)
     task.status = TaskStatus.submitted
+    live.submission_added(db, sub, task, ident.first_name)
+    outbox.notify(db, task.parent_id, "task_submitted", "ส่งงานแล้ว", f"ภารกิจ {task.title} ถูกส่งเรียบร้อยแล้ว")
     db.commit()
-    toast("ส่งงานแล้ว",f"ภารกิจ {task.title} ถูกส่งเรียบร้อยแล้ว")
     return RedirectResponse(f"/kid/dashboard/{kid_id}?ok=submitted", status_code=303)
 
 @router.post("/redeem/{reward_id}")
 def redeem_reward(reward_id: int,
                   kid_id: int = Form(...),
+                  ident: Identity | None = Depends(current_identity),
                   db: Session = Depends(get_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
     dup = db.query(RewardRedeem).filter(
         RewardRedeem.kid_id == kid_id,
         RewardRedeem.reward_id == reward_id,
@@ -171,5 +157,9 @@ def redeem_reward(reward_id: int,
 
     rr = RewardRedeem(reward_id=reward_id, kid_id=kid_id)
     db.add(rr)
+    counters.redeem_moved(db, kid_id, None, RedeemStatus.pending)
+    rw = db.get(Reward, reward_id)
+    if rw:
+        live.redeem_added(db, rr, rw, ident.first_name)
     db.commit()
     return RedirectResponse(f"/kid/dashboard/{kid_id}?ok=redeem_requested", status_code=303)
\ No newline at end of file
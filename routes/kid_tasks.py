@@ -1,28 +1,24 @@
-from fastapi import APIRouter, Depends, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Form, UploadFile, File, HTTPException
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from config import get_db
+from config import get_db, get_read_db
 from tables.tasks import Task, TaskStatus
 from tables.submissions import Submission
 from tables.rewards import Reward
-from tables.reward_redeems import RewardRedeem
-from tables.families import FamilyMember
-import os, uuid, shutil
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from utils.family import family_of
+from utils.catalog import reward_catalog
+from core import counters, live, outbox
+from core.storage import save_upload, UploadTooLarge
+from core.session import Identity, current_identity, owns
+from tables.users import RoleEnum
 
 router = APIRouter(prefix="/kid", tags=["Kid Tasks/Rewards"])
 
-UPLOAD_DIR = "static/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-def _save_file(upload: UploadFile) -> str:
-    if not upload: return None
-    name = f"{uuid.uuid4().hex}_{upload.filename}"
-    path = os.path.join(UPLOAD_DIR, name)
-    with open(path, "wb") as f: shutil.copyfileobj(upload.file, f)
-    return path
-
 @router.get("/tasks/{kid_id}")
-def list_tasks(kid_id: int, db: Session = Depends(get_db)):
+def list_tasks(kid_id: int, ident: Identity | None = Depends(current_identity), db: Session = Depends(get_read_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        raise HTTPException(status_code=401)
     tasks = db.query(Task).filter(
         Task.kid_id == kid_id,
         Task.status.in_([TaskStatus.assigned, TaskStatus.rejected])
@@ -30,25 +26,42 @@ def list_tasks(kid_id: int, db: Session = Depends(get_db)):
     return {"tasks": [{"id": t.id, "title": t.title, "points": t.points, "status": t.status.value} for t in tasks]}
 
 @router.post("/{kid_id}/task/submit/{task_id}")
-def submit_task(kid_id: int, task_id: int, message: str = Form(""), file: UploadFile = File(None), db: Session = Depends(get_db)):
-    task = db.get(Task, task_id)
+def submit_task(kid_id: int, task_id: int, message: str = Form(""), file: UploadFile = File(None),
+                ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
+    # ล็อกแถวงาน: กดส่งซ้ำพร้อมกันต้องได้ submission เดียว
+    task = db.get(Task, task_id, with_for_update=True)
     if not task or task.kid_id != kid_id:
         return RedirectResponse(f"/kid/tasks/{kid_id}?err=no_task", status_code=303)
-    path = _save_file(file) if file else None
-    db.add(Submission(task_id=task_id, kid_id=kid_id, message=message.strip(), evidence_path=path))
+    if task.status not in (TaskStatus.assigned, TaskStatus.rejected):
+        return RedirectResponse(f"/kid/tasks/{kid_id}?err=bad_status", status_code=303)
+    try:
+        path = save_upload(file)
+    except UploadTooLarge:
+        return RedirectResponse(f"/kid/tasks/{kid_id}?err=file_too_large", status_code=303)
+    sub = Submission(task_id=task_id, kid_id=kid_id, message=message.strip(), evidence_path=path)
+    db.add(sub)
+    counters.task_moved(db, kid_id, task.status, TaskStatus.submitted)
     task.status = TaskStatus.submitted
+    live.submission_added(db, sub, task, ident.first_name)
+    outbox.notify(db, task.parent_id, "task_submitted", "ส่งงานแล้ว", f"ภารกิจ {task.title} ถูกส่งเรียบร้อยแล้ว")
     db.commit()
     return RedirectResponse(f"/kid/tasks/{kid_id}?ok=submitted", status_code=303)
 
 @router.get("/rewards/{kid_id}")
-def list_rewards(kid_id: int, db: Session = Depends(get_db)):
-    fam = db.query(FamilyMember).filter(FamilyMember.user_id == kid_id).first()
+def list_rewards(kid_id: int, ident: Identity | None = Depends(current_identity), db: Session = Depends(get_read_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        raise HTTPException(status_code=401)
+    fam = family_of(db, kid_id)
     if not fam: return {"rewards": []}
-    rewards = db.query(Reward).all()
+    rewards = reward_catalog.for_kid(db, fam, kid_id)
     return {"rewards": [{"id": r.id, "name": r.name, "cost": r.cost} for r in rewards]}
 
 @router.post("/{kid_id}/redeem/{reward_id}")
-def redeem_reward(kid_id: int, reward_id: int, db: Session = Depends(get_db)):
+def redeem_reward(kid_id: int, reward_id: int, ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, kid_id, RoleEnum.kid.value):
+        return RedirectResponse("/login", status_code=303)
     exists = db.query(RewardRedeem).filter(
         RewardRedeem.kid_id == kid_id,
         RewardRedeem.reward_id == reward_id,
@@ -56,5 +69,11 @@ def redeem_reward(kid_id: int, reward_id: int, db: Session = Depends(get_db)):
     ).first()
     if exists:
         return RedirectResponse(f"/kid/rewards/{kid_id}?err=dup", status_code=303)
-    db.add(RewardRedeem(reward_id=reward_id, kid_id=kid_id)); db.commit()
+    rr = RewardRedeem(reward_id=reward_id, kid_id=kid_id)
+    db.add(rr)
+    counters.redeem_moved(db, kid_id, None, RedeemStatus.pending)
+    rw = db.get(Reward, reward_id)
+    if rw:
+        live.redeem_added(db, rr, rw, ident.first_name)
+    db.commit()
     return RedirectResponse(f"/kid/rewards/{kid_id}?ok=requested", status_code=303)
\ No newline at end of file
@@ -1,26 +1,35 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from config import get_db, templates
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_async_read_db, templates
 from tables import users
 from tables.tasks import Task, TaskStatus
 from tables.submissions import Submission
+from utils.pagination import keyset_page
+from core.session import Identity, current_identity_async, owns
+from core import etag, archive
 
 router = APIRouter(prefix="/parent", tags=["Parent History"])
 
 @router.get("/history/{pid}", response_class=HTMLResponse, name="parent_history_page")
-def parent_history_page(pid: int, request: Request, db: Session = Depends(get_db)):
-    parent = db.get(users.Users, pid)
-    if not parent:
+async def parent_history_page(pid: int, request: Request, cursor: str | None = None,
+                              ident: Identity | None = Depends(current_identity_async),
+                              db: AsyncSession = Depends(get_async_read_db)):
+    if not owns(ident, pid, users.RoleEnum.parent.value):
         return RedirectResponse("/login", status_code=303)
+    tag = etag.make(request, await db.run_sync(etag.parent_stamp, pid))
+    cached = etag.not_modified(request, tag)
+    if cached:
+        return cached
 
-    tasks_done = (
-        db.query(Task)
-          .filter(Task.parent_id == pid, Task.status.in_([TaskStatus.approved, TaskStatus.rejected]))
-          .order_by(Task.completed_at.desc().nullslast(), Task.created_at.desc())
-          .all()
-    )
+    # งานอนุมัติแล้วที่เก่ากว่า horizon อยู่ในไฟล์ archive ; งานที่ไม่อนุมัติอยู่ใน DB เสมอ (เด็กส่งใหม่ได้)
+    statuses = (TaskStatus.approved, TaskStatus.rejected)
+    task_key = lambda t: (t.completed_at, t.id)
+    page = await db.run_sync(lambda s: keyset_page(
+        s.query(Task).filter(Task.parent_id == pid, Task.status.in_(statuses)),
+        Task.completed_at, Task.id, cursor, key=task_key,
+    ))
+    tasks_done, next_cursor = await archive.extend(db, "tasks", *page, cursor, task_key, statuses, parent_id=pid)
 
     status_map = {
         TaskStatus.approved: "เสร็จแล้ว",
@@ -40,8 +49,9 @@ def parent_history_page(pid: int, request: Request, db: Session = Depends(get_db
             "completed_at": t.completed_at.strftime("%d %b %Y %H:%M") if t.completed_at else "-",
         })
 
-    return templates.TemplateResponse("parent_history.html", {
+    return etag.tag_response(templates.TemplateResponse("parent_history.html", {
         "request": request,
         "pid": pid,
-        "items": items
-    })
+        "items": items,
+        "next_cursor": next_cursor,
+    }), tag)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import StreamingResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_async_db
+from tables.users import RoleEnum
+from utils.family import family_index
+from core.session import Identity, current_identity_async, owns
+from core.live import live_hub, Stream, LIVE_HEARTBEAT, LIVE_MAX_AGE
+import asyncio, time
+
+router = APIRouter(prefix="/parent", tags=["Parent Live"])
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class LiveResponse(StreamingResponse):
+    """คืนที่ของ stream เมื่อ response จบไม่ว่าทางไหน: client หลุด/ส่งไม่ได้ก่อน generator เริ่ม
+    finally ใน generator จะไม่ได้รัน และ background ของ starlette ก็ถูกข้ามเมื่อการส่ง raise"""
+
+    def __init__(self, content, stream: Stream, **kw):
+        super().__init__(content, **kw)
+        self.stream = stream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await live_hub.unsubscribe(self.stream)
+
+
+@router.get("/live/{pid}", name="parent_live")
+async def parent_live(pid: int, request: Request,
+                      ident: Identity | None = Depends(current_identity_async),
+                      db: AsyncSession = Depends(get_async_db)):
+    """SSE: event submission / redeem (แถวใหม่) , submission_done / redeem_done (ids ที่ตัดสินแล้ว)
+    resync (ให้โหลดหน้าใหม่) และ rotate (อายุครบ ให้เปิด stream ใหม่ก่อนแล้วค่อยปิดอันนี้) เฉพาะของผู้ปกครองคนนี้"""
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return Response(status_code=401)
+    families = await db.run_sync(family_index.family_ids, pid)
+    await db.close()  # stream เปิดค้างได้นาน ห้ามถือ connection ของ pool ไว้
+    if not families:
+        return Response(status_code=204)  # EventSource จะไม่ต่อใหม่
+    stream = await live_hub.subscribe(pid, families)
+    if stream is None:
+        return Response(status_code=503, headers={"Retry-After": "30"})
+
+    async def events():
+        deadline = time.monotonic() + LIVE_MAX_AGE
+        yield "retry: 5000\n\n"
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                yield "event: rotate\ndata: {}\n\n"
+                await asyncio.sleep(2)  # ให้ stream ใหม่ต่อติดก่อน event ระหว่างนี้ยังส่งทางนี้ได้
+                return
+            try:
+                event, data = await asyncio.wait_for(stream.queue.get(), min(LIVE_HEARTBEAT, left))
+            except asyncio.TimeoutError:
+                # เขียนไม่ได้ = client หลุด -> starlette เลิกส่ง แล้ว LiveResponse คืนที่ให้
+                await live_hub.ensure()
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event}\ndata: {data}\n\n"
+            if event == "resync":
+                return
+
+    return LiveResponse(events(), stream, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,76 +1,94 @@
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import RedirectResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from config import get_db, templates, now_th
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete
+from config import get_db, get_async_db, run_concurrently, templates, now_th
 from tables.users import Users, RoleEnum
-from tables.families import Family, FamilyMember
 from tables.rewards import Reward
 from tables.tasks import Task, TaskStatus
 from tables.submissions import Submission
 from tables.reward_redeems import RewardRedeem, RedeemStatus
-from utils.family import create_family
+from tables.task_templates import TaskTemplate
+from utils.family import create_family, owned_family, family_index
+from utils.pagination import keyset_page
+from core.session import Identity, current_identity, current_identity_async, owns
 import datetime
-from core.notify import toast
+from core import counters, points, etag, live, outbox
 
 router = APIRouter(prefix="/parent", tags=["Parent Pages"])
 
 @router.get("/dashboard/{pid}", response_class=HTMLResponse)
-def dashboard_parent(pid: int, request: Request, db: Session = Depends(get_db)):
-    parent = db.get(Users, pid)
-    if not parent or parent.role != RoleEnum.parent:
+async def dashboard_parent(pid: int, request: Request,
+                           ident: Identity | None = Depends(current_identity_async),
+                           db: AsyncSession = Depends(get_async_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
         return RedirectResponse("/login", status_code=303)
+    parent = ident
+    tag = etag.make(request, await db.run_sync(etag.parent_stamp, pid))
+    cached = etag.not_modified(request, tag)
+    if cached:
+        return cached
 
-    fam = db.query(Family).filter(Family.owner_parent_id == pid).first()
-    kids = db.query(Users).join(FamilyMember, FamilyMember.user_id == Users.id).filter(
-        FamilyMember.family_id.in_(
-            db.query(FamilyMember.family_id).filter(FamilyMember.user_id == pid)
-        ),
-        Users.role == RoleEnum.kid
-    ).all()
+    def family_view(s: Session):
+        fam = owned_family(s, pid)
+        families = [family_index.family(s, fid) for fid in family_index.family_ids(s, pid)]
+        return fam, {uid for info in families if info for uid in info.user_ids(RoleEnum.kid.value)}
+    fam, kid_ids = await db.run_sync(family_view)
 
-    rewards = db.query(Reward).filter(Reward.parent_id == pid).all()
+    kids, rewards, task_templates = await run_concurrently(
+        lambda s: s.query(Users).filter(Users.id.in_(kid_ids)).order_by(Users.id).all() if kid_ids else [],
+        lambda s: s.query(Reward).filter(Reward.parent_id == pid).all(),
+        lambda s: s.query(TaskTemplate).filter(
+            TaskTemplate.parent_id == pid, TaskTemplate.active.is_(True)
+        ).order_by(TaskTemplate.id).all(),
+        db=db,
+    )
 
-    return templates.TemplateResponse("dashboard_parent.html", {
+    return etag.tag_response(templates.TemplateResponse("dashboard_parent.html", {
         "request": request,
         "parent": parent,
         "pid": pid,
         "family_code": fam.code if fam else None,
         "kids": kids,
-        "rewards": rewards
-    })
+        "rewards": rewards,
+        "task_templates": task_templates,
+    }), tag)
 
 @router.post("/{pid}/family/create")
-def create_family_route(pid: int, family_name: str = Form(...), db: Session = Depends(get_db)):
-    parent = db.get(Users, pid)
-    if not parent or parent.role != RoleEnum.parent:
+def create_family_route(pid: int, family_name: str = Form(...),
+                        ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
         return RedirectResponse("/login", status_code=303)
     name = family_name.strip()
     if not (1 <= len(name) <= 80):
         return RedirectResponse(f"/parent/dashboard/{pid}?err=bad_name", status_code=303)
-    exists = db.query(Family).filter(Family.owner_parent_id == pid).first()
+    exists = owned_family(db, pid)
     if exists:
         return RedirectResponse(f"/parent/dashboard/{pid}?ok=already_have&code={exists.code}", status_code=303)
     fam = create_family(db, parent_id=pid, family_name=name)
     return RedirectResponse(f"/parent/dashboard/{pid}?ok=created&code={fam.code}", status_code=303)
 
 @router.get("/submissions/{pid}", response_class=HTMLResponse, name="parent_review_page")
-def review_page(pid: int, request: Request, db: Session = Depends(get_db)):
-    parent = db.get(Users, pid)
-    if not parent or parent.role != RoleEnum.parent:
+async def review_page(pid: int, request: Request,
+                      ident: Identity | None = Depends(current_identity_async),
+                      db: AsyncSession = Depends(get_async_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
         return RedirectResponse("/login", status_code=303)
+    parent = ident
 
-    subs = (
-        db.query(Submission)
-        .join(Task, Task.id == Submission.task_id)
-        .filter(Task.parent_id == pid, Submission.status == "pending")
+    subs = (await db.scalars(
+        select(Submission)
+        .join(Submission.task)
+        .options(contains_eager(Submission.task), joinedload(Submission.kid))
+        .where(Task.parent_id == pid, Submission.status == "pending")
         .order_by(Submission.created_at.desc())
-        .all()
-    )
+    )).unique().all()
 
     items = []
     for s in subs:
-        t = db.get(Task, s.task_id)
-        kid = db.get(Users, s.kid_id)
+        t = s.task
+        kid = s.kid
         items.append({
             "submission_id": s.id,
             "task_id": s.task_id,
@@ -96,53 +114,122 @@ def decide_submission(
     sid: int,
     pid: int = Form(...),
     approve: str = Form(...),
+    ident: Identity | None = Depends(current_identity),
     db: Session = Depends(get_db),
 ):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
     sub = db.get(Submission, sid)
     if not sub:
         return RedirectResponse(f"/parent/submissions/{pid}?err=no_submission", status_code=303)
 
-    task = db.get(Task, sub.task_id)
-    kid  = db.get(Users, sub.kid_id)
+    # ล็อกแถวงานไว้ กันกดอนุมัติซ้ำพร้อมกันแล้วได้แต้มสองรอบ
+    task = db.get(Task, sub.task_id, with_for_update=True)
 
     if not task or task.parent_id != pid:
         return RedirectResponse(f"/parent/submissions/{pid}?err=unauthorized", status_code=303)
+    if task.status != TaskStatus.submitted:
+        return RedirectResponse(f"/parent/submissions/{pid}?err=bad_status", status_code=303)
 
     if approve == "yes":
-        if kid:
-            kid.points = (kid.points or 0) + (task.points or 0)
-            task.completed_at = now_th()
-            toast("อนุมัติงานแล้ว ✅", f"เด็กได้รับแต้ม {task.points} จาก {task.title}")
-            sub.status = "approved"
-            task.status = TaskStatus.approved
+        task.completed_at = now_th()
+        sub.status = "approved"
+        counters.task_moved(db, task.kid_id, task.status, TaskStatus.approved)
+        task.status = TaskStatus.approved
+        points.award(db, task.kid_id, task.points, task_id=task.id)
     else:
+        counters.task_moved(db, task.kid_id, task.status, TaskStatus.rejected)
         task.status = TaskStatus.rejected
-        task.completed_at = None
-        toast("ปฏิเสธงานแล้ว ❌", f"ภารกิจ {task.title} ถูกปฏิเสธ")
+        task.completed_at = now_th()
         sub.status = "rejected"
         sub.reviewed_at = now_th()
+    live.done(db, task.kid_id, pid, "submission", [sid])
+    if approve == "yes":
+        outbox.notify(db, task.kid_id, "task_approved", "อนุมัติงานแล้ว ✅", f"เด็กได้รับแต้ม {task.points} จาก {task.title}")
+    else:
+        outbox.notify(db, task.kid_id, "task_rejected", "ปฏิเสธงานแล้ว ❌", f"ภารกิจ {task.title} ถูกปฏิเสธ")
     db.delete(sub)
     db.commit()
 
     return RedirectResponse(f"/parent/submissions/{pid}?ok=done", status_code=303)
 
+@router.post("/submission/decision-batch", name="parent_decide_submissions_batch")
+def decide_submissions_batch(
+    request: Request,
+    pid: int = Form(...),
+    approve: str = Form(...),
+    sid: list[int] = Form(default=[]),
+    ident: Identity | None = Depends(current_identity),
+    db: Session = Depends(get_db),
+):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+
+    ids = list(dict.fromkeys(sid))
+    new_status = TaskStatus.approved if approve == "yes" else TaskStatus.rejected
+    decided = []
+    if ids:
+        # เช็กเจ้าของ + สถานะใน UPDATE ... FROM เดียว แถวที่ไม่ผ่านจะไม่ถูกแตะ (ใช้ Core table
+        # เพราะ ORM update ไม่รองรับ RETURNING คอลัมน์จากตารางใน FROM)
+        t, s = Task.__table__, Submission.__table__
+        decided = db.execute(
+            update(t)
+            .where(t.c.id == s.c.task_id, s.c.id.in_(ids),
+                   t.c.parent_id == pid, t.c.status == TaskStatus.submitted)
+            .values(status=new_status, completed_at=now_th())
+            .returning(s.c.id, t.c.id, t.c.kid_id, t.c.points, t.c.title)
+        ).all()
+
+    per_kid: dict[int, int] = {}
+    for _, _, kid_id, _, _ in decided:
+        per_kid[kid_id] = per_kid.get(kid_id, 0) + 1
+    field = counters.TASK_FIELD[new_status]
+    counters.bump_many(db, {kid_id: {"submitted": -n, field: n} for kid_id, n in per_kid.items()},
+                       already_applied=True)
+    if new_status == TaskStatus.approved:
+        points.award_many(db, [(kid_id, pts, task_id) for _, task_id, kid_id, pts, _ in decided])
+    by_kid: dict[int, list[int]] = {}
+    for sub_id, _, kid_id, _, _ in decided:
+        by_kid.setdefault(kid_id, []).append(sub_id)
+    for kid_id, sub_ids in by_kid.items():
+        live.done(db, kid_id, pid, "submission", sub_ids)
+    for _, _, kid_id, pts, title in decided:
+        if new_status == TaskStatus.approved:
+            outbox.notify(db, kid_id, "task_approved", "อนุมัติงานแล้ว ✅", f"เด็กได้รับแต้ม {pts} จาก {title}")
+        else:
+            outbox.notify(db, kid_id, "task_rejected", "ปฏิเสธงานแล้ว ❌", f"ภารกิจ {title} ถูกปฏิเสธ")
+    if decided:
+        db.execute(delete(Submission).where(Submission.id.in_([row[0] for row in decided])),
+                   execution_options={"synchronize_session": False})
+    db.commit()
+
+    done = {row[0]: new_status.value for row in decided}
+    results = [{"submission_id": i, "result": done.get(i, "skipped")} for i in ids]
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse({"decided": len(done), "skipped": len(ids) - len(done), "results": results})
+    return RedirectResponse(
+        f"/parent/submissions/{pid}?ok=batch&decided={len(done)}&skipped={len(ids) - len(done)}", status_code=303
+    )
+
 @router.get("/redeems/{pid}", response_class=HTMLResponse, name="parent_redeems_page")
-def parent_redeems_page(pid: int, request: Request, db: Session = Depends(get_db)):
-    parent = db.get(Users, pid)
-    if not parent or parent.role != RoleEnum.parent:
+def parent_redeems_page(pid: int, request: Request, cursor: str | None = None,
+                        ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
         return RedirectResponse("/login", status_code=303)
 
-    reqs = (
+    q = (
         db.query(RewardRedeem)
-        .filter(RewardRedeem.status == RedeemStatus.pending)
-        .order_by(RewardRedeem.created_at.desc())
-        .all()
+        .join(RewardRedeem.reward)
+        .options(contains_eager(RewardRedeem.reward), joinedload(RewardRedeem.kid))
+        .filter(Reward.parent_id == pid, RewardRedeem.status == RedeemStatus.pending)
     )
+    reqs, next_cursor = keyset_page(q, RewardRedeem.created_at, RewardRedeem.id, cursor,
+                                    key=lambda rr: (rr.created_at, rr.id))
 
     items = []
     for rr in reqs:
-        kid = db.get(Users, rr.kid_id)
-        rw  = db.get(Reward, rr.reward_id)
+        kid = rr.kid
+        rw  = rr.reward
         if not kid or not rw:
             continue
         items.append({
@@ -157,7 +244,8 @@ def parent_redeems_page(pid: int, request: Request, db: Session = Depends(get_db
     return templates.TemplateResponse("redeems_parent.html", {
         "request": request,
         "pid": pid,
-        "items": items
+        "items": items,
+        "next_cursor": next_cursor,
     })
 
 
@@ -166,31 +254,43 @@ def parent_redeem_decision(
     redeem_id: int,
     pid: int = Form(...),
     approve: str = Form(...),
+    ident: Identity | None = Depends(current_identity),
     db: Session = Depends(get_db),
 ):
-    rr = db.get(RewardRedeem, redeem_id)
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+    rr = db.get(RewardRedeem, redeem_id, with_for_update=True)
     if not rr:
         return RedirectResponse(f"/parent/redeems/{pid}?err=no_redeem", status_code=303)
 
-    kid = db.get(Users, rr.kid_id)
     rw  = db.get(Reward, rr.reward_id)
-    if not kid or not rw:
+    if not rw or rw.parent_id != pid:
         return RedirectResponse(f"/parent/redeems/{pid}?err=bad_ref", status_code=303)
+    if rr.status != RedeemStatus.pending:
+        return RedirectResponse(f"/parent/redeems/{pid}?err=bad_status", status_code=303)
 
     if approve == "yes":
-        if (kid.points or 0) < (rw.cost or 0):
+        if points.spend(db, rr.kid_id, rw.cost, redeem_id=rr.id) is None:
+            counters.redeem_moved(db, rr.kid_id, rr.status, RedeemStatus.rejected)
             rr.status = RedeemStatus.rejected
-            toast("ยืนยันการแลกของรางวัล 🎁", f"อนุมัติแลก {Reward.name} สำเร็จ")
+            rr.reviewed_at = now_th()
+            live.done(db, rr.kid_id, pid, "redeem", [rr.id])
+            outbox.notify(db, rr.kid_id, "redeem_rejected", "แต้มไม่พอแลกของรางวัล", f"ไม่สามารถแลก {rw.name} ได้ แต้มไม่พอ")
             db.commit()
             return RedirectResponse(f"/parent/redeems/{pid}?err=insufficient_points", status_code=303)
 
-        kid.points = (kid.points or 0) - (rw.cost or 0)
+        counters.redeem_moved(db, rr.kid_id, rr.status, RedeemStatus.approved)
         rr.status = RedeemStatus.approved
-        rr.reviewed_at = rr.reviewed_at or __import__("datetime").datetime.utcnow()
+        rr.reviewed_at = rr.reviewed_at or now_th()
+        live.done(db, rr.kid_id, pid, "redeem", [rr.id])
+        outbox.notify(db, rr.kid_id, "redeem_approved", "แลกของรางวัลสำเร็จ 🎁", f"อนุมัติแลก {rw.name} แล้ว")
         db.commit()
         return RedirectResponse(f"/parent/redeems/{pid}?ok=approved", status_code=303)
 
+    counters.redeem_moved(db, rr.kid_id, rr.status, RedeemStatus.rejected)
     rr.status = RedeemStatus.rejected
-    rr.reviewed_at = rr.reviewed_at or __import__("datetime").datetime.utcnow()
+    rr.reviewed_at = rr.reviewed_at or now_th()
+    live.done(db, rr.kid_id, pid, "redeem", [rr.id])
+    outbox.notify(db, rr.kid_id, "redeem_rejected", "ปฏิเสธการแลกของรางวัล", f"คำขอแลก {rw.name} ถูกปฏิเสธ")
     db.commit()
     return RedirectResponse(f"/parent/redeems/{pid}?ok=rejected", status_code=303)
\ No newline at end of file
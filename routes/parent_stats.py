@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from config import get_async_db, templates, now_th
+from tables.users import Users, RoleEnum
+from utils.family import family_index
+from core.session import Identity, current_identity_async, owns
+from core import etag, rollups
+
+router = APIRouter(prefix="/parent", tags=["Parent Stats"])
+
+
+def family_stats(db: Session, pid: int) -> dict:
+    """อันดับเด็กในครอบครัวสัปดาห์นี้/เดือนนี้ + ยอดรายเดือน อ่านจาก kid_daily_stats อย่างเดียว"""
+    kid_ids = sorted({uid for fid in family_index.family_ids(db, pid)
+                      if (info := family_index.family(db, fid)) for uid in info.user_ids(RoleEnum.kid.value)})
+    names = dict(db.execute(select(Users.id, Users.first_name).where(Users.id.in_(kid_ids))).all()) if kid_ids else {}
+    today = now_th().date()
+    week = rollups.totals(db, kid_ids, rollups.week_start(today))
+    month = rollups.totals(db, kid_ids, today.replace(day=1))
+    leaderboard = sorted(
+        ({"kid_id": kid, "name": names.get(kid, ""), "week": week[kid], "month": month[kid]} for kid in kid_ids),
+        key=lambda r: (-r["week"]["points_earned"], -r["week"]["tasks_completed"], r["kid_id"]),
+    )
+    return {
+        "today": today.isoformat(),
+        "week_start": rollups.week_start(today).isoformat(),
+        "leaderboard": leaderboard,
+        "monthly": rollups.monthly(db, kid_ids),
+    }
+
+
+async def _stats_or_cached(pid: int, request: Request, db: AsyncSession):
+    # ยอดเปลี่ยนเมื่อมีการอนุมัติ (kid_counters.version ขยับ) หรือขึ้นวัน/สัปดาห์ใหม่
+    stamp = await db.run_sync(etag.parent_stamp, pid)
+    tag = etag.make(request, (stamp, now_th().date()))
+    cached = etag.not_modified(request, tag)
+    if cached:
+        return tag, cached, None
+    return tag, None, await db.run_sync(family_stats, pid)
+
+
+@router.get("/stats/{pid}.json", name="parent_stats_json")
+async def parent_stats_json(pid: int, request: Request,
+                            ident: Identity | None = Depends(current_identity_async),
+                            db: AsyncSession = Depends(get_async_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+    tag, cached, stats = await _stats_or_cached(pid, request, db)
+    return cached or etag.tag_response(JSONResponse(stats), tag)
+
+
+@router.get("/stats/{pid}", response_class=HTMLResponse, name="parent_stats_page")
+async def parent_stats_page(pid: int, request: Request,
+                            ident: Identity | None = Depends(current_identity_async),
+                            db: AsyncSession = Depends(get_async_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+    tag, cached, stats = await _stats_or_cached(pid, request, db)
+    if cached:
+        return cached
+    return etag.tag_response(templates.TemplateResponse("parent_stats.html", {
+        "request": request,
+        "pid": pid,
+        **stats,
+    }), tag)
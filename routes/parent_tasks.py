@@ -6,48 +6,122 @@ from tables.tasks import Task, TaskStatus
 from tables.submissions import Submission, SubmissionStatus
 from tables.rewards import Reward
 from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.task_templates import TaskTemplate
+from core.scheduler import parse_rule
 from utils.family import is_same_family
+from core import counters, points, etag, live, outbox
+from core.session import Identity, current_identity, owns
+from tables.users import RoleEnum
 from datetime import datetime
 
 router = APIRouter(prefix="/parent", tags=["Parent Tasks/Rewards"])
 
 @router.post("/{pid}/task/create")
 def create_task(pid: int, kid_id: int = Form(...), title: str = Form(...),
-                description: str = Form(""), points: int = Form(...), db: Session = Depends(get_db)):
+                description: str = Form(""), points: int = Form(...),
+                ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
     if not is_same_family(db, parent_id=pid, kid_id=kid_id):
         return RedirectResponse(f"/parent/dashboard/{pid}?err=not_in_family", status_code=303)
     t = Task(title=title.strip(), description=description.strip(), points=points, parent_id=pid, kid_id=kid_id)
-    db.add(t); db.commit()
+    db.add(t)
+    counters.task_moved(db, kid_id, None, TaskStatus.assigned)
+    db.commit()
     return RedirectResponse(f"/parent/dashboard/{pid}?ok=task_created", status_code=303)
 
+@router.post("/{pid}/template/create")
+def create_template(pid: int, kid_id: int = Form(...), title: str = Form(...),
+                    description: str = Form(""), points: int = Form(...), rule: str = Form("daily"),
+                    ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+    if not is_same_family(db, parent_id=pid, kid_id=kid_id):
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=not_in_family", status_code=303)
+    rule = rule.strip().lower()
+    try:
+        parse_rule(rule)
+    except ValueError:
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=bad_rule", status_code=303)
+    db.add(TaskTemplate(parent_id=pid, kid_id=kid_id, title=title.strip(), description=description.strip(),
+                        points=points, rule=rule))
+    etag.touch(db, pid)
+    db.commit()
+    return RedirectResponse(f"/parent/dashboard/{pid}?ok=template_created", status_code=303)
+
+@router.post("/{pid}/template/{template_id}/stop")
+def stop_template(pid: int, template_id: int,
+                  ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+    tpl = db.get(TaskTemplate, template_id)
+    if not tpl or tpl.parent_id != pid:
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=forbidden", status_code=303)
+    tpl.active = False
+    etag.touch(db, pid)
+    db.commit()
+    return RedirectResponse(f"/parent/dashboard/{pid}?ok=template_stopped", status_code=303)
+
 @router.post("/{pid}/submission/decision/{sid}")
-def decide_submission(pid: int, sid: int, approve: str = Form(...), db: Session = Depends(get_db)):
+def decide_submission(pid: int, sid: int, approve: str = Form(...),
+                      ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
     sub = db.get(Submission, sid)
     if not sub: return RedirectResponse(f"/parent/dashboard/{pid}", status_code=303)
-    task = db.get(Task, sub.task_id)
+    task = db.get(Task, sub.task_id, with_for_update=True)
     if not task or task.parent_id != pid:
         return RedirectResponse(f"/parent/dashboard/{pid}?err=forbidden", status_code=303)
+    if task.status != TaskStatus.submitted:
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=bad_status", status_code=303)
+    new_status = TaskStatus.approved if approve == "yes" else TaskStatus.rejected
+    counters.task_moved(db, task.kid_id, task.status, new_status)
     if approve == "yes":
         sub.status = SubmissionStatus.approved; task.status = TaskStatus.approved
+        points.award(db, task.kid_id, task.points, task_id=task.id)
+        outbox.notify(db, task.kid_id, "task_approved", "อนุมัติงานแล้ว ✅", f"เด็กได้รับแต้ม {task.points} จาก {task.title}")
     else:
         sub.status = SubmissionStatus.rejected; task.status = TaskStatus.rejected
+        outbox.notify(db, task.kid_id, "task_rejected", "ปฏิเสธงานแล้ว ❌", f"ภารกิจ {task.title} ถูกปฏิเสธ")
     sub.reviewed_at = now_th()
+    task.completed_at = sub.reviewed_at
+    live.done(db, task.kid_id, pid, "submission", [sid])
+    db.delete(sub)
     db.commit()
-    db.delete(sub); db.commit()
     return RedirectResponse(f"/parent/dashboard/{pid}?ok=reviewed", status_code=303)
 
 @router.post("/{pid}/reward/add")
 def add_reward(pid: int, name: str = Form(...), cost: int = Form(...),
-               description: str = Form(""), db: Session = Depends(get_db)):
+               description: str = Form(""),
+               ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
     r = Reward(parent_id=pid, name=name.strip(), description=description.strip(), cost=cost)
-    db.add(r); db.commit()
+    db.add(r); etag.touch(db, pid); db.commit()
     return RedirectResponse(f"/parent/dashboard/{pid}?ok=reward_added", status_code=303)
 
 @router.post("/{pid}/redeem/decision/{rid}")
-def decide_redeem(pid: int, rid: int, approve: str = Form(...), db: Session = Depends(get_db)):
-    rr = db.get(RewardRedeem, rid)
+def decide_redeem(pid: int, rid: int, approve: str = Form(...),
+                  ident: Identity | None = Depends(current_identity), db: Session = Depends(get_db)):
+    if not owns(ident, pid, RoleEnum.parent.value):
+        return RedirectResponse("/login", status_code=303)
+    rr = db.get(RewardRedeem, rid, with_for_update=True)
     if not rr: return RedirectResponse(f"/parent/dashboard/{pid}", status_code=303)
-    rr.status = RedeemStatus.approved if approve == "yes" else RedeemStatus.rejected
+    rw = db.get(Reward, rr.reward_id)
+    if not rw or rw.parent_id != pid:
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=forbidden", status_code=303)
+    if rr.status != RedeemStatus.pending:
+        return RedirectResponse(f"/parent/dashboard/{pid}?err=bad_status", status_code=303)
+    new_status = RedeemStatus.approved if approve == "yes" else RedeemStatus.rejected
+    if new_status == RedeemStatus.approved and points.spend(db, rr.kid_id, rw.cost, redeem_id=rr.id) is None:
+        new_status = RedeemStatus.rejected
+    counters.redeem_moved(db, rr.kid_id, rr.status, new_status)
+    rr.status = new_status
     rr.reviewed_at = now_th()
+    live.done(db, rr.kid_id, pid, "redeem", [rr.id])
+    if new_status == RedeemStatus.approved:
+        outbox.notify(db, rr.kid_id, "redeem_approved", "แลกของรางวัลสำเร็จ 🎁", f"อนุมัติแลก {rw.name} แล้ว")
+    else:
+        outbox.notify(db, rr.kid_id, "redeem_rejected", "ปฏิเสธการแลกของรางวัล", f"คำขอแลก {rw.name} ถูกปฏิเสธ")
     db.commit()
     return RedirectResponse(f"/parent/dashboard/{pid}?ok=redeem_reviewed", status_code=303)
\ No newline at end of file
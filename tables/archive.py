@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Index
+from config import Base, now_th
+
+# หนึ่งครั้งที่รัน `manage.py archive` : แถวอนุมัติแล้วที่เก่ากว่า cutoff ถูกย้ายไปไฟล์หมดแล้ว
+class ArchiveRun(Base):
+    __tablename__ = "archive_runs"
+    id = Column(Integer, primary_key=True)
+    cutoff = Column(DateTime(timezone=True), nullable=False)
+    tasks = Column(Integer, nullable=False, default=0)
+    redeems = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
+
+# ไฟล์ไหนมีแถวของใคร (tasks: kid + parent, reward_redeems: kid + reward) สถานะอะไร กี่แถว
+class ArchiveIndex(Base):
+    __tablename__ = "archive_index"
+    id = Column(BigInteger, primary_key=True)
+    run_id = Column(Integer, ForeignKey("archive_runs.id", ondelete="CASCADE"), nullable=False)
+    table_name = Column(String(32), nullable=False)
+    month = Column(Date, nullable=False)
+    path = Column(String, nullable=False)     # relative กับ ARCHIVE_DIR
+    kid_id = Column(Integer, nullable=False)
+    parent_id = Column(Integer, nullable=True)
+    reward_id = Column(Integer, nullable=True)
+    status = Column(String(16), nullable=False)
+    rows = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_archive_kid", "table_name", "kid_id", "status", "month"),
+        Index("ix_archive_parent", "table_name", "parent_id", "status", "month"),
+    )
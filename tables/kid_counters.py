@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from config import Base, now_th
+
+class KidCounters(Base):
+    __tablename__ = "kid_counters"
+    kid_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    assigned = Column(Integer, nullable=False, default=0)
+    submitted = Column(Integer, nullable=False, default=0)
+    approved = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    pending_redeems = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=now_th, onupdate=now_th)
+    # +1 ทุกครั้งที่แถวนี้เปลี่ยน ใช้ทำ ETag หน้าของเด็ก (core/etag.py)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
+from config import Base
+
+# ยอดรวมรายวันต่อเด็ก (วันตามเวลาไทย) อัปเดตใน transaction เดียวกับการอนุมัติ (core/rollups.py)
+# หน้าสถิติ/อันดับอ่านจากตารางนี้อย่างเดียว ไม่ต้องไล่ tasks/reward_redeems ทั้งประวัติ
+class KidDailyStats(Base):
+    __tablename__ = "kid_daily_stats"
+    kid_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    points_earned = Column(Integer, nullable=False, default=0, server_default="0")
+    points_spent = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    __table_args__ = (Index("ix_daily_stats_day", "day"),)
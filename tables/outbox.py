@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from config import Base, now_th
+
+# งานที่ต้องทำหลัง commit (แจ้งเตือน ฯลฯ) เขียนลงตารางนี้ใน transaction เดียวกับการเปลี่ยนข้อมูล
+# worker (core/outbox.py) หยิบไปทำทีหลัง: process ตายกลางทางก็ไม่หาย ถ้า rollback ก็ไม่เกิด
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+    id = Column(BigInteger, primary_key=True)
+    topic = Column(String(32), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
+    # ทำไม่สำเร็จจะเลื่อนออกไปตาม backoff
+    available_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    # ลองครบ OUTBOX_MAX_ATTEMPTS แล้ว worker ข้ามแถวนี้ (ดูสาเหตุที่ last_error)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (Index("ix_outbox_ready", "available_at", "id", postgresql_where=text("failed_at IS NULL")),)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from config import Base, now_th
+
+class PointsLedger(Base):
+    __tablename__ = "points_ledger"
+    id = Column(BigInteger, primary_key=True)
+    kid_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    balance_after = Column(Integer, nullable=False)
+    reason = Column(String(32), nullable=False)
+    # ใน DB ไม่มี FK แล้ว (tasks/reward_redeems แบ่ง partition) งานที่ถูก archive ยังอ้าง id เดิมได้
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
+    redeem_id = Column(Integer, ForeignKey("reward_redeems.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
+    __table_args__ = (Index("ix_ledger_kid_created", "kid_id", "created_at"),)
+
+class PointsSnapshot(Base):
+    __tablename__ = "points_snapshots"
+    id = Column(BigInteger, primary_key=True)
+    kid_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    balance = Column(Integer, nullable=False)
+    # แถว ledger สุดท้ายที่รวมอยู่ใน balance แล้ว
+    last_ledger_id = Column(BigInteger, nullable=False, default=0)
+    __table_args__ = (Index("ix_snapshot_kid_asof", "kid_id", "as_of"),)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, Index, CheckConstraint
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from config import Base, now_th
@@ -8,11 +9,22 @@ class RedeemStatus(str, enum.Enum):
     approved = "approved"
     rejected = "rejected"
 
+# แบ่ง partition รายเดือนตาม created_at เหมือน tasks (PK จริงคือ (id, created_at))
 class RewardRedeem(Base):
     __tablename__ = "reward_redeems"
     id = Column(Integer, primary_key=True)
     reward_id = Column(Integer, ForeignKey("rewards.id", ondelete="CASCADE"), nullable=False)
     kid_id    = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(RedeemStatus), nullable=False, default=RedeemStatus.pending)
-    created_at = Column(DateTime(timezone=True), default=now_th)
-    reviewed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
+    reviewed_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (
+        Index("ix_redeem_reward_status_created", "reward_id", "status", "created_at"),
+        Index("ix_redeem_kid_status_reviewed", "kid_id", "status", "reviewed_at"),
+        CheckConstraint("status NOT IN ('approved', 'rejected') OR reviewed_at IS NOT NULL",
+                        name="ck_redeem_decided_reviewed_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    reward = relationship("Reward", back_populates="redeems")
+    kid = relationship("Users", foreign_keys=[kid_id])
\ No newline at end of file
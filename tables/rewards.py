@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from config import Base, now_th
 
@@ -10,4 +11,8 @@ class Reward(Base):
     description = Column(Text)
     cost = Column(Integer, nullable=False, default=0)
     image_path = Column(String)
-    created_at = Column(DateTime(timezone=True), default=now_th)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), default=now_th)
+    __table_args__ = (Index("ix_reward_parent", "parent_id"),)
+
+    parent = relationship("Users", foreign_keys=[parent_id])
+    redeems = relationship("RewardRedeem", back_populates="reward", passive_deletes=True)
\ No newline at end of file
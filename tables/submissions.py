@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from config import Base, now_th
@@ -11,10 +12,14 @@ class SubmissionStatus(str, enum.Enum):
 class Submission(Base):
     __tablename__ = "submissions"
     id = Column(Integer, primary_key=True)
+    # FK มีแค่ฝั่ง ORM (tasks แบ่ง partition แล้ว DB อ้างด้วย id อย่างเดียวไม่ได้)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
     kid_id  = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     message = Column(Text)
     evidence_path = Column(String)
     status = Column(Enum(SubmissionStatus), nullable=False, default=SubmissionStatus.pending)
     created_at = Column(DateTime(timezone=True), default=now_th)
-    reviewed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    reviewed_at = Column(DateTime(timezone=True), nullable=True)
+
+    task = relationship("Task", back_populates="submissions")
+    kid = relationship("Users", foreign_keys=[kid_id])
\ No newline at end of file
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
+from config import Base, now_th
+
+class TaskTemplate(Base):
+    __tablename__ = "task_templates"
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kid_id    = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String(120), nullable=False)
+    description = Column(Text)
+    points = Column(Integer, nullable=False, default=0)
+    # daily | weekly:mon,thu | monthly:1,15 | cron:<วันที่> <เดือน> <วันในสัปดาห์>
+    rule = Column(String(64), nullable=False, default="daily")
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), default=now_th)
+    __table_args__ = (Index("ix_template_parent_active", "parent_id", "active"),)
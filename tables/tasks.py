@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, CheckConstraint
+from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from config import Base, now_th
@@ -9,6 +10,8 @@ class TaskStatus(str, enum.Enum):
     approved = "approved"
     rejected = "rejected"
 
+# แบ่ง partition รายเดือนตาม created_at (migrations/0006) PK จริงใน DB คือ (id, created_at)
+# แต่ id ไม่ซ้ำอยู่แล้ว ฝั่ง ORM จึงใช้ id อย่างเดียว (db.get(Task, id) ใช้ได้เหมือนเดิม)
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True)
@@ -18,6 +21,22 @@ class Task(Base):
     parent_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     kid_id    = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.assigned)
-    created_at = Column(DateTime(timezone=True), default=now_th)
+    created_at = Column(DateTime(timezone=True), default=now_th, nullable=False)
     completed_at = Column(DateTime(timezone=True), nullable=True, index=True)
-    __table_args__ = (Index("ix_task_kid_status", "kid_id", "status"),)
\ No newline at end of file
+    # งานที่สร้างจาก template: 1 แถวต่อ template ต่อรอบ (period_key = วันที่ "YYYY-MM-DD")
+    template_id = Column(Integer, ForeignKey("task_templates.id", ondelete="SET NULL"), nullable=True)
+    period_key = Column(String(16), nullable=True)
+    __table_args__ = (
+        Index("uq_task_template_period", "template_id", "period_key", "created_at", unique=True),
+        Index("ix_task_kid_status", "kid_id", "status"),
+        Index("ix_task_kid_status_completed", "kid_id", "status", "completed_at"),
+        Index("ix_task_parent_status_completed", "parent_id", "status", "completed_at"),
+        # history แบ่งหน้าด้วย (completed_at, id) งานที่ตัดสินแล้วต้องมีเวลา (migrations/0007)
+        CheckConstraint("status NOT IN ('approved', 'rejected') OR completed_at IS NOT NULL",
+                        name="ck_task_decided_completed_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    parent = relationship("Users", foreign_keys=[parent_id])
+    kid = relationship("Users", foreign_keys=[kid_id])
+    submissions = relationship("Submission", back_populates="task", passive_deletes=True)
\ No newline at end of file
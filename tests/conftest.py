@@ -0,0 +1,101 @@
+# เทสต้องมี Postgres ว่าง ๆ ให้ใช้ทิ้งได้: TEST_DATABASE_URL=postgresql://... python -m pytest -q
+# ตอนเริ่มจะ migrate ให้เอง และล้างทุกตารางก่อนแต่ละเทส ห้ามชี้ DB ที่ใช้งานจริง ; ไม่ตั้ง = ข้ามทั้งหมด
+import os, sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if not TEST_DATABASE_URL:
+    collect_ignore_glob = ["test_*.py"]
+else:
+    # ต้องตั้งก่อน import config (engine สร้างตอน import)
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.setdefault("OUTBOX_EMBEDDED", "0")
+    os.environ.setdefault("NOTIFY_BACKEND", "log")
+    os.chdir(ROOT)  # templates/ static/ เป็น path สัมพัทธ์
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from config import engine
+    from core import migrations
+    migrations.migrate(engine)
+    import main
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def _client(app):
+    from fastapi.testclient import TestClient
+    # ตัวเดียวทั้ง session: connection ใน pool ของ async engine ผูกกับ event loop ของ TestClient ตัวแรก
+    with TestClient(app, follow_redirects=False) as cl:
+        yield cl
+
+
+@pytest.fixture
+def client(_client):
+    _client.cookies.clear()
+    return _client
+
+
+@pytest.fixture(autouse=True)
+def clean_db(app):
+    from sqlalchemy import text
+    from config import engine
+    from bench.seed import APP_TABLES
+    # ไม่ RESTART IDENTITY: id ไม่วนซ้ำข้ามเทส cache ในหน่วยความจำจึงไม่ชนของเทสก่อน
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(APP_TABLES)} CASCADE"))
+    yield
+
+
+@pytest.fixture
+def db(app):
+    from config import SessionLocal
+    with SessionLocal() as s:
+        yield s
+
+
+@pytest.fixture
+def statements(app):
+    """รายการ SQL ที่รันผ่านทั้ง engine sync และ async ระหว่างเทส (ล้างได้ด้วย .clear())"""
+    from sqlalchemy import event
+    from config import engine, async_engine
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+    targets = (engine, async_engine.sync_engine)
+    for e in targets:
+        event.listen(e, "before_cursor_execute", record)
+    yield seen
+    for e in targets:
+        event.remove(e, "before_cursor_execute", record)
+
+
+def login(client, user):
+    """ใส่ cookie session ให้ client โดยไม่ผ่าน /login (ไม่ต้องรอ pool hash รหัสผ่าน)"""
+    from core.session import SESSION_COOKIE, encode_session, load_identity
+    from config import SessionLocal
+    with SessionLocal() as s:
+        ident = load_identity(s, user.id)
+    client.cookies.set(SESSION_COOKIE, encode_session(ident))
+    return ident
+
+
+@pytest.fixture
+def family(db):
+    """ผู้ปกครองหนึ่งคน + เด็กหนึ่งคนในครอบครัวเดียวกัน"""
+    from tables.users import Users, RoleEnum
+    from utils.family import create_family, join_family
+    tag = os.urandom(4).hex()
+    parent = Users(username=f"p-{tag}", password="x", first_name="Parent", role=RoleEnum.parent)
+    kid = Users(username=f"k-{tag}", password="x", first_name="Kid", role=RoleEnum.kid, points=0)
+    db.add_all([parent, kid])
+    db.commit()
+    fam = create_family(db, parent_id=parent.id, family_name="Fam")
+    join_family(db, kid.id, fam.code)
+    return parent, kid
@@ -0,0 +1,63 @@
+# archive ย้ายทีละ batch แยกไฟล์ตามเจ้าของ แล้ว history ยังเดินได้ครบทุกแถวเหมือนไม่เคยย้าย
+import gzip, re
+from datetime import timedelta
+import orjson
+import pytest
+from config import now_th
+from core import archive
+from tables.tasks import Task, TaskStatus
+from tables.users import Users, RoleEnum
+from utils.family import family_of, join_family
+from conftest import login
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path)
+    archive._cache.clear()
+    return tmp_path
+
+
+def walk(client, url):
+    seen = []
+    while url:
+        r = client.get(url)
+        assert r.status_code == 200
+        seen += re.findall(r"<td>(a\d+)</td>", r.text)
+        m = re.search(r'href="([^"]*\?cursor=[^"]+)"', r.text)
+        url = m.group(1).replace("&amp;", "&") if m else None
+    return seen
+
+
+def test_batched_archive_keeps_history_whole(client, db, family, archive_dir):
+    parent, kid = family
+    other = Users(username=f"{kid.username}-2", password="x", first_name="Kid2", role=RoleEnum.kid, points=0)
+    db.add(other)
+    db.commit()
+    join_family(db, other.id, family_of(db, kid.id).code)
+    now = now_th()
+    old, recent = 60, 10
+    db.add_all(Task(title=f"a{i}", points=1, parent_id=parent.id, kid_id=(kid, other)[i % 2].id,
+                    status=TaskStatus.approved, created_at=now - timedelta(days=380 + i),
+                    completed_at=now - timedelta(days=370 + i))
+               for i in range(old))
+    db.add_all(Task(title=f"a{old + i}", points=1, parent_id=parent.id, kid_id=kid.id,
+                    status=TaskStatus.approved, created_at=now - timedelta(days=3),
+                    completed_at=now - timedelta(hours=i))
+               for i in range(recent))
+    db.commit()
+
+    res = archive.run(db, 365, batch=7)
+
+    assert res["tasks"] == old
+    assert db.query(Task).count() == recent
+    for path in archive_dir.rglob("*.jsonl.gz"):
+        with gzip.open(path) as f:
+            owners = {(r["kid_id"], r["parent_id"]) for r in map(orjson.loads, f)}
+        assert len(owners) == 1
+    # รันซ้ำไม่มีอะไรเหลือให้ย้าย และไม่เขียนทับไฟล์เดิม
+    assert archive.run(db, 365, batch=7)["tasks"] == 0
+
+    login(client, parent)
+    seen = walk(client, f"/parent/history/{parent.id}")
+    assert sorted(seen) == sorted(f"a{i}" for i in range(old + recent))
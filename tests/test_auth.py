@@ -0,0 +1,32 @@
+# hash รหัสผ่านใน process pool: login อัปเกรด hash เก่า และงานที่ timeout ยังจองที่ในคิวจนทำเสร็จจริง
+import asyncio, time
+import pytest
+from passlib.hash import pbkdf2_sha256
+from core import auth
+from tables.users import Users, RoleEnum
+
+
+def test_login_upgrades_outdated_hash(client, db):
+    old = pbkdf2_sha256.using(rounds=auth.PBKDF2_ROUNDS // 2).hash("pw")
+    user = Users(username="old-hash", password=old, first_name="Old", role=RoleEnum.parent)
+    db.add(user)
+    db.commit()
+
+    r = client.post("/login", data={"username": "old-hash", "password": "pw"})
+
+    assert r.status_code == 303 and r.headers["location"] == f"/parent/dashboard/{user.id}"
+    db.refresh(user)
+    assert user.password != old and not auth.pwd_context.needs_update(user.password)
+
+
+def test_timed_out_hash_keeps_its_slot_until_done(monkeypatch):
+    monkeypatch.setattr(auth, "HASH_TIMEOUT", 0.05)
+    free = auth._slots._value
+    with pytest.raises(auth.HashPoolBusy):
+        asyncio.run(auth._run_async(time.sleep, 1))
+    # ผู้รอเลิกรอแล้ว แต่ process ลูกยังหลับอยู่ -> ที่ยังไม่คืน
+    assert auth._slots._value == free - 1
+    deadline = time.monotonic() + 5
+    while auth._slots._value != free and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert auth._slots._value == free
@@ -0,0 +1,32 @@
+# แคชรายการรางวัลต้องเห็นรางวัลใหม่/คำขอแลกที่ worker อื่นเขียน โดยไม่มีใคร invalidate ในหน่วยความจำ
+from core import counters
+from tables.rewards import Reward
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from utils.catalog import reward_catalog
+from utils.family import family_of
+from test_family_cache import other_worker
+
+
+def names(db, kid):
+    return [r.name for r in reward_catalog.for_kid(db, family_of(db, kid.id), kid.id)]
+
+
+def test_catalog_follows_db_version(db, family, statements):
+    parent, kid = family
+    db.add(Reward(parent_id=parent.id, name="candy", cost=1))
+    db.commit()
+    assert names(db, kid) == ["candy"]
+
+    statements.clear()
+    assert names(db, kid) == ["candy"]
+    assert len(statements) == 1  # อ่านแค่เวอร์ชัน รายการมาจากแคช
+
+    other_worker("INSERT INTO rewards (parent_id, name, description, cost) VALUES (%s, 'toy', '', 5)",
+                 parent.id, notify=False)
+    assert names(db, kid) == ["candy", "toy"]
+
+    toy = db.query(Reward).filter(Reward.name == "toy").one()
+    db.add(RewardRedeem(reward_id=toy.id, kid_id=kid.id, status=RedeemStatus.pending))
+    counters.redeem_moved(db, kid.id, None, RedeemStatus.pending)
+    db.commit()
+    assert names(db, kid) == ["candy"]
@@ -0,0 +1,29 @@
+# หลาย transaction เขียนตัวนับของเด็กที่ยังไม่มีแถวพร้อมกัน: แถวแรกต้องไม่ทับ delta ของอีกฝั่ง
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+from config import SessionLocal
+from core import counters
+from tables.tasks import Task, TaskStatus
+from tables.kid_counters import KidCounters
+
+WORKERS = 8
+
+
+def test_first_bumps_in_parallel_lose_nothing(db, family):
+    parent, kid = family
+    assert db.get(KidCounters, kid.id) is None
+    start = threading.Barrier(WORKERS)
+
+    def create_task(i: int):
+        with SessionLocal() as s:
+            s.add(Task(title=f"c{i}", points=1, parent_id=parent.id, kid_id=kid.id))
+            start.wait()
+            counters.task_moved(s, kid.id, None, TaskStatus.assigned)
+            time.sleep(0.1)  # ค้าง transaction ไว้ให้ตัวอื่นชนตอนใส่แถวแรก
+            s.commit()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        list(pool.map(create_task, range(WORKERS)))
+
+    db.expire_all()
+    assert db.get(KidCounters, kid.id).assigned == WORKERS
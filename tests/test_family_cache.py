@@ -0,0 +1,66 @@
+# แคชสมาชิกครอบครัว/ตัวตนต้องเห็นการเปลี่ยนที่ worker อื่นทำ (ผ่าน NOTIFY ของ cache_bus) ไม่ใช่รอ TTL
+import time
+import psycopg2
+from sqlalchemy.engine import make_url
+from config import DATABASE_URL
+from core import session
+from core.cache_bus import cache_bus, CHANNEL
+from tables.families import FamilyMember
+from tables.tasks import Task
+from tables.users import Users, RoleEnum
+from utils.family import family_index, is_same_family
+from conftest import login
+
+
+def wait_for(cond, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def other_worker(sql: str, *params, notify: bool):
+    """เขียนผ่าน connection แยก เหมือน worker อื่น: process นี้ไม่ได้ invalidate อะไรเอง"""
+    dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        if notify:
+            cur.execute("SELECT pg_notify(%s, 'membership')", (CHANNEL,))
+    conn.close()
+
+
+def test_join_on_another_worker_reaches_cached_membership(client, db, family):
+    parent, _ = family
+    wait_for(lambda: cache_bus.generation() is not None)
+    kid = Users(username="late-kid", password="x", first_name="Late", role=RoleEnum.kid)
+    db.add(kid)
+    db.commit()
+    fid = db.query(FamilyMember.family_id).filter(FamilyMember.user_id == parent.id).scalar()
+
+    assert not is_same_family(db, parent.id, kid.id)
+    assert session.resolve(db, kid.id).family_id is None
+    # ไม่มี event = ยังเชื่อแคช (พิสูจน์ว่าแคชอยู่จริง ความถูกต้องมาจาก bus)
+    other_worker("INSERT INTO family_members (family_id, user_id, role) VALUES (%s, %s, 'kid')",
+                 fid, kid.id, notify=False)
+    assert not is_same_family(db, parent.id, kid.id)
+
+    gen = cache_bus.generation()
+    other_worker("SELECT 1", notify=True)
+    wait_for(lambda: cache_bus.generation() != gen)
+
+    assert is_same_family(db, parent.id, kid.id)
+    assert session.resolve(db, kid.id).family_id == fid
+    assert (kid.id, RoleEnum.kid.value) in family_index.family(db, fid).members
+    login(client, parent)
+    r = client.post(f"/parent/{parent.id}/task/create", data={"kid_id": kid.id, "title": "t", "points": 1})
+    assert r.headers["location"].endswith("ok=task_created")
+    assert db.query(Task).filter(Task.kid_id == kid.id).count() == 1
+
+
+def test_caches_are_bypassed_while_the_bus_is_down(client, db, family, monkeypatch):
+    parent, kid = family
+    monkeypatch.setattr(cache_bus, "generation", lambda: None)
+    assert is_same_family(db, parent.id, kid.id)
+    other_worker("DELETE FROM family_members WHERE user_id = %s", kid.id, notify=False)
+    assert not is_same_family(db, parent.id, kid.id)
+    assert session.resolve(db, kid.id).family_id is None
@@ -0,0 +1,31 @@
+# history ของผู้ปกครองแบ่งหน้าด้วย cursor: เดินครบทุกหน้าต้องเจองานที่ตัดสินแล้วทุกชิ้นครั้งเดียว
+import re
+from datetime import timedelta
+from config import now_th
+from tables.tasks import Task, TaskStatus
+from utils.pagination import PAGE_SIZE
+from conftest import login
+
+
+def test_parent_history_pages_cover_every_decided_task(client, db, family):
+    parent, kid = family
+    login(client, parent)
+    now = now_th()
+    n = PAGE_SIZE * 2 + 7
+    # เวลาตรวจซ้ำกันเป็นชุด ๆ ให้ลำดับต้องพึ่ง id ด้วย
+    db.add_all(Task(title=f"h{i}", points=1, parent_id=parent.id, kid_id=kid.id,
+                    status=TaskStatus.approved if i % 3 else TaskStatus.rejected,
+                    created_at=now - timedelta(days=2), completed_at=now - timedelta(hours=i // 4))
+               for i in range(n))
+    db.commit()
+
+    seen, url = [], f"/parent/history/{parent.id}"
+    while url:
+        r = client.get(url)
+        assert r.status_code == 200
+        seen += re.findall(r"<td>(h\d+)</td>", r.text)
+        m = re.search(r'href="([^"]*\?cursor=[^"]+)"', r.text)
+        url = m.group(1).replace("&amp;", "&") if m else None
+
+    assert len(seen) == n
+    assert set(seen) == {f"h{i}" for i in range(n)}
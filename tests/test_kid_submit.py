@@ -0,0 +1,31 @@
+# ส่งงานได้เฉพาะงานที่ยังไม่ส่ง/ถูกปฏิเสธ: ส่งซ้ำต้องไม่ได้แต้มสองรอบหรือทำตัวนับเพี้ยน
+from config import now_th
+from tables.tasks import Task, TaskStatus
+from tables.submissions import Submission
+from tables.kid_counters import KidCounters
+from core import counters
+from conftest import login
+
+
+def test_submit_refuses_decided_and_repeated(client, db, family):
+    parent, kid = family
+    done = Task(title="done", points=5, parent_id=parent.id, kid_id=kid.id, status=TaskStatus.approved,
+                completed_at=now_th())
+    todo = Task(title="todo", points=1, parent_id=parent.id, kid_id=kid.id, status=TaskStatus.assigned)
+    db.add_all([done, todo])
+    db.commit()
+    counters.reconcile(db, kid.id)
+    db.commit()
+    done_id, todo_id = done.id, todo.id
+    login(client, kid)
+
+    r = client.post(f"/kid/{kid.id}/task/submit/{done_id}", data={"message": "again"})
+    assert "err=bad_status" in r.headers["location"]
+    for _ in range(2):
+        client.post(f"/kid/{kid.id}/task/submit/{todo_id}", data={"message": "hi"})
+
+    db.expire_all()
+    assert db.get(Task, done_id).status == TaskStatus.approved
+    assert db.query(Submission).filter(Submission.kid_id == kid.id).count() == 1
+    row = db.get(KidCounters, kid.id)
+    assert (row.assigned, row.submitted, row.approved) == (0, 1, 1)
@@ -0,0 +1,64 @@
+# stream ที่ลงทะเบียนไม่สำเร็จต้องคืนที่ใน max_streams
+import asyncio
+import pytest
+from core.live import LiveHub
+
+
+def test_failed_subscribe_releases_its_slot(monkeypatch):
+    hub = LiveHub(None, max_streams=1)
+
+    async def broken():
+        raise OSError("listener down")
+    monkeypatch.setattr(hub, "_connect", broken)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(OSError):
+                await hub.subscribe(1, [10])
+        assert hub.count == 0
+        assert hub._subs == {}
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_twice_releases_once(monkeypatch):
+    hub = LiveHub(None, max_streams=2)
+
+    async def connected():
+        pass
+    monkeypatch.setattr(hub, "_connect", connected)
+
+    async def scenario():
+        a = await hub.subscribe(1, [10])
+        b = await hub.subscribe(2, [10])
+        await hub.unsubscribe(a)
+        await hub.unsubscribe(a)
+        assert hub.count == 1
+        assert hub._subs == {10: {b}}
+    asyncio.run(scenario())
+
+
+def test_stream_released_when_send_fails_before_first_event(monkeypatch):
+    from core.live import live_hub
+    from routes.parent_live import LiveResponse
+
+    async def connected():
+        pass
+    monkeypatch.setattr(live_hub, "_connect", connected)
+
+    async def never():
+        yield "never reached"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client gone")
+
+    async def scenario():
+        before = live_hub.count
+        stream = await live_hub.subscribe(1, [10])
+        with pytest.raises(Exception):
+            await LiveResponse(never(), stream)({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        assert live_hub.count == before
+        assert stream not in live_hub._subs.get(10, ())
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+# อนุมัติงาน/แลกของพร้อมกันหลาย worker ที่เด็กคนเดียว: แต้มต้องตรงกับ ledger และไม่มีวันติดลบ
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from config import SessionLocal
+from core import points
+from tables.users import Users
+from tables.points_ledger import PointsLedger
+
+ROUNDS = 200
+
+
+def one_op(kid_id: int, i: int):
+    with SessionLocal() as s:
+        if i % 5 == 0:
+            res = points.award_many(s, [(kid_id, 2, None), (kid_id, 1, None)])
+        elif i % 2:
+            res = points.award(s, kid_id, 3)
+        else:
+            res = points.spend(s, kid_id, 4)
+        s.commit()
+        return res
+
+
+def test_parallel_award_and_spend_keep_ledger_consistent(db, family):
+    _, kid = family
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: one_op(kid.id, i), range(ROUNDS)))
+
+    db.expire_all()
+    balance = db.scalar(select(Users.points).where(Users.id == kid.id))
+    rows = db.execute(
+        select(PointsLedger.delta, PointsLedger.balance_after)
+        .where(PointsLedger.kid_id == kid.id).order_by(PointsLedger.id)
+    ).all()
+
+    assert balance == sum(d for d, _ in rows)
+    assert all(after >= 0 for _, after in rows)
+    # ทุกแถวต่อกันตามลำดับ id (การเปลี่ยนแต้มล็อกแถว users ไว้จน commit)
+    running = 0
+    for delta, after in rows:
+        running += delta
+        assert after == running
+    # spend ที่แต้มไม่พอต้องไม่เขียน ledger
+    refused = sum(1 for i, r in enumerate(results) if i % 5 and not i % 2 and r is None)
+    spent = sum(1 for d, _ in rows if d < 0)
+    assert spent + refused == sum(1 for i in range(ROUNDS) if i % 5 and not i % 2)
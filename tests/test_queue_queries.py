@@ -0,0 +1,97 @@
+# คิวงานรอตรวจ/คำขอแลกของผู้ปกครอง: จำนวน query ต้องไม่โตตามความยาวคิว (ไม่มี N+1)
+from datetime import timedelta
+from sqlalchemy import select
+from config import now_th
+from core import counters
+from tables.users import Users, RoleEnum
+from tables.tasks import Task, TaskStatus
+from tables.submissions import Submission
+from tables.rewards import Reward
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.kid_counters import KidCounters
+from utils.family import family_of, join_family
+from conftest import login
+
+
+def add_submissions(db, parent, kid, n):
+    now = now_th()
+    for i in range(n):
+        t = Task(title=f"t{i}", points=1, parent_id=parent.id, kid_id=kid.id,
+                 status=TaskStatus.submitted, created_at=now - timedelta(minutes=i))
+        db.add(t)
+        db.flush()
+        db.add(Submission(task_id=t.id, kid_id=kid.id, message="done", created_at=now - timedelta(minutes=i)))
+    db.commit()
+
+
+def add_redeems(db, parent, kid, n):
+    rw = Reward(parent_id=parent.id, name="candy", cost=1)
+    db.add(rw)
+    db.flush()
+    now = now_th()
+    db.add_all(RewardRedeem(reward_id=rw.id, kid_id=kid.id, status=RedeemStatus.pending,
+                            created_at=now - timedelta(minutes=i)) for i in range(n))
+    db.commit()
+
+
+def count_page(client, statements, url, rows):
+    client.get(url)  # อุ่น cache ตัวตน/ครอบครัวก่อน ให้สองรอบเทียบกันได้
+    statements.clear()
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.text.count("/decision/") >= rows
+    return len(statements)
+
+
+def test_review_queue_query_count_is_constant(client, db, family, statements):
+    parent, kid = family
+    login(client, parent)
+    url = f"/parent/submissions/{parent.id}"
+
+    add_submissions(db, parent, kid, 1)
+    short = count_page(client, statements, url, 1)
+    add_submissions(db, parent, kid, 49)
+    long = count_page(client, statements, url, 50)
+
+    assert long == short
+
+
+def test_redeem_queue_query_count_is_constant(client, db, family, statements):
+    parent, kid = family
+    login(client, parent)
+    url = f"/parent/redeems/{parent.id}"
+
+    add_redeems(db, parent, kid, 1)
+    short = count_page(client, statements, url, 1)
+    add_redeems(db, parent, kid, 39)
+    long = count_page(client, statements, url, 40)
+
+    assert long == short
+
+
+def test_batch_decision_bumps_counters_in_one_statement(client, db, family, statements):
+    parent, kid = family
+    code = family_of(db, kid.id).code
+    kids = [kid]
+    for i in range(3):
+        k = Users(username=f"{kid.username}-{i}", password="x", first_name="Kid", role=RoleEnum.kid, points=0)
+        db.add(k)
+        db.commit()
+        join_family(db, k.id, code)
+        kids.append(k)
+    for k in kids:
+        add_submissions(db, parent, k, 2)
+        counters.reconcile(db, k.id)
+    db.commit()
+    sids = db.scalars(select(Submission.id)).all()
+    login(client, parent)
+
+    statements.clear()
+    r = client.post("/parent/submission/decision-batch",
+                    data={"pid": parent.id, "approve": "yes", "sid": sids}, headers={"accept": "application/json"})
+    assert r.json()["decided"] == len(sids)
+    assert sum(s.lstrip().upper().startswith("UPDATE KID_COUNTERS") for s in statements) == 1
+    db.expire_all()
+    for k in kids:
+        row = db.get(KidCounters, k.id)
+        assert (row.submitted, row.approved) == (0, 2)
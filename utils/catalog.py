@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from sqlalchemy import select, exists, func
+from sqlalchemy.orm import Session
+from tables.rewards import Reward
+from tables.reward_redeems import RewardRedeem, RedeemStatus
+from tables.archive import ArchiveIndex
+from tables.kid_counters import KidCounters
+from tables.users import RoleEnum
+from utils.cache import TTLCache
+from utils.family import FamilyInfo
+import os
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "20000"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class RewardItem:
+    id: int
+    name: str
+    description: str
+    cost: int
+    image_path: str | None
+
+
+def catalog_query(parent_ids, kid_id: int):
+    """รางวัลของผู้ปกครองในครอบครัว ที่เด็กคนนี้ยังไม่ได้ขอ (pending) หรือได้ไปแล้ว (approved)"""
+    taken = exists().where(
+        RewardRedeem.reward_id == Reward.id,
+        RewardRedeem.kid_id == kid_id,
+        RewardRedeem.status.in_([RedeemStatus.pending, RedeemStatus.approved]),
+    )
+    # ที่ได้ไปนานแล้วย้ายไปไฟล์ archive (core/archive.py)
+    archived = exists().where(
+        ArchiveIndex.table_name == "reward_redeems",
+        ArchiveIndex.reward_id == Reward.id,
+        ArchiveIndex.kid_id == kid_id,
+        ArchiveIndex.status == RedeemStatus.approved.value,
+    )
+    return (select(Reward.id, Reward.name, Reward.description, Reward.cost, Reward.image_path)
+            .where(Reward.parent_id.in_(parent_ids), ~taken, ~archived)
+            .order_by(Reward.id))
+
+
+class RewardCatalog:
+    """แคชรายการรางวัลต่อ (ครอบครัว, เด็ก) ; key ติดเวอร์ชันที่อ่านจาก DB ทุกครั้ง worker ไหนเขียนก็เห็นเหมือนกัน
+    - รางวัลของผู้ปกครองในบ้าน: max(id) + จำนวนแถว (รางวัลเพิ่มได้อย่างเดียว ไม่มีแก้/ลบ)
+    - คำขอแลกของเด็ก: kid_counters.version (+1 ทุกครั้งที่สถานะคำขอแลกเปลี่ยน ใน transaction เดียวกัน)
+    entry รุ่นเก่าจะไม่ถูกอ่านอีกและหลุดออกไปเองตาม LRU/ttl"""
+
+    def __init__(self, maxsize: int = CATALOG_CACHE_SIZE, ttl: float = CATALOG_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def version(db: Session, parent_ids, kid_id: int) -> tuple:
+        rewards = select(func.max(Reward.id), func.count()).where(Reward.parent_id.in_(parent_ids)).subquery()
+        kid = select(KidCounters.version).where(KidCounters.kid_id == kid_id).scalar_subquery()
+        return tuple(db.execute(select(rewards.c[0], rewards.c[1], kid)).one())
+
+    def for_kid(self, db: Session, fam: FamilyInfo, kid_id: int) -> tuple[RewardItem, ...]:
+        parent_ids = fam.user_ids(RoleEnum.parent.value)
+        if not parent_ids:
+            return ()
+        # อ่านเวอร์ชันก่อนรายการ: ถ้ามีคน commit คั่นกลาง ของที่เก็บจะใหม่กว่า key (รอบหน้าโหลดซ้ำ) ไม่ใช่เก่ากว่า
+        key = (fam.id, tuple(parent_ids), kid_id, self.version(db, parent_ids, kid_id))
+        items = self._cache.get(key)
+        if items is None:
+            items = tuple(
+                RewardItem(r.id, r.name, r.description or "", r.cost, r.image_path)
+                for r in db.execute(catalog_query(parent_ids, kid_id))
+            )
+            self._cache.set(key, items)
+        return items
+
+    def clear(self):
+        self._cache.clear()
+
+
+reward_catalog = RewardCatalog()
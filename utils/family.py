@@ -1,7 +1,118 @@
+from dataclasses import dataclass
 from sqlalchemy.orm import Session
 from tables.families import Family, FamilyMember
 from tables.users import Users, RoleEnum
-import secrets
+from core.session import invalidate
+from core import cache_bus as bus
+from utils.cache import TTLCache
+import os, secrets
+
+FAMILY_CACHE_SIZE = int(os.getenv("FAMILY_CACHE_SIZE", "20000"))
+FAMILY_CACHE_TTL = float(os.getenv("FAMILY_CACHE_TTL", "600"))
+
+
+@dataclass(frozen=True)
+class FamilyInfo:
+    id: int
+    name: str
+    code: str
+    owner_parent_id: int
+    members: tuple  # ((user_id, role), ...)
+
+    def user_ids(self, role: str | None = None) -> list[int]:
+        return [uid for uid, r in self.members if role is None or r == role]
+
+
+class FamilyIndex:
+    """แคชสมาชิกครอบครัวในหน่วยความจำ: user -> ครอบครัว, ครอบครัว -> ข้อมูล+สมาชิก
+    ทุก entry ผูกกับ generation ของ cache_bus ตอนโหลด worker ไหนเปลี่ยนสมาชิกก็เลื่อน generation
+    ของทุก worker entry รุ่นเก่าจะถูกโหลดใหม่เอง ; bus ไม่ได้ฟังอยู่ = อ่าน DB ตรงทุกครั้ง
+    (ใช้ตัดสินสิทธิ์ เช่น is_same_family จึงห้ามเชื่อของที่อาจค้าง)"""
+
+    def __init__(self, maxsize: int = FAMILY_CACHE_SIZE, ttl: float = FAMILY_CACHE_TTL):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._families = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def bump(self):
+        bus.cache_bus.bump()
+
+    @staticmethod
+    def _get(cache: TTLCache, key, gen: int | None):
+        if gen is None:
+            return None
+        item = cache.get(key)
+        if item is None or item[0] != gen:
+            return None
+        return item[1]
+
+    @staticmethod
+    def _set(cache: TTLCache, key, gen: int | None, value):
+        if gen is not None:
+            cache.set(key, (gen, value))
+
+    def family_ids(self, db: Session, user_id: int) -> frozenset[int]:
+        # อ่าน generation ก่อน query: ถ้ามีคนเปลี่ยนระหว่างนั้น ของที่เก็บจะเป็นรุ่นเก่าทันที
+        gen = bus.cache_bus.generation()
+        fams = self._get(self._users, user_id, gen)
+        if fams is None:
+            fams = frozenset(fid for (fid,) in db.query(FamilyMember.family_id).filter(
+                FamilyMember.user_id == user_id, FamilyMember.family_id.isnot(None)
+            ))
+            self._set(self._users, user_id, gen, fams)
+        return fams
+
+    def family(self, db: Session, family_id: int) -> FamilyInfo | None:
+        gen = bus.cache_bus.generation()
+        info = self._get(self._families, family_id, gen)
+        if info is None:
+            fam = db.get(Family, family_id)
+            if not fam:
+                return None
+            members = tuple(
+                (uid, getattr(role, "value", role)) for uid, role in
+                db.query(FamilyMember.user_id, FamilyMember.role)
+                  .filter(FamilyMember.family_id == family_id)
+                  .order_by(FamilyMember.id)
+            )
+            info = FamilyInfo(fam.id, fam.name, fam.code, fam.owner_parent_id, members)
+            self._set(self._families, family_id, gen, info)
+        return info
+
+    def invalidate_user(self, user_id: int):
+        self._users.pop(user_id)
+
+    def invalidate_family(self, family_id: int):
+        self._families.pop(family_id)
+
+    def clear(self):
+        self._users.clear()
+        self._families.clear()
+        self.bump()
+
+
+family_index = FamilyIndex()
+
+
+def family_of(db: Session, user_id: int) -> FamilyInfo | None:
+    fams = family_index.family_ids(db, user_id)
+    return family_index.family(db, min(fams)) if fams else None
+
+
+def owned_family(db: Session, parent_id: int) -> FamilyInfo | None:
+    for fid in sorted(family_index.family_ids(db, parent_id)):
+        info = family_index.family(db, fid)
+        if info and info.owner_parent_id == parent_id:
+            return info
+    return None
+
+
+def _membership_changed(user_id: int, family_id: int):
+    """หลัง commit ; worker อื่นได้ event จาก bus.publish() ที่ยิงไว้ใน transaction เดียวกัน"""
+    family_index.invalidate_user(user_id)
+    family_index.invalidate_family(family_id)
+    invalidate(user_id)
+    family_index.bump()
+
 
 def generate_unique_code(db: Session) -> str:
     while True:
@@ -16,7 +127,9 @@ def create_family(db: Session, parent_id: int, family_name: str) -> Family:
     db.add(fam); db.commit(); db.refresh(fam)
     # ใส่ parent เป็นสมาชิกด้วย
     db.add(FamilyMember(family_id=fam.id, user_id=parent_id, role=RoleEnum.parent.value))
+    bus.publish(db, "membership")
     db.commit()
+    _membership_changed(parent_id, fam.id)
     return fam
 
 def join_family(db: Session, kid_id: int, code: str):
@@ -31,13 +144,9 @@ def join_family(db: Session, kid_id: int, code: str):
     if exists:
         raise ValueError("Already joined")
     db.add(FamilyMember(family_id=fam.id, user_id=kid_id, role=RoleEnum.kid.value))
+    bus.publish(db, "membership")
     db.commit()
+    _membership_changed(kid_id, fam.id)
 
 def is_same_family(db: Session, parent_id: int, kid_id: int) -> bool:
-    fam_ids = [fm.family_id for fm in db.query(FamilyMember).filter(FamilyMember.user_id == parent_id).all()]
-    if not fam_ids:
-        return False
-    return db.query(FamilyMember).filter(
-        FamilyMember.user_id == kid_id,
-        FamilyMember.family_id.in_(fam_ids)
-    ).first() is not None
\ No newline at end of file
+    return not family_index.family_ids(db, parent_id).isdisjoint(family_index.family_ids(db, kid_id))
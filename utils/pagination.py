@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import tuple_
+import base64
+
+PAGE_SIZE = 50
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def keyset_page(query, ts_col, id_col, cursor: str | None, key, limit: int = PAGE_SIZE):
+    """เรียงใหม่->เก่า ตาม (ts_col, id_col) แล้วตัดหน้าด้วย cursor ของแถวสุดท้ายหน้าก่อน
+    ts_col ต้องไม่ว่างในแถวที่ query เลือก (แถวที่ ts ว่างสร้าง cursor ไม่ได้) เช่นงาน/การแลกที่ตัดสินแล้ว
+    ซึ่ง DB บังคับไว้ (migrations/0007)
+    key(row) -> (ts, id) ของแถวนั้น, คืน (rows, next_cursor) โดย next_cursor เป็น None ถ้าหมดแล้ว"""
+    pos = decode_cursor(cursor)
+    if pos is not None:
+        query = query.filter(tuple_(ts_col, id_col) < tuple_(*pos))
+    rows = query.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        ts, row_id = key(rows[-1])
+        next_cursor = encode_cursor(ts, row_id)
+    return rows, next_cursor